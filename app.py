@@ -1,4 +1,5 @@
 # app.py
+import io
 import json
 from dataclasses import fields, is_dataclass
 from pathlib import Path
@@ -20,6 +21,11 @@ try:
 except Exception:
     list_custom_models = None  # gracefully degrade
 
+try:
+    from qsi.qsi_io import _USE_ARROW  # Parquet upload/download need pyarrow
+except Exception:
+    _USE_ARROW = False
+
 
 # ---------------- Utilities ----------------
 def dataclass_has_field(cls, name: str) -> bool:
@@ -56,15 +62,18 @@ with c_logo:
 u_col1, u_col2 = st.columns([4, 1])
 with u_col1:
     uploaded = st.file_uploader(
-        "Upload CSV  •  required columns: Date, Forecast, Actual, Unit_Cost",
-        type=["csv"],
-        help="UTF-8 CSV with header row. Date will be parsed to timestamp.",
+        "Upload CSV or Parquet  •  required columns: Date, Forecast, Actual, Unit_Cost",
+        type=["csv", "parquet"] if _USE_ARROW else ["csv"],
+        help="UTF-8 CSV with header row, or Parquet. Date will be parsed to timestamp.",
     )
 with u_col2:
     use_sample = st.toggle("Use sample data", value=(uploaded is None), help="Generate a demo dataset.")
 
 if uploaded is not None:
-    df = pd.read_csv(uploaded, parse_dates=["Date"])
+    if uploaded.name.lower().endswith(".parquet"):
+        df = pd.read_parquet(uploaded)
+    else:
+        df = pd.read_csv(uploaded, parse_dates=["Date"])
 elif use_sample:
     df = generate_dummy(days=60, segments=["SKU-A", "SKU-B"]).rename(columns={"Segment": "SKU"})
 else:
@@ -421,6 +430,15 @@ with st.expander("Download"):
         file_name="qsi_results.csv",
         mime="text/csv",
     )
+    if _USE_ARROW:
+        buf = io.BytesIO()
+        df_out.to_parquet(buf, index=False)
+        st.download_button(
+            "Results Parquet",
+            data=buf.getvalue(),
+            file_name="qsi_results.parquet",
+            mime="application/octet-stream",
+        )
 
     export_report = {
         "summary": report["summary"],
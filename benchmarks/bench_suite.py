@@ -0,0 +1,307 @@
+# bench_suite.py
+"""
+Benchmark suite over every QSIEngine path and EpistemicAnalytics.enrich.
+
+Times native, EWMA, custom-θ, Cognize and Cognize-graph analysis plus enrich on ``generate_dummy``
+data across a grid of row counts (1k .. 10M) and segment counts (1 .. 50k). Each case records the
+best wall time of ``--repeat`` runs, rows/sec and the peak traced allocation of one extra run; a run
+is appended to a JSON history file. ``compare`` diffs two runs and flags regressions.
+
+    python benchmarks/bench_suite.py run --scale small --label baseline
+    python benchmarks/bench_suite.py run --rows 1e6 --segments 1,1000 --paths native,ewma,enrich
+    python benchmarks/bench_suite.py compare                 # last run vs the one before
+    python benchmarks/bench_suite.py compare --base baseline --threshold 0.15
+"""
+from __future__ import annotations
+import argparse
+import datetime as _dt
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from qsi import QSIEngine, QSIConfig, EpistemicAnalytics, EpistemicConfig, generate_dummy   # noqa: E402
+from qsi.qsi_engine import _USE_COGNIZE                                                   # noqa: E402
+from qsi.qsi_kernels import _USE_NUMBA                                                    # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(HERE, "results", "history.json")
+
+PATHS = ("native", "ewma", "custom", "cognize", "cognize_graph", "enrich")
+SCALES = {
+    "small":  ([1_000, 10_000], [1, 10]),
+    "medium": ([1_000, 100_000, 1_000_000], [1, 100, 1_000]),
+    "large":  ([1_000, 100_000, 1_000_000, 10_000_000], [1, 100, 1_000, 50_000]),
+}
+# Cognize steps row by row in Python; larger cases are recorded as skipped unless raised
+DEFAULT_MAX_COGNIZE_ROWS = 100_000
+
+
+# ====================================================
+#                 Cases and synthetic data
+# ====================================================
+def _config(path: str) -> QSIConfig:
+    if path == "ewma":
+        return QSIConfig(use_cognize=False, use_ewma=True)
+    if path == "custom":
+        return QSIConfig(use_cognize=False, custom_model="rolling_quantile")
+    if path == "cognize":
+        return QSIConfig(use_cognize=True)
+    if path == "cognize_graph":
+        return QSIConfig(use_cognize=True, use_graph=True)
+    return QSIConfig(use_cognize=False)              # native, and the analysis feeding enrich
+
+def make_data(rows: int, segments: int, seed: int = 42) -> Tuple[pd.DataFrame, Optional[str]]:
+    """``rows`` rows of generate_dummy data spread over ``segments`` segments (groupby or None)."""
+    if segments <= 1:
+        return generate_dummy(days=rows, seed=seed), None
+    days = int(math.ceil(rows / segments))
+    df = generate_dummy(days=days, seed=seed, segments=[f"S{i:05d}" for i in range(segments)])
+    return df.iloc[:rows].reset_index(drop=True), "Segment"
+
+def _case_fn(path: str, df: pd.DataFrame, groupby: Optional[str]) -> Callable[[], Any]:
+    engine = QSIEngine(_config(path))
+    if path != "enrich":
+        return lambda: engine.analyze(df, groupby=groupby)
+    out, _ = engine.analyze(df, groupby=groupby)
+    ecfg = EpistemicConfig(groupby=groupby)
+    return lambda: EpistemicAnalytics.enrich(out, ecfg)
+
+def _skip_reason(path: str, rows: int, segments: int, max_cognize_rows: int) -> Optional[str]:
+    if segments > rows:
+        return "more segments than rows"
+    if path.startswith("cognize"):
+        if not _USE_COGNIZE:
+            return "cognize not installed"
+        if rows > max_cognize_rows:
+            return f"rows > --max-cognize-rows ({max_cognize_rows})"
+    if path == "cognize_graph" and segments <= 1:
+        return "graph mode needs segments"
+    return None
+
+
+# ====================================================
+#                      Measurement
+# ====================================================
+def measure(fn: Callable[[], Any], repeat: int, memory: bool = True) -> Dict[str, float]:
+    """Best wall time over ``repeat`` runs; peak traced allocation (MiB) of one extra run."""
+    best = math.inf
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    res = {"wall_s": best}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            res["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return res
+
+def _warmup() -> None:
+    """Compile numba kernels and touch every path once so the first case is not charged for it."""
+    df, gb = make_data(200, 2)
+    for path in PATHS:
+        if _skip_reason(path, 200, 2, DEFAULT_MAX_COGNIZE_ROWS) is None:
+            _case_fn(path, df, gb)()
+
+def _environment() -> Dict[str, Any]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                             text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        rev = None
+    def version(mod: str, available: bool) -> Optional[str]:
+        return getattr(sys.modules.get(mod), "__version__", "installed") if available else None
+    return {
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "numba": version("numba", _USE_NUMBA),
+        "cognize": version("cognize", _USE_COGNIZE),
+    }
+
+
+# ====================================================
+#                       Commands
+# ====================================================
+def _parse_counts(text: Optional[str]) -> Optional[List[int]]:
+    return None if not text else [int(float(x)) for x in str(text).split(",") if x.strip()]
+
+def run_suite(
+    rows: List[int], segments: List[int], paths: List[str], repeat: int = 3,
+    memory: bool = True, max_cognize_rows: int = DEFAULT_MAX_COGNIZE_ROWS, echo: bool = True,
+) -> List[Dict[str, Any]]:
+    _warmup()
+    results: List[Dict[str, Any]] = []
+    for n in rows:
+        for s in segments:
+            data = None
+            for path in paths:
+                rec: Dict[str, Any] = {"path": path, "rows": int(n), "segments": int(s)}
+                reason = _skip_reason(path, n, s, max_cognize_rows)
+                if reason:
+                    rec["skipped"] = reason
+                else:
+                    if data is None:
+                        data = make_data(n, s)
+                    try:
+                        rec.update(measure(_case_fn(path, *data), repeat, memory))
+                        rec["rows_per_s"] = n / rec["wall_s"] if rec["wall_s"] > 0 else math.inf
+                    except MemoryError:
+                        rec["skipped"] = "MemoryError"
+                results.append(rec)
+                if echo:
+                    print(_format_row(rec), flush=True)
+    return results
+
+def _format_row(r: Dict[str, Any]) -> str:
+    head = f"{r['path']:<14}{r['rows']:>11,}{r['segments']:>8,}"
+    if "skipped" in r:
+        return f"{head}   skipped: {r['skipped']}"
+    mem = f"{r['peak_mb']:>10.1f}" if "peak_mb" in r else f"{'-':>10}"
+    return f"{head}{r['wall_s']:>11.4f}{r['rows_per_s']:>14,.0f}{mem}"
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+def save_run(path: str, run: Dict[str, Any]) -> None:
+    history = load_history(path)
+    history.append(run)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(history, fh, indent=1)
+    os.replace(tmp, path)
+
+def _pick(history: List[Dict[str, Any]], ref: Optional[str], default: int) -> Dict[str, Any]:
+    """Run by label, or by index into the history (negative from the end)."""
+    if ref is None:
+        return history[default]
+    labelled = [r for r in history if r.get("label") == ref]
+    if labelled:
+        return labelled[-1]
+    try:
+        return history[int(ref)]
+    except (ValueError, IndexError):
+        raise SystemExit(f"No run labelled or indexed '{ref}' in the history.")
+
+def compare_runs(
+    base: Dict[str, Any], head: Dict[str, Any], threshold: float = 0.10,
+    mem_threshold: float = 0.20, min_seconds: float = 0.005,
+) -> List[Dict[str, Any]]:
+    """Cases present in both runs with their relative change; ``regression`` is set when wall time
+    grew by more than ``threshold`` (and ``min_seconds``) or peak memory by more than ``mem_threshold``."""
+    key = lambda r: (r["path"], r["rows"], r["segments"])
+    before = {key(r): r for r in base["results"] if "skipped" not in r}
+    rows = []
+    for r in head["results"]:
+        b = before.get(key(r))
+        if b is None or "skipped" in r:
+            continue
+        d_t = r["wall_s"] / b["wall_s"] - 1.0 if b["wall_s"] > 0 else 0.0
+        d_m = (r["peak_mb"] / b["peak_mb"] - 1.0) if b.get("peak_mb") and "peak_mb" in r else None
+        slow = d_t > threshold and r["wall_s"] - b["wall_s"] > min_seconds
+        fat = d_m is not None and d_m > mem_threshold
+        rows.append({"path": r["path"], "rows": r["rows"], "segments": r["segments"],
+                     "base_s": b["wall_s"], "head_s": r["wall_s"], "time_change": d_t,
+                     "mem_change": d_m, "regression": bool(slow or fat)})
+    return rows
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    rows, segs = SCALES[args.scale]
+    rows = _parse_counts(args.rows) or rows
+    segs = _parse_counts(args.segments) or segs
+    paths = [p.strip() for p in args.paths.split(",")] if args.paths else list(PATHS)
+    bad = sorted(set(paths) - set(PATHS))
+    if bad:
+        print(f"Unknown paths {bad}. Choose from {list(PATHS)}", file=sys.stderr)
+        return 2
+    warnings.filterwarnings("ignore")
+    print(f"{'path':<14}{'rows':>11}{'segs':>8}{'wall s':>11}{'rows/s':>14}{'peak MiB':>10}")
+    results = run_suite(rows, segs, paths, repeat=args.repeat, memory=not args.no_memory,
+                        max_cognize_rows=args.max_cognize_rows)
+    run = {
+        "timestamp": _dt.datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "repeat": args.repeat,
+        "env": _environment(),
+        "results": results,
+    }
+    if not args.no_save:
+        save_run(args.history, run)
+        print(f"saved run #{len(load_history(args.history)) - 1} to {args.history}")
+    return 0
+
+def _cmd_compare(args: argparse.Namespace) -> int:
+    history = load_history(args.history)
+    if len(history) < (1 if args.base else 2):
+        print(f"Need at least two runs in {args.history} to compare.", file=sys.stderr)
+        return 2
+    base, head = _pick(history, args.base, -2), _pick(history, args.head, -1)
+    rows = compare_runs(base, head, args.threshold, args.mem_threshold, args.min_seconds)
+    print(f"base: {base['timestamp']} {base.get('label') or ''} ({base['env'].get('git_rev')})")
+    print(f"head: {head['timestamp']} {head.get('label') or ''} ({head['env'].get('git_rev')})")
+    print(f"{'path':<14}{'rows':>11}{'segs':>8}{'base s':>10}{'head s':>10}{'time':>9}{'mem':>9}")
+    for r in rows:
+        mem = f"{r['mem_change']:>+8.1%}" if r["mem_change"] is not None else f"{'-':>8}"
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['path']:<14}{r['rows']:>11,}{r['segments']:>8,}{r['base_s']:>10.4f}{r['head_s']:>10.4f}"
+              f"{r['time_change']:>+8.1%} {mem}{flag}")
+    n_bad = sum(r["regression"] for r in rows)
+    print(f"{len(rows)} cases compared, {n_bad} regression(s)")
+    return 1 if n_bad else 0
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="run the suite and append to the history file")
+    r.add_argument("--scale", choices=sorted(SCALES), default="small", help="preset rows x segments grid")
+    r.add_argument("--rows", help="comma-separated row counts (overrides --scale), e.g. 1e3,1e6")
+    r.add_argument("--segments", help="comma-separated segment counts (overrides --scale)")
+    r.add_argument("--paths", help=f"comma-separated subset of {','.join(PATHS)}")
+    r.add_argument("--repeat", type=int, default=3)
+    r.add_argument("--max-cognize-rows", type=int, default=DEFAULT_MAX_COGNIZE_ROWS)
+    r.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    r.add_argument("--label", help="name for this run (usable with compare --base/--head)")
+    r.add_argument("--history", default=DEFAULT_HISTORY)
+    r.add_argument("--no-save", action="store_true")
+    r.set_defaults(func=_cmd_run)
+
+    c = sub.add_parser("compare", help="compare two runs from the history file")
+    c.add_argument("--base", help="label or index of the baseline run (default: second to last)")
+    c.add_argument("--head", help="label or index of the candidate run (default: last)")
+    c.add_argument("--threshold", type=float, default=0.10, help="allowed relative wall-time increase")
+    c.add_argument("--mem-threshold", type=float, default=0.20, help="allowed relative peak-memory increase")
+    c.add_argument("--min-seconds", type=float, default=0.005, help="ignore slowdowns smaller than this")
+    c.add_argument("--history", default=DEFAULT_HISTORY)
+    c.set_defaults(func=_cmd_compare)
+
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,24 @@
-from .qsi_engine import QSIEngine, QSIConfig, generate_dummy
+from .qsi_engine import (
+    QSIEngine, QSIConfig, generate_dummy,
+    register_custom_model, register_array_model, list_custom_models, theta_cache_info, clear_theta_cache,
+)
+from .qsi_frame import QSIFrame
+from .qsi_io import read_table, read_frame, write_dataset, to_arrow, frame_from_arrow
+from .qsi_cache import ResultCache, configure_result_cache, result_cache_info, clear_result_cache
 from .qsi_epistemic import EpistemicAnalytics, EpistemicConfig
+from .qsi_stream import QSIStream
+from .qsi_window import rolling_quantiles, rolling_moments, RollingFeatures, RollingMoments, SortedWindow
+from .qsi_tune import QSITuner, TunerConfig
+from .qsi_synth import SynthConfig, generate_synthetic, iter_synthetic
 
 __all__ = [
     "QSIEngine", "QSIConfig", "generate_dummy",
-    "EpistemicAnalytics", "EpistemicConfig",
+    "register_custom_model", "register_array_model", "list_custom_models",
+    "theta_cache_info", "clear_theta_cache",
+    "QSIFrame", "EpistemicAnalytics", "EpistemicConfig",
+    "read_table", "read_frame", "write_dataset", "to_arrow", "frame_from_arrow",
+    "ResultCache", "configure_result_cache", "result_cache_info", "clear_result_cache",
+    "QSIStream", "QSITuner", "TunerConfig",
+    "SynthConfig", "generate_synthetic", "iter_synthetic",
+    "rolling_quantiles", "rolling_moments", "RollingFeatures", "RollingMoments", "SortedWindow",
 ]
@@ -0,0 +1,3 @@
+from .qsi_cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,327 @@
+# qsi_cache.py
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import copy
+import glob
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+from .qsi_frame import QSIFrame
+
+
+# ====================================================
+#                  Content fingerprints
+# ====================================================
+def _update_array(h: Any, a: Any) -> None:
+    a = np.asarray(a)
+    h.update(f"{a.dtype.str}{a.shape}|".encode("utf-8"))
+    if a.dtype.kind in "biufcmM":
+        h.update(np.ascontiguousarray(a).reshape(-1).view(np.uint8).data)
+    else:   # object / strings: stable per-value hashes
+        h.update(pd.util.hash_array(a.ravel(), categorize=True).data)
+
+def data_fingerprint(data: pd.DataFrame | QSIFrame) -> str:
+    """Content hash of every column (names, dtypes, values; not the index) of a DataFrame/QSIFrame."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(data, QSIFrame):
+        h.update(f"QSIFrame|{data.names}|{data.segment}|".encode("utf-8"))
+        for a in (data.date, data.forecast, data.actual, data.cost):
+            _update_array(h, a)
+        if data.codes is not None:
+            _update_array(h, data.codes)
+            _update_array(h, data.categories)
+        items: Iterable[Tuple[str, Any]] = data.columns.items()
+    else:
+        h.update(f"DataFrame|{len(data)}|".encode("utf-8"))
+        items = ((k, data[k]) for k in data.columns)
+    for name, col in items:
+        h.update(f"{name!r}|".encode("utf-8"))
+        if isinstance(col, pd.Series) and isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.astype(object)
+        _update_array(h, col)
+    return h.hexdigest()
+
+def config_fingerprint(cfg: Any) -> str:
+    """Canonical hash of ``asdict(cfg)`` (sorted keys, reprs for non-JSON values)."""
+    blob = json.dumps(asdict(cfg), sort_keys=True, default=repr)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=16).hexdigest()
+
+def _code_update(h: Any, code: Any) -> None:
+    """Bytecode, names and constants of ``code`` (nested functions / lambdas included)."""
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode("utf-8"))
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _code_update(h, const)
+        else:
+            h.update(f"{type(const).__name__}:{const!r}|".encode("utf-8"))
+
+def _value_update(h: Any, v: Any, depth: int = 0) -> None:
+    """Defaults / closure values: arrays by content, callables by their own token, else repr."""
+    if isinstance(v, np.ndarray):
+        _update_array(h, v)
+    elif callable(v) and getattr(v, "__code__", None) is not None and depth < 4:
+        _fn_update(h, v, depth + 1)
+    elif isinstance(v, (list, tuple)):
+        h.update(f"{type(v).__name__}[".encode("utf-8"))
+        for x in v:
+            _value_update(h, x, depth)
+        h.update(b"]")
+    elif isinstance(v, dict):
+        h.update(b"{")
+        for k in sorted(v, key=repr):
+            h.update(f"{k!r}:".encode("utf-8"))
+            _value_update(h, v[k], depth)
+        h.update(b"}")
+    else:
+        h.update(f"{type(v).__name__}:{v!r}|".encode("utf-8"))
+
+def _fn_update(h: Any, fn: Any, depth: int = 0) -> None:
+    _code_update(h, fn.__code__)
+    _value_update(h, fn.__defaults__, depth)
+    _value_update(h, fn.__kwdefaults__, depth)
+    for cell in fn.__closure__ or ():
+        try:
+            _value_update(h, cell.cell_contents, depth)
+        except ValueError:                      # empty cell
+            h.update(b"<empty>")
+
+def callable_token(fn: Any) -> str:
+    """Identity of a plug-in for cache keys: qualified name plus a hash of its bytecode, constants,
+    defaults and closure values (so re-registering a changed model under the same name misses)."""
+    if getattr(fn, "__code__", None) is not None:
+        h = hashlib.blake2b(digest_size=8)
+        _fn_update(h, fn)
+        body = h.hexdigest()
+    else:
+        body = repr(fn)
+    return f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', type(fn).__name__)}:{body}"
+
+
+# ====================================================
+#           Two-tier result cache (memory + disk)
+# ====================================================
+def _nbytes(obj: Any) -> int:
+    """Approximate payload size of a cached value."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=False, deep=False).sum())
+    if isinstance(obj, QSIFrame):
+        arrays = [obj.date, obj.forecast, obj.actual, obj.cost, *obj.columns.values()]
+        return sum(a.nbytes for a in arrays) + (obj.codes.nbytes if obj.codes is not None else 0)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(v) for v in obj)
+    return sys.getsizeof(obj)
+
+def _freeze(obj: Any) -> Any:
+    """Mark the arrays of every QSIFrame in ``obj`` read-only (in place)."""
+    if isinstance(obj, QSIFrame):
+        for a in (obj.date, obj.forecast, obj.actual, obj.cost, obj.codes, *obj.columns.values()):
+            if a is not None:
+                a.flags.writeable = False
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            _freeze(v)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            _freeze(v)
+    return obj
+
+def _copy_on_write() -> bool:
+    """Whether pandas copy-on-write is on (always from pandas 3; opt-in on pandas 2)."""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.options.mode.copy_on_write is True
+
+def _detach(obj: Any, own: bool = False) -> Any:
+    """Copy of a cached value the caller may change freely. DataFrames are shallow copies under
+    copy-on-write and deep copies otherwise; QSIFrame arrays are copied once when stored (``own``)
+    and then shared read-only."""
+    if isinstance(obj, pd.DataFrame):
+        return obj.copy(deep=not _copy_on_write())
+    if isinstance(obj, QSIFrame):
+        return obj.take(np.arange(len(obj))) if own else obj.with_columns()
+    if isinstance(obj, dict):
+        return {k: _detach(v, own) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_detach(v, own) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(_detach(v, own) for v in obj)
+    return copy.copy(obj)
+
+
+class ResultCache:
+    """
+    LRU of analysis results in memory, optionally backed by a directory of pickles.
+
+    The memory tier holds at most ``maxsize`` entries and ``max_bytes`` of payload; the disk tier
+    (when ``directory`` is set) is trimmed to ``max_disk_bytes`` by evicting least recently used
+    files. Disk hits are promoted to memory. Values come back as fresh copies.
+    """
+
+    def __init__(self, maxsize: int = 64, max_bytes: int = 512 * 2**20,
+                 directory: Optional[str] = None, max_disk_bytes: int = 2 * 2**30):
+        self.maxsize = max(0, int(maxsize))
+        self.max_bytes = max(0, int(max_bytes))
+        self.directory = str(directory) if directory else None
+        self.max_disk_bytes = max(0, int(max_disk_bytes))
+        self._data: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    # ---------- lookup ----------
+    def get(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """(value, tier) on a hit ("memory" | "disk"), (None, None) on a miss."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+                self.hits["memory"] += 1
+                return _detach(item[0]), "memory"
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None, None
+            self.hits["disk"] += 1
+        self._memory_put(key, value)
+        return _detach(value), "disk"
+
+    def put(self, key: str, value: Any) -> None:
+        value = _freeze(_detach(value, own=True))
+        self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    # ---------- memory tier ----------
+    def _memory_put(self, key: str, value: Any) -> None:
+        size = _nbytes(value)
+        if self.maxsize <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+                _, (_, s) = self._data.popitem(last=False)
+                self._bytes -= s
+
+    # ---------- disk tier ----------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _disk_get(self, key: str) -> Optional[Any]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)
+            os.utime(path)          # recency for LRU eviction
+            return _freeze(value)
+        except FileNotFoundError:
+            return None
+        except Exception:           # truncated / foreign file: drop it
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _disk_put(self, key: str, value: Any) -> None:
+        if not self.directory or self.max_disk_bytes <= 0:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        files = []
+        for p in glob.glob(os.path.join(self.directory, "*.pkl")):
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        total = sum(f[1] for f in files)
+        for _, size, p in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(p)
+                total -= size
+            except OSError:
+                pass
+
+    # ---------- housekeeping ----------
+    def clear(self, disk: bool = False) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.hits = {"memory": 0, "disk": 0}
+            self.misses = 0
+        if disk and self.directory:
+            for p in glob.glob(os.path.join(self.directory, "*.pkl")):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": dict(self.hits), "misses": self.misses, "size": len(self._data),
+                "bytes": self._bytes, "maxsize": self.maxsize, "max_bytes": self.max_bytes,
+                "directory": self.directory, "max_disk_bytes": self.max_disk_bytes,
+            }
+
+
+_RESULT_CACHE = ResultCache()
+
+def configure_result_cache(
+    maxsize: int = 64, max_bytes: int = 512 * 2**20,
+    directory: Optional[str] = None, max_disk_bytes: int = 2 * 2**30,
+) -> ResultCache:
+    """Replace the process-wide result cache used when ``cfg.result_cache`` is on."""
+    global _RESULT_CACHE
+    _RESULT_CACHE = ResultCache(maxsize, max_bytes, directory, max_disk_bytes)
+    return _RESULT_CACHE
+
+def result_cache() -> ResultCache:
+    return _RESULT_CACHE
+
+def result_cache_info() -> Dict[str, Any]:
+    """Hit/miss counters and occupancy of the analyze/enrich result cache."""
+    return _RESULT_CACHE.info()
+
+def clear_result_cache(disk: bool = False) -> None:
+    """Empty the memory tier (and the disk tier with ``disk=True``)."""
+    _RESULT_CACHE.clear(disk=disk)
+
+def cache_key(*parts: Any) -> str:
+    blob = json.dumps(parts, sort_keys=True, default=repr)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=20).hexdigest()
@@ -0,0 +1,269 @@
+# qsi_cli.py
+"""
+Batch command line for scheduled runs (cron, Airflow, ...) without the Streamlit UI.
+
+    python -m qsi "data/*.csv" --config qsi.json --out-dir results/ --workers 4 --report runs.jsonl
+
+Each input file is analyzed by QSIEngine and (unless --no-enrich) diagnosed by
+EpistemicAnalytics.enrich, in parallel worker processes. One JSON line per file is written to the
+report stream as files finish, followed by a run record; a per-file timing table goes to stderr.
+
+Config file (JSON, or TOML on Python 3.11+):
+    {"engine": {<QSIConfig fields>}, "epistemic": {<EpistemicConfig fields>},
+     "groupby": "SKU", "format": "parquet", "enrich": true, "imports": ["my_models"]}
+``imports`` names modules to import first in every process (e.g. ones that register custom models).
+
+Exit codes: 0 all files succeeded, 1 at least one file failed, 2 usage / config error or no input.
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, fields
+from typing import Any, Dict, IO, List, Optional, Sequence
+import argparse
+import datetime as _dt
+import glob
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+import numpy as np
+import pandas as pd
+
+from .qsi_engine import QSIEngine, QSIConfig
+from .qsi_epistemic import EpistemicAnalytics, EpistemicConfig
+from .qsi_frame import QSIFrame
+
+EXIT_OK, EXIT_FAILED, EXIT_USAGE = 0, 1, 2
+_FORMATS = ("csv", "parquet", "arrow", "none")
+_CONFIG_KEYS = ("engine", "epistemic", "groupby", "format", "enrich", "imports")
+
+
+# ====================================================
+#                     Config file
+# ====================================================
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+    """Parse and check a CLI config file; unknown sections or dataclass fields raise ValueError."""
+    if not path:
+        return {}
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    if str(path).lower().endswith(".toml"):
+        import tomllib
+        cfg = tomllib.loads(raw.decode("utf-8"))
+    else:
+        cfg = json.loads(raw.decode("utf-8"))
+    if not isinstance(cfg, dict):
+        raise ValueError("Config file must hold an object / table at the top level.")
+    bad = sorted(set(cfg) - set(_CONFIG_KEYS))
+    if bad:
+        raise ValueError(f"Unknown config sections {bad}. Allowed: {list(_CONFIG_KEYS)}")
+    for section, cls in (("engine", QSIConfig), ("epistemic", EpistemicConfig)):
+        names = {f.name for f in fields(cls)}
+        bad = sorted(set(cfg.get(section) or {}) - names)
+        if bad:
+            raise ValueError(f"Unknown {section} options {bad}.")
+    return cfg
+
+def _epistemic_config(opts: Dict[str, Any]) -> EpistemicConfig:
+    opts = {k: tuple(v) if isinstance(v, list) else v for k, v in (opts or {}).items()}
+    return EpistemicConfig(**opts)
+
+
+# ====================================================
+#                   Per-file worker
+# ====================================================
+def _import_all(modules: Sequence[str]) -> None:
+    for m in modules:
+        importlib.import_module(m)
+
+def _output_path(path: str, out_dir: Optional[str], fmt: str) -> Optional[str]:
+    if fmt == "none":
+        return None
+    stem = os.path.splitext(os.path.basename(path))[0]
+    ext = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}[fmt]
+    return os.path.join(out_dir or os.path.dirname(os.path.abspath(path)), f"{stem}.qsi{ext}")
+
+def _read_input(path: str, cfg: QSIConfig, groupby: Optional[str]) -> pd.DataFrame | QSIFrame:
+    """CSV as a DataFrame; Parquet / Arrow IPC as a QSIFrame over the Arrow buffers."""
+    from .qsi_io import _fmt, read_table, frame_from_arrow
+    if _fmt(path) == "csv":
+        return pd.read_csv(path, float_precision="round_trip")
+    names = (cfg.col_date, cfg.col_fc, cfg.col_ac, cfg.col_cost)
+    return frame_from_arrow(read_table(path), segment=groupby, names=names)
+
+def run_file(
+    path: str,
+    engine: Dict[str, Any],
+    epistemic: Dict[str, Any],
+    groupby: Optional[str],
+    out_path: Optional[str],
+    enrich: bool = True,
+) -> Dict[str, Any]:
+    """Analyze (and enrich) one file; never raises. Returns its report record with stage timings."""
+    rec: Dict[str, Any] = {"type": "file", "file": path, "status": "ok", "output": None}
+    timings: Dict[str, float] = {}
+    t_all = t = time.perf_counter()
+    try:
+        cfg = QSIConfig(**engine)
+        data = _read_input(path, cfg.validate(), groupby)
+        timings["read"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        out, rep = QSIEngine(cfg).analyze(data, groupby=groupby)
+        timings["analyze"] = time.perf_counter() - t
+
+        if enrich and out is not None:
+            t = time.perf_counter()
+            rec["diagnostics"] = EpistemicAnalytics.enrich(out, _epistemic_config(epistemic))
+            timings["enrich"] = time.perf_counter() - t
+
+        if out_path is not None and out is not None:
+            from .qsi_io import FrameWriter
+            t = time.perf_counter()
+            os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+            with FrameWriter(out_path) as writer:
+                writer.write(out)
+            rec["output"] = out_path
+            timings["write"] = time.perf_counter() - t
+
+        summary = {k: v for k, v in rep["summary"].items() if k != "config"}
+        rec.update(rows=summary["n"], summary=summary, n_events=int(len(rep["events"])))
+        if "by_segment" in rep:
+            rec["by_segment"] = rep["by_segment"]
+        rec["flags"] = rep.get("flags", {})
+    except Exception as exc:
+        rec.update(status="error", error=f"{type(exc).__name__}: {exc}", traceback=traceback.format_exc())
+    timings["total"] = time.perf_counter() - t_all
+    rec["timings"] = timings
+    return rec
+
+
+# ====================================================
+#                    Report stream
+# ====================================================
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (pd.Timestamp, _dt.datetime, _dt.date)):
+        return obj.isoformat()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient="records")
+    return str(obj)
+
+def _emit(stream: IO[str], rec: Dict[str, Any]) -> None:
+    stream.write(json.dumps(rec, default=_json_default, allow_nan=True) + "\n")
+    stream.flush()
+
+def _timing_table(records: List[Dict[str, Any]], wall: float) -> str:
+    stages = ("read", "analyze", "enrich", "write", "total")
+    name_w = max([len("file")] + [len(os.path.basename(r["file"])) for r in records])
+    head = f"{'file':<{name_w}}  {'status':<6} {'rows':>9} " + " ".join(f"{s:>8}" for s in stages)
+    lines = [head, "-" * len(head)]
+    for r in records:
+        t = r["timings"]
+        lines.append(
+            f"{os.path.basename(r['file']):<{name_w}}  {r['status']:<6} {r.get('rows', 0):>9} "
+            + " ".join(f"{t[s]:>8.3f}" if s in t else f"{'-':>8}" for s in stages)
+        )
+    ok = sum(r["status"] == "ok" for r in records)
+    lines.append(f"{ok}/{len(records)} files ok, {sum(r.get('rows', 0) for r in records)} rows, {wall:.3f}s wall")
+    return "\n".join(lines)
+
+
+# ====================================================
+#                      Entry point
+# ====================================================
+def _is_result(path: str) -> bool:
+    """A result file this CLI writes (``<stem>.qsi.<ext>``)."""
+    return os.path.splitext(os.path.splitext(os.path.basename(path))[0])[1] == ".qsi"
+
+def expand_inputs(patterns: Sequence[str]) -> List[str]:
+    """Files matching any glob (``**`` recursive), sorted and de-duplicated. Earlier results
+    (``*.qsi.*``) are skipped, so a rerun over the same glob does not analyze its own output."""
+    found = {os.path.normpath(p) for pat in patterns for p in glob.glob(pat, recursive=True)
+             if os.path.isfile(p) and not _is_result(p)}
+    return sorted(found)
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m qsi", description="Batch QSI analysis over many files.")
+    p.add_argument("inputs", nargs="+", help="input files or globs (.csv, .parquet, .arrow)")
+    p.add_argument("-c", "--config", help="JSON/TOML config file (engine / epistemic sections)")
+    p.add_argument("-o", "--out-dir", help="directory for result files (default: next to each input)")
+    p.add_argument("-g", "--groupby", help="segment column (overrides the config file)")
+    p.add_argument("-f", "--format", choices=_FORMATS, help="result file format (default: csv; none = report only)")
+    p.add_argument("-w", "--workers", type=int, default=1, help="parallel worker processes (default: 1)")
+    p.add_argument("-r", "--report", default="-", help="JSON-lines report path ('-' = stdout)")
+    p.add_argument("--no-enrich", action="store_true", help="skip EpistemicAnalytics.enrich")
+    p.add_argument("--import", dest="imports", action="append", default=[],
+                   help="module to import in every process first (e.g. to register custom models)")
+    p.add_argument("-q", "--quiet", action="store_true", help="no timing table on stderr")
+    return p
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        cfg = load_config(args.config)
+        imports = list(cfg.get("imports") or []) + list(args.imports)
+        _import_all(imports)
+        engine = dict(cfg.get("engine") or {})
+        epistemic = dict(cfg.get("epistemic") or {})
+        groupby = args.groupby or cfg.get("groupby")
+        if groupby and "groupby" not in epistemic:
+            epistemic["groupby"] = groupby
+        fmt = args.format or cfg.get("format") or "csv"
+        if fmt not in _FORMATS:
+            raise ValueError(f"format must be one of {list(_FORMATS)}")
+        QSIConfig(**engine).validate()
+        _epistemic_config(epistemic)
+    except Exception as exc:
+        print(f"qsi: config error: {exc}", file=sys.stderr)
+        return EXIT_USAGE
+    enrich = bool(cfg.get("enrich", True)) and not args.no_enrich
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print(f"qsi: no input files match {list(args.inputs)}", file=sys.stderr)
+        return EXIT_USAGE
+    jobs = [(f, engine, epistemic, groupby, _output_path(f, args.out_dir, fmt), enrich) for f in files]
+    seen: Dict[str, str] = {}
+    for f, out in ((job[0], job[4]) for job in jobs):
+        if out is None:
+            continue
+        prev = seen.setdefault(os.path.normcase(os.path.abspath(out)), f)
+        if prev != f:
+            print(f"qsi: {prev} and {f} would both write {out}; use separate runs or --out-dir", file=sys.stderr)
+            return EXIT_USAGE
+
+    stream = sys.stdout if args.report == "-" else open(args.report, "w", encoding="utf-8")
+    records: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+    try:
+        workers = max(1, min(int(args.workers), len(jobs)))
+        if workers == 1:
+            for job in jobs:
+                records.append(run_file(*job))
+                _emit(stream, records[-1])
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_import_all, initargs=(imports,)) as pool:
+                futures = [pool.submit(run_file, *job) for job in jobs]
+                for fut in as_completed(futures):
+                    records.append(fut.result())
+                    _emit(stream, records[-1])
+        wall = time.perf_counter() - t0
+        records.sort(key=lambda r: r["file"])
+        failed = [r["file"] for r in records if r["status"] != "ok"]
+        _emit(stream, {
+            "type": "run", "files": len(records), "ok": len(records) - len(failed), "failed": failed,
+            "rows": sum(r.get("rows", 0) for r in records), "wall_seconds": wall, "workers": workers,
+            "engine_config": asdict(QSIConfig(**engine).validate()), "enrich": enrich, "format": fmt,
+        })
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    if not args.quiet:
+        print(_timing_table(records, wall), file=sys.stderr)
+    return EXIT_FAILED if failed else EXIT_OK
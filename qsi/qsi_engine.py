@@ -1,9 +1,28 @@
 from __future__ import annotations
 from dataclasses import dataclass, asdict, replace, field
-from typing import Dict, Any, Tuple, Optional, List, Callable
+from typing import Dict, Any, Tuple, Optional, List, Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import copy
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
 import numpy as np
 import pandas as pd
 
+from .qsi_kernels import get_kernels, SWEEP_OUT_WIDTH, ENSEMBLE_ACC_WIDTH, _USE_NUMBA
+from .qsi_window import RollingFeatures, RollingMoments, SortedWindow
+from .qsi_frame import QSIFrame
+from .qsi_cache import result_cache, cache_key, data_fingerprint, config_fingerprint, callable_token
+from . import qsi_trace as trace
+
 # ---------------- Cognize (optional) ----------------
 _USE_COGNIZE = False
 try:
@@ -21,7 +40,21 @@ except Exception:
 #            Custom Threshold Plug-in Registry
 # ====================================================
 CustomFn = Callable[[pd.Series, Dict[str, Any], pd.DataFrame], pd.Series]
-_CUSTOM_MODELS: Dict[str, CustomFn] = {}
+ArrayFn = Callable[..., np.ndarray]   # (drift, params, cols[, feats]) -> θ
+
+@dataclass(frozen=True)
+class _CustomModel:
+    fn: Callable[..., Any]
+    array: bool = False                 # array-native contract (register_array_model)
+    columns: Tuple[str, ...] = ()       # input columns handed to array models
+    streaming: bool = True              # θ at a row only needs the trailing window (QSIStream)
+    incremental: Optional[Callable[[Dict[str, Any]], Any]] = None   # params -> stepper with .update(drift) -> θ
+    features: bool = False              # fn also receives the run's RollingFeatures (segment view)
+    backfill: bool = False              # fn fills θ before its first defined value with that value
+
+_CUSTOM_MODELS: Dict[str, _CustomModel] = {}
+_REGISTRY_VERSION = itertools.count(1)      # bumped on every registration (engine spec caches check it)
+_registry_version = 0
 
 def register_custom_model(name: str, fn: CustomFn) -> None:
     """Register a custom threshold generator.
@@ -29,33 +62,195 @@ def register_custom_model(name: str, fn: CustomFn) -> None:
     """
     if not callable(fn):
         raise TypeError("custom model must be callable")
-    _CUSTOM_MODELS[str(name)] = fn
+    _CUSTOM_MODELS[str(name)] = _CustomModel(fn=fn)
+    _registry_changed()
+
+def register_array_model(
+    name: str, fn: ArrayFn, columns: Sequence[str] = (), streaming: bool = False,
+    incremental: Optional[Callable[[Dict[str, Any]], Any]] = None, features: bool = False,
+    backfill: bool = False,
+) -> None:
+    """Register an array-native custom threshold generator.
+    fn signature: (drift, params_dict, cols) -> θ, where drift and cols[c] for every declared column
+    are contiguous float64 arrays of one segment and θ is a float64 array of the same length.
+    ``streaming=True`` declares that θ at a row depends only on the trailing ``params["window"]``
+    rows, so QSIStream may evaluate the model on that window. ``incremental(params)`` may return a
+    stepper whose ``update(drift) -> θ`` gives the newest row's θ in O(1)-ish time instead (drift-only
+    models; implies streaming). With ``features=True`` fn is called as (drift, params, cols, feats)
+    and reads rolling window moments / quantiles from ``feats``, a qsi_window.RollingFeatures view
+    of the segment shared by the whole run. ``backfill=True`` declares that fn fills the rows before
+    its first defined θ with that θ (the built-ins do), so QSIStream holds those rows until it is
+    known; otherwise they are scored as they arrive, NaN θ included. fn must be pure: results are
+    cached by (model, params, inputs).
+    """
+    if not callable(fn):
+        raise TypeError("custom model must be callable")
+    if incremental is not None and columns:
+        raise ValueError("incremental steppers only see drift; drop `columns` or `incremental`.")
+    if isinstance(columns, str):
+        columns = (columns,)
+    _CUSTOM_MODELS[str(name)] = _CustomModel(
+        fn=fn, array=True, columns=tuple(str(col) for col in columns),
+        streaming=bool(streaming) or incremental is not None, incremental=incremental,
+        features=bool(features), backfill=bool(backfill),
+    )
+    _registry_changed()
+
+def _registry_changed() -> None:
+    global _registry_version
+    _registry_version = next(_REGISTRY_VERSION)
+    _THETA_CACHE.clear()
+
+@functools.lru_cache(maxsize=64)
+def _model_token(spec: _CustomModel) -> Tuple[str, Any]:
+    """Cache-key identity of a registered model (bytecode hashes are computed once per spec)."""
+    return callable_token(spec.fn), spec.incremental and callable_token(spec.incremental)
 
 def list_custom_models() -> List[str]:
     """List available custom models (including any app-registered enterprise statics)."""
     return sorted(_CUSTOM_MODELS.keys())
 
 
+# ---------- θ result cache (array models) ----------
+class _ThetaCache:
+    """Thread-safe LRU of computed θ arrays keyed by (model, params, input fingerprint), holding at
+    most ``maxsize`` arrays and ``max_bytes`` of them; an array larger than the budget is not kept."""
+
+    def __init__(self, maxsize: int = 32, max_bytes: int = 64 * 2**20):
+        self.maxsize = int(maxsize)
+        self.max_bytes = max(0, int(max_bytes))
+        self.nbytes = 0
+        self._data: "OrderedDict[Tuple[Any, ...], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[np.ndarray]:
+        with self._lock:
+            theta = self._data.get(key)
+            if theta is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return theta.copy()
+
+    def put(self, key: Tuple[Any, ...], theta: np.ndarray) -> None:
+        if self.maxsize <= 0 or theta.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._data[key] = theta.copy()
+            self.nbytes += theta.nbytes
+            while len(self._data) > self.maxsize or self.nbytes > self.max_bytes:
+                self.nbytes -= self._data.popitem(last=False)[1].nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+            self.hits = self.misses = 0
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize,
+                    "nbytes": self.nbytes, "max_bytes": self.max_bytes}
+
+_THETA_CACHE = _ThetaCache()
+
+
+class _FeatureStores:
+    """Thread-safe LRU of RollingFeatures keyed by (drift fingerprint, kernel), shared by an engine
+    and its per-call copies so reruns on the same drift (param sweeps) reuse computed windows."""
+
+    def __init__(self, maxsize: int = 4):
+        self.maxsize = int(maxsize)
+        self._data: "OrderedDict[Tuple[str, str], RollingFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str], build: Callable[[], RollingFeatures]) -> RollingFeatures:
+        with self._lock:
+            feats = self._data.get(key)
+            if feats is not None:
+                self._data.move_to_end(key)
+                return feats
+        feats = build()   # outside the lock: other threads keep going; a racing build is identical
+        with self._lock:
+            feats = self._data.setdefault(key, feats)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return feats
+
+def theta_cache_info() -> Dict[str, int]:
+    """Hit/miss counters and occupancy of the custom-θ result cache."""
+    return _THETA_CACHE.info()
+
+def clear_theta_cache(maxsize: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+    """Empty the custom-θ result cache, optionally resizing it (entries and/or bytes; 0 disables it)."""
+    _THETA_CACHE.clear()
+    if maxsize is not None:
+        _THETA_CACHE.maxsize = max(0, int(maxsize))
+    if max_bytes is not None:
+        _THETA_CACHE.max_bytes = max(0, int(max_bytes))
+
+def _fingerprint(*arrays: np.ndarray) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.dtype.str}{a.shape}".encode("ascii"))
+        h.update(a.data)
+    return h.hexdigest()
+
+
 # ---------- Built-in examples (safe, dependency-free) ----------
-def _theta_rolling_quantile(drift: pd.Series, params: Dict[str, Any], df: pd.DataFrame) -> pd.Series:
+def _theta_rolling_quantile(
+    drift: np.ndarray, params: Dict[str, Any], cols: Dict[str, np.ndarray], feats: RollingFeatures,
+) -> np.ndarray:
     win = int(params.get("window", 14))
     q = float(params.get("q", 0.80))
-    s = pd.Series(pd.to_numeric(drift, errors="coerce")).astype(float)
-    th = s.rolling(win, min_periods=max(2, win // 2)).quantile(q)
-    return th.fillna(method="backfill").astype(float)
+    th = feats.quantile(win, q, min_periods=max(2, win // 2))
+    return pd.Series(th).bfill().to_numpy(float)
 
-def _theta_window_std_k(drift: pd.Series, params: Dict[str, Any], df: pd.DataFrame) -> pd.Series:
+class _RollingQuantileStep:
+    """Streaming twin of ``_theta_rolling_quantile`` (before backfill)."""
+
+    def __init__(self, params: Dict[str, Any]):
+        win = int(params.get("window", 14))
+        self.q = float(params.get("q", 0.80))
+        self.window = SortedWindow(win, min_periods=max(2, win // 2))
+
+    def update(self, drift: float) -> float:
+        self.window.push(drift)
+        return self.window.quantile(self.q)
+
+def _theta_window_std_k(
+    drift: np.ndarray, params: Dict[str, Any], cols: Dict[str, np.ndarray], feats: RollingFeatures,
+) -> np.ndarray:
     win = int(params.get("window", 14))
     k   = float(params.get("k", 2.5))
-    s = pd.Series(pd.to_numeric(drift, errors="coerce")).astype(float)
-    mu  = s.rolling(win, min_periods=max(2, win // 2)).mean()
-    std = s.rolling(win, min_periods=max(2, win // 2)).std(ddof=0)
-    th = (mu + k * std)
-    return th.fillna(method="backfill").astype(float)
+    mu, var = feats.moments(win, min_periods=max(2, win // 2), ddof=0)
+    th = mu + k * np.sqrt(var)
+    return pd.Series(th).bfill().to_numpy(float)
+
+class _WindowStdStep:
+    """Streaming twin of ``_theta_window_std_k`` (before backfill)."""
+
+    def __init__(self, params: Dict[str, Any]):
+        win = int(params.get("window", 14))
+        self.k = float(params.get("k", 2.5))
+        self.moments = RollingMoments(win, min_periods=max(2, win // 2), ddof=0)
+
+    def update(self, drift: float) -> float:
+        mu, var = self.moments.push(drift)
+        return mu + self.k * math.sqrt(var)
 
 # Register built-ins at import time
-register_custom_model("rolling_quantile", _theta_rolling_quantile)
-register_custom_model("window_std_k", _theta_window_std_k)
+register_array_model("rolling_quantile", _theta_rolling_quantile, incremental=_RollingQuantileStep, features=True,
+                     backfill=True)
+register_array_model("window_std_k", _theta_window_std_k, incremental=_WindowStdStep, features=True, backfill=True)
 
 
 # ====================================================
@@ -76,6 +271,7 @@ class QSIConfig:
     c: float = 0.25           # memory accumulation factor
     sigma: float = 5.0        # Gaussian noise on Θ
     seed: int = 123
+    seed_by_segment: bool = False   # derive each segment's seed from (seed, segment key) instead of sharing it
 
     # EWMA alternative
     use_ewma: bool = False
@@ -91,6 +287,11 @@ class QSIConfig:
     use_graph: bool = False           # multi-node coupling by segment (Cognize only)
     graph_damping: float = 0.5
     max_graph_depth: int = 1
+    kernel: str = "auto"              # recurrence kernel: "auto" | "numba" | "numpy"
+    n_workers: int = 1                # >1: shard grouped analysis across a process pool
+    result_cache: bool = False        # memoize analyze() by (input content, config) in qsi_cache
+    output: str = "full"              # output profile: "full" | "compact" | "summary_only"
+    timings: bool = False             # per-stage wall-clock / row counts in report["timings"]
 
     # Cognize meta-policy
     epsilon: float = 0.10
@@ -123,7 +324,10 @@ class QSIConfig:
             cooldown_steps=int(max(0, self.cooldown_steps)),
             graph_damping=clamp(self.graph_damping, 0.0, 1.0),
             max_graph_depth=int(max(0, self.max_graph_depth)),
+            n_workers=int(max(1, self.n_workers)),
             seed=int(self.seed),
+            kernel=(str(self.kernel).lower() if str(self.kernel).lower() in ("auto", "numba", "numpy") else "auto"),
+            output=(str(self.output).lower() if str(self.output).lower() in _OUTPUT_PROFILES else "full"),
             custom_params=cp,
         )
 
@@ -146,26 +350,69 @@ class QSIEngine:
 
     API:
         df_out, report = QSIEngine(cfg).analyze(df, groupby=None or "SKU", overrides={...})
+    ``df`` may also be a QSIFrame (validated once, no copies); the output is then a QSIFrame too.
+
+    Output profiles (cfg.output): "full" (default), "compact" (float32 result columns, bool rupture,
+    categorical segment; the report is computed at full precision first) and "summary_only"
+    (df_out is None: only totals, per-segment aggregates and rupture events are kept).
+
+    Instrumentation: with cfg.timings (or a ``tracer``) the report gains "timings" — wall-clock and
+    rows per stage (prep, layout, theta, noise, recurrence, sigmoid, report, ...), per segment where
+    work is done segment by segment (custom θ, Cognize) and per plug-in. ``tracer(event)`` receives
+    every record as it happens ({"kind", "name", "seconds", "rows"}).
+
+    Calls never mutate the engine: ``overrides`` apply to a per-call copy of the config (validated
+    configs are cached per distinct overrides), so one instance can serve many threads at once.
     """
 
-    def __init__(self, config: Optional[QSIConfig] = None):
+    def __init__(self, config: Optional[QSIConfig] = None, tracer: Optional[trace.Tracer] = None):
         self.cfg = (config or QSIConfig()).validate()
+        self.tracer = tracer
+        self._features = _FeatureStores(_FEATURE_STORES_MAX)            # rolling-feature stores by drift
+        self._configs: Dict[str, Tuple[QSIConfig, QSIConfig]] = {}       # canonical overrides -> (base, config)
+        self._spec: Optional[Tuple[str, int, _CustomModel]] = None      # (model, registry version, spec)
 
     # ----------------- Public entrypoint -----------------
     def analyze(
         self,
-        df: pd.DataFrame,
+        df: pd.DataFrame | QSIFrame,
         groupby: Optional[str] = None,
         overrides: Optional[Dict[str, Any]] = None,
-    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-
-        # Apply dynamic overrides from UI (epsilon, promote_margin, EWMA α,k, etc. + custom model knobs)
-        if overrides:
-            cfg_dict = asdict(self.cfg)
-            cfg_dict.update({k: v for k, v in overrides.items() if k in cfg_dict})
-            self.cfg = QSIConfig(**cfg_dict).validate()
+    ) -> Tuple[pd.DataFrame | QSIFrame, Dict[str, Any]]:
+        engine = self._for_call(overrides)
+        if engine is not self:
+            return engine.analyze(df, groupby)
+        with trace.timing(self.cfg.timings, self.tracer) as timer:
+            if not self.cfg.result_cache:
+                out, rep = self._analyze(df, groupby)
+            else:
+                cache = result_cache()
+                with trace.stage("cache_lookup", len(df)):
+                    key = self._result_key(df, groupby)
+                    hit, tier = cache.get(key)
+                if hit is not None:
+                    out, rep = hit
+                else:
+                    out, rep = self._analyze(df, groupby)
+                    with trace.stage("cache_store"):
+                        cache.put(key, (out, rep))
+                rep["cache"] = {"hit": hit is not None, "tier": tier, "key": key}
+            if timer is not None:
+                rep["timings"] = timer.report()
+            elif self.cfg.result_cache:
+                rep.pop("timings", None)          # cached reports are shared objects
+        return out, rep
 
-        df = self._prep(df)
+    def _analyze(
+        self, df: pd.DataFrame | QSIFrame, groupby: Optional[str],
+    ) -> Tuple[pd.DataFrame | QSIFrame, Dict[str, Any]]:
+        as_frame = isinstance(df, QSIFrame)
+        segment = df.segment if as_frame else None
+        if self.cfg.output == "summary_only" and self._array_path_ok(bool(groupby)):
+            if not as_frame or groupby in (None, segment):
+                return None, self._analyze_summary(df, groupby)
+        with trace.stage("prep", len(df)):
+            df = self._prep(df)
 
         # Decide path
         use_cog = self.cfg.cognize_active
@@ -177,20 +424,13 @@ class QSIEngine:
 
         if groupby and use_cog and self.cfg.use_graph:
             out, rep = self._analyze_cognize_graph(df, groupby)
+        elif groupby and self.cfg.n_workers > 1:
+            with trace.stage("parallel", len(df)):
+                out, rep = self._analyze_parallel(df, groupby, use_cog)
+        elif groupby and not use_cog:
+            out, rep = self._analyze_segmented(df, groupby)
         elif groupby:
-            parts: List[pd.DataFrame] = []
-            by_seg: Dict[str, Any] = {}
-            for seg, sub in df.groupby(groupby, sort=True):
-                o, _ = (self._analyze_cognize(sub) if use_cog else self._analyze_native(sub))
-                o[groupby] = seg
-                parts.append(o)
-                by_seg[str(seg)] = {
-                    "n": int(len(o)),
-                    "ruptures": int(o["rupture"].sum()),
-                    "loss": float(o["loss"].sum()),
-                }
-            out = pd.concat(parts, ignore_index=True)
-            rep = self._make_report(out, engine=("cognize" if use_cog else self._engine_label()), by_segment=by_seg)
+            out, rep = self._analyze_cognize_groups(df, groupby)
         else:
             out, rep = (self._analyze_cognize(df) if use_cog else self._analyze_native(df))
 
@@ -200,22 +440,433 @@ class QSIEngine:
         rep["flags"]["cognize_requested"] = self.cfg.want_cognize
         if fallback_note:
             rep["flags"][fallback_note] = True
+        if self.cfg.kernel == "numba" and not _USE_NUMBA and "kernel" in rep["flags"]:
+            rep["flags"]["numba_unavailable_fallback"] = True
+
+        with trace.stage("output", len(out)):
+            if as_frame:
+                out = self._to_frame(out, groupby or segment)
+            out = self._apply_profile(out, groupby or segment)
+        return out, rep
+
+    def _result_key(self, df: pd.DataFrame | QSIFrame, groupby: Optional[str]) -> str:
+        """Result-cache key: input content, canonical config, grouping, the custom model's code and
+        which optional engines are installed."""
+        spec = self._custom_spec()
+        model = None if spec is None else list(_model_token(spec))
+        return cache_key("analyze", data_fingerprint(df), config_fingerprint(replace(self.cfg, timings=False)), groupby, model,
+                         _USE_COGNIZE, _USE_NUMBA)
+
+    # ----------------- Array entrypoint -----------------
+    def analyze_arrays(
+        self,
+        dates: Any,
+        forecast: Any,
+        actual: Any,
+        cost: Any,
+        segments: Any = None,
+        columns: Optional[Dict[str, Any]] = None,
+        assume_sorted: bool = False,
+        overrides: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[QSIFrame, Dict[str, Any]]:
+        """
+        ``analyze`` for callers that already hold NumPy arrays, without building a DataFrame.
+        Same validation, row order and results as ``analyze`` on the equivalent frame grouped by
+        ``segments`` (one key per row, stored as cfg.col_segment or "segment"); ``columns`` carries
+        extra arrays, e.g. those a custom model declares. ``assume_sorted`` asserts date order: rows
+        are never permuted and unordered input raises instead.
+
+        Returns (QSIFrame with drift/E/Theta/rupture/rupture_prob/loss columns — None for the
+        "summary_only" profile — and report). Native, EWMA and array-model runs stay on arrays end
+        to end; Cognize, Series custom models and process pools go through ``analyze``.
+        """
+        engine = self._for_call(overrides)
+        if engine is not self:
+            return engine.analyze_arrays(dates, forecast, actual, cost, segments, columns, assume_sorted)
+        c = self.cfg
+        with trace.timing(c.timings, self.tracer) as timer:
+            with trace.stage("prep", len(forecast)):
+                frame = QSIFrame.from_arrays(
+                    dates, forecast, actual, cost, segments=segments, columns=columns,
+                    names=(c.col_date, c.col_fc, c.col_ac, c.col_cost), segment=c.col_segment,
+                    assume_sorted=assume_sorted,
+                )
+            grouped = frame.segment is not None
+            if not self._array_path_ok(grouped):
+                return self.analyze(frame, groupby=frame.segment)
+            out, rep = self._analyze_frame(frame, grouped)
+            with trace.stage("output", len(out)):
+                out = self._apply_profile(out, frame.segment)
+            if timer is not None:
+                rep["timings"] = timer.report()
+        return out, rep
+
+    def _array_path_ok(self, grouped: bool) -> bool:
+        """Whether a run can stay on arrays (no active Cognize, Series custom model or process pool);
+        Cognize requested but not installed falls back to the native recurrence, which arrays run."""
+        c, spec = self.cfg, self._custom_spec()
+        return not (c.cognize_active or (spec is not None and not spec.array) or (grouped and c.n_workers > 1))
 
+    def _analyze_frame(self, frame: QSIFrame, grouped: bool) -> Tuple[QSIFrame, Dict[str, Any]]:
+        """Native / EWMA / array-model run over a date-sorted QSIFrame (grouped by its segment)."""
+        c = self.cfg
+        by_seg = keys = None
+        if grouped:
+            with trace.stage("layout", len(frame)):
+                frame, offsets, counts = frame.segment_layout()
+            keys = frame.categories
+        else:
+            offsets = np.array([0, len(frame)], dtype=np.int64)
+        res, engine, kernel = self._native_core(frame, offsets, keys=keys)
+        out = frame.with_columns(**res)
+        if grouped:
+            by_seg = self._segment_totals(res, offsets, keys, counts)
+        with trace.stage("report", len(out)):
+            rep = self._make_report(out, engine=engine, by_segment=by_seg)
+        rep["flags"] = {
+            "kernel": kernel,
+            "cognize_available": _USE_COGNIZE,
+            "cognize_requested": c.want_cognize,
+        }
+        if c.want_cognize and not _USE_COGNIZE:
+            rep["flags"]["cognize_unavailable_fallback"] = True
+        if c.kernel == "numba" and not _USE_NUMBA:
+            rep["flags"]["numba_unavailable_fallback"] = True
         return out, rep
 
+    def _analyze_summary(self, df: pd.DataFrame | QSIFrame, groupby: Optional[str]) -> Dict[str, Any]:
+        """"summary_only" run: only the columns the recurrence, grouping and events need are prepped
+        and the result columns stay arrays; no output frame is assembled."""
+        c = self.cfg
+        if isinstance(df, QSIFrame):
+            return self._analyze_frame(df.sort_by_date(), groupby is not None)[1]
+        if groupby and groupby not in df.columns:
+            raise ValueError(f"groupby '{groupby}' not found in DataFrame.")
+        spec = self._custom_spec()
+        core = [c.col_date, c.col_fc, c.col_ac, c.col_cost]
+        extra = list(spec.columns) if spec is not None else []
+        if c.col_segment and c.col_segment in df.columns:
+            extra.append(c.col_segment)
+        extra = [k for k in dict.fromkeys(extra) if k in df.columns and k not in core and k != groupby]
+        with trace.stage("prep", len(df)):
+            slim = self._prep(df[[k for k in core if k in df.columns] + ([groupby] if groupby else []) + extra])
+            frame = QSIFrame.from_pandas(
+                slim, segment=groupby, columns=extra,
+                col_date=c.col_date, col_fc=c.col_fc, col_ac=c.col_ac, col_cost=c.col_cost, sort=False,
+            )
+        return self._analyze_frame(frame, groupby is not None)[1]
+
+    def _apply_profile(self, out: Any, segment: Optional[str]) -> Any:
+        """Shape a finished output per cfg.output (after the report was computed at full precision)."""
+        profile = self.cfg.output
+        if out is None or profile == "full":
+            return out
+        if profile == "summary_only":
+            return None
+        floats = {k: np.float32 for k in _RESULT_FLOATS if k in out}
+        if isinstance(out, QSIFrame):
+            return out.with_columns(
+                **{k: np.asarray(out[k], dtype=np.float32) for k in floats},
+                **({"rupture": np.asarray(out["rupture"], dtype=bool)} if "rupture" in out else {}),
+            )
+        out = out.astype({**floats, **({"rupture": bool} if "rupture" in out.columns else {})})
+        for seg in dict.fromkeys(k for k in (segment, self.cfg.col_segment) if k):
+            if seg in out.columns and not isinstance(out[seg].dtype, pd.CategoricalDtype):
+                out[seg] = out[seg].astype("category")
+        return out
+
+    # ----------------- Out-of-core entrypoint -----------------
+    def analyze_path(
+        self,
+        path: str,
+        out_path: Optional[str],
+        groupby: Optional[str] = None,
+        chunksize: int = 100_000,
+        overrides: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Analyze a CSV/Parquet file larger than memory. Input must be date-sorted (per segment at least);
+        it is read ``chunksize`` rows at a time, segment state carries across chunk boundaries via
+        QSIStream and scored rows are appended to ``out_path`` (.csv or .parquet) as they are produced.
+        Peak memory is bounded by the chunk size plus per-segment state and rupture events.
+        The "compact" profile writes compact chunks; "summary_only" writes nothing (``out_path`` may
+        be None) and keeps only the running aggregates and events.
+        Returns the report (``median_drift`` is None since it needs every row).
+        """
+        from .qsi_stream import QSIStream, _RunningReport
+        from .qsi_io import iter_frames, FrameWriter
+
+        engine = self._for_call(overrides)
+        if engine is not self:
+            return engine.analyze_path(path, out_path, groupby, chunksize)
+        write = self.cfg.output != "summary_only"
+        if write and out_path is None:
+            raise ValueError("out_path is required unless cfg.output == 'summary_only'.")
+        stream = QSIStream(self.cfg, groupby=groupby)
+        running = _RunningReport(self.cfg, groupby)
+        chunks = 0
+        with (FrameWriter(out_path) if write else contextlib.nullcontext()) as writer:
+            for chunk in iter_frames(path, chunksize=chunksize):
+                out = stream.update(chunk)
+                running.add(out)
+                if writer is not None:
+                    writer.write(self._apply_profile(out, groupby))
+                chunks += 1
+            tail = stream.flush()
+            running.add(tail)
+            if writer is not None:
+                writer.write(self._apply_profile(tail, groupby))
+
+        rep = running.report(engine=stream.engine_label)
+        rep["flags"] = {
+            "cognize_available": _USE_COGNIZE,
+            "cognize_requested": self.cfg.want_cognize,
+            "out_of_core": True,
+        }
+        if self.cfg.want_cognize and not _USE_COGNIZE:
+            rep["flags"]["cognize_unavailable_fallback"] = True
+        if not stream.use_cognize:
+            rep["flags"]["kernel"] = stream._kern.name
+        rep["io"] = {"input": str(path), "output": str(out_path) if write else None, "chunks": chunks,
+                     "rows_written": writer.rows if writer is not None else 0}
+        return rep
+
+    # ----------------- Vectorized parameter sweep -----------------
+    def sweep(
+        self,
+        df: pd.DataFrame,
+        grid: Any,
+        groupby: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Evaluate many QSIConfig variants in one pass over a shared drift array, vectorized across the
+        config axis (native / EWMA / custom θ recurrences; Cognize is not swept).
+
+        grid: {param: [values, ...]} for the Cartesian product, or a list of override dicts.
+              Sweepable: base_threshold, a, c, sigma, ewma_alpha, ewma_k, use_ewma.
+        Returns one row per variant (in grid order): the swept params (after validate()),
+        n, ruptures, total_loss, mean_margin. Noise uses cfg.seed exactly as ``analyze`` does.
+        """
+        variants = _expand_grid(grid)
+        bad = sorted({k for v in variants for k in v} - set(_SWEEP_PARAMS))
+        if bad:
+            raise ValueError(f"Cannot sweep {bad}. Sweepable: {list(_SWEEP_PARAMS)}")
+        base = asdict(self.cfg)
+        cfgs = [QSIConfig(**{**base, **v}).validate() for v in variants]
+
+        df = self._prep(df)
+        keys = None
+        if groupby:
+            df, offsets, keys, _ = self._segment_layout(df, groupby)
+        else:
+            offsets = np.array([0, len(df)], dtype=np.int64)
+        c, kern = self.cfg, get_kernels(self.cfg.kernel)
+        drift = np.abs(df[c.col_fc].to_numpy(float) - df[c.col_ac].to_numpy(float))
+        cost = df[c.col_cost].to_numpy(float)
+
+        K = len(cfgs)
+        agg = np.zeros((K, SWEEP_OUT_WIDTH))
+        if c.custom_model:
+            # θ is fixed by the custom model; only the (output-neutral) memory factor could vary
+            theta = self._custom_theta_segmented(df, drift, offsets)
+            hit = drift > theta
+            agg[:] = [float(np.sum(np.where(hit, drift * cost, 0.0))), float(hit.sum()), float(np.sum(drift - theta))]
+        else:
+            ew = np.array([v.use_ewma for v in cfgs], dtype=bool)
+            idx = np.flatnonzero(~ew)
+            if len(idx):
+                col = lambda name: np.array([getattr(cfgs[i], name) for i in idx], dtype=float)
+                sig = col("sigma")
+                z = self._noise_segmented(offsets, keys, sigma=1.0) if (sig > 0).any() else np.empty(0)
+                part = np.zeros((len(idx), SWEEP_OUT_WIDTH))
+                kern.sweep_native(drift, cost, z, offsets, col("base_threshold"), col("a"), col("c"), sig, part)
+                agg[idx] = part
+            idx = np.flatnonzero(ew)
+            if len(idx):
+                col = lambda name: np.array([getattr(cfgs[i], name) for i in idx], dtype=float)
+                part = np.zeros((len(idx), SWEEP_OUT_WIDTH))
+                kern.sweep_ewma(drift, cost, offsets, col("ewma_alpha"), col("ewma_k"), part)
+                agg[idx] = part
+
+        n = len(drift)
+        swept = list(dict.fromkeys(k for v in variants for k in v))
+        table = pd.DataFrame({k: [getattr(v, k) for v in cfgs] for k in swept})
+        table["n"] = n
+        table["ruptures"] = agg[:, 1].astype(np.int64)
+        table["total_loss"] = agg[:, 0]
+        table["mean_margin"] = agg[:, 2] / n if n else np.nan
+        return table
+
+    # ----------------- Monte Carlo ensemble of the noisy native θ -----------------
+    def ensemble(
+        self,
+        df: pd.DataFrame,
+        n_paths: int = 100,
+        groupby: Optional[str] = None,
+        quantiles: Sequence[float] = (0.05, 0.5, 0.95),
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Simulate ``n_paths`` noise realizations of the native threshold in one vectorized pass.
+
+        Path k draws its noise exactly as ``analyze`` would with seed ``report["paths"]["seed"][k]``
+        (path 0 uses cfg.seed; seed_by_segment applies per path), so any single path can be replayed.
+        Rows are processed in blocks across the path axis, bounding memory to ~n_paths x block rows.
+
+        Returns (out, report):
+          out    — input columns plus drift, rupture_freq (share of paths rupturing), expected_loss
+                   and Theta_qXX / E_qXX quantile bands across paths
+          report — summary, loss_distribution / ruptures_distribution (over paths), per-path totals,
+                   by_segment (when grouped) and flags
+        """
+        c = self.cfg
+        if c.custom_model or c.use_ewma:
+            raise ValueError("ensemble() simulates the noisy native threshold; custom-model and EWMA θ are deterministic.")
+        n_paths = int(n_paths)
+        if n_paths < 1:
+            raise ValueError("n_paths must be >= 1.")
+        qs = sorted({float(q) for q in quantiles})
+        if any(not 0.0 <= q <= 1.0 for q in qs):
+            raise ValueError("quantiles must lie in [0, 1].")
+
+        df = self._prep(df)
+        keys = None
+        if groupby:
+            df, offsets, keys, _ = self._segment_layout(df, groupby)
+        else:
+            offsets = np.array([0, len(df)], dtype=np.int64)
+        kern = get_kernels(c.kernel)
+        drift = np.abs(df[c.col_fc].to_numpy(float) - df[c.col_ac].to_numpy(float))
+        cost = df[c.col_cost].to_numpy(float)
+
+        n, N, S = len(drift), n_paths, len(offsets) - 1
+        seeds = [c.seed] + [_stable_seed(c.seed, f"path:{k}") for k in range(1, N)]
+        by_key = c.seed_by_segment and keys is not None
+        lengths = np.diff(offsets)
+        max_len = int(lengths.max()) if S else 0
+        # Shared-seed noise is the same for every segment: draw each path's stream once when it fits
+        shared = None
+        if c.sigma > 0 and not by_key and N * max_len <= _ENSEMBLE_SHARED_MAX:
+            shared = np.empty((max_len, N))
+            for k, sd in enumerate(seeds):
+                shared[:, k] = np.random.default_rng(sd).normal(0.0, c.sigma, max_len)
+
+        rows = max(1, _ENSEMBLE_BLOCK // N)
+        freq = np.empty(n)
+        bands = np.empty((2, len(qs), n))               # [Theta, E] x quantile x row
+        acc = np.zeros((S, N, ENSEMBLE_ACC_WIDTH))      # per segment, per path: [loss, ruptures]
+        for j in range(S):
+            s, e = int(offsets[j]), int(offsets[j + 1])
+            mem = np.zeros(N)
+            gens = None
+            if c.sigma > 0 and shared is None:
+                gens = [np.random.default_rng(_stable_seed(sd, keys[j]) if by_key else sd) for sd in seeds]
+            for b0 in range(s, e, rows):
+                b1 = min(e, b0 + rows)
+                if gens is not None:
+                    z = np.empty((b1 - b0, N))
+                    for k, g in enumerate(gens):
+                        z[:, k] = g.normal(0.0, c.sigma, b1 - b0)
+                elif shared is not None:
+                    z = shared[b0 - s:b1 - s]
+                else:
+                    z = np.zeros((b1 - b0, N))
+                Theta, E = np.empty((b1 - b0, N)), np.empty((b1 - b0, N))
+                hits = np.zeros(b1 - b0, dtype=np.int64)
+                kern.ensemble_native(drift[b0:b1], cost[b0:b1], z, c.base_threshold, c.a, c.c,
+                                     mem, Theta, E, hits, acc[j])
+                freq[b0:b1] = hits / N
+                if qs:
+                    bands[0, :, b0:b1] = np.quantile(Theta, qs, axis=1)
+                    bands[1, :, b0:b1] = np.quantile(E, qs, axis=1)
+
+        out = df.copy()
+        out["drift"] = drift
+        out["rupture_freq"] = freq
+        out["expected_loss"] = freq * drift * cost
+        for i, q in enumerate(qs):
+            out[f"Theta_{_q_label(q)}"] = bands[0, i]
+        for i, q in enumerate(qs):
+            out[f"E_{_q_label(q)}"] = bands[1, i]
+
+        total = acc.sum(axis=0)
+        report: Dict[str, Any] = {
+            "summary": {
+                "n": int(n), "n_paths": N, "engine": "native-ensemble",
+                "mean_rupture_freq": float(freq.mean()) if n else 0.0,
+                "expected_ruptures": float(total[:, 1].mean()),
+                "expected_total_loss": float(total[:, 0].mean()),
+                "config": asdict(c),
+            },
+            "loss_distribution": _distribution(total[:, 0], qs),
+            "ruptures_distribution": _distribution(total[:, 1], qs),
+            "paths": {
+                "seed": np.asarray(seeds, dtype=np.int64),
+                "total_loss": total[:, 0],
+                "ruptures": total[:, 1].astype(np.int64),
+            },
+            "flags": {"kernel": kern.name, "shared_noise": shared is not None},
+        }
+        if groupby:
+            report["by_segment"] = {
+                k: {
+                    "n": int(lengths[j]),
+                    "expected_ruptures": float(acc[j, :, 1].mean()),
+                    "expected_loss": float(acc[j, :, 0].mean()),
+                    "loss_quantiles": {_q_label(q): float(v) for q, v in zip(qs, np.quantile(acc[j, :, 0], qs))} if qs else {},
+                }
+                for j, k in enumerate(keys)
+            }
+        return out, report
+
+    # ----------------- Overrides -----------------
+    def _for_call(self, overrides: Optional[Dict[str, Any]]) -> "QSIEngine":
+        """This engine, or a shallow copy bound to cfg + overrides (UI knobs: epsilon, promote_margin,
+        EWMA α,k, custom model params, ...). Unknown keys are ignored; ``self`` is never changed."""
+        if not overrides:
+            return self
+        key = json.dumps(overrides, sort_keys=True, default=repr)
+        hit = self._configs.get(key)
+        if hit is not None and hit[0] == self.cfg:   # stale if self.cfg was reassigned since
+            cfg = hit[1]
+        else:
+            cfg_dict = asdict(self.cfg)
+            cfg_dict.update({k: v for k, v in overrides.items() if k in cfg_dict})
+            cfg = QSIConfig(**cfg_dict).validate()
+            if len(self._configs) >= _OVERRIDE_CONFIGS_MAX:
+                self._configs = {}
+            self._configs[key] = (self.cfg, cfg)
+        if cfg == self.cfg:
+            return self
+        engine = copy.copy(self)
+        engine.cfg = cfg
+        engine._configs = {}   # its base is cfg, not self.cfg
+        engine._spec = None
+        return engine
+
+    # ----------------- Seeds -----------------
+    def _segment_seed(self, key: Any) -> int:
+        """Seed for one segment: cfg.seed, or a stable hash of (cfg.seed, key) when seed_by_segment.
+        Independent of process, shard and worker count."""
+        if not self.cfg.seed_by_segment or key is None:
+            return self.cfg.seed
+        return _stable_seed(self.cfg.seed, key)
+
     # ----------------- Which label for non-cognize path -----------------
     def _engine_label(self) -> str:
         return "ewma" if self.cfg.use_ewma else "native"
 
     # ----------------- Validation / prep -----------------
-    def _prep(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _prep(self, df: pd.DataFrame | QSIFrame) -> pd.DataFrame:
         c = self.cfg
+        if isinstance(df, QSIFrame):
+            # validated at construction: only a (stable) date sort if needed, then a view of its buffers
+            return df.sort_by_date().to_pandas(names=(c.col_date, c.col_fc, c.col_ac, c.col_cost))
         need = [c.col_date, c.col_fc, c.col_ac, c.col_cost]
         miss = [x for x in need if x not in df.columns]
         if miss:
             raise ValueError(f"Missing columns: {miss}. Required: {need}")
         out = df.copy()
-        if not np.issubdtype(out[c.col_date].dtype, np.datetime64):
+        if not pd.api.types.is_datetime64_any_dtype(out[c.col_date]):
             out[c.col_date] = pd.to_datetime(out[c.col_date], errors="raise")
         if out[[c.col_fc, c.col_ac]].isna().any().any():
             raise ValueError("NaNs in Forecast/Actual.")
@@ -223,151 +874,387 @@ class QSIEngine:
             raise ValueError("Unit_Cost must be >= 0.")
         return out.sort_values(c.col_date).reset_index(drop=True)
 
+    def _to_frame(self, out: pd.DataFrame, segment: Optional[str]) -> QSIFrame:
+        """Wrap an output DataFrame as a QSIFrame in its row order (result columns ride along)."""
+        c = self.cfg
+        return QSIFrame.from_pandas(
+            out, segment=segment if segment in out.columns else None,
+            col_date=c.col_date, col_fc=c.col_fc, col_ac=c.col_ac, col_cost=c.col_cost, sort=False,
+        )
+
     # ----------------- Shared helpers -----------------
     def _sigmoid(self, x: np.ndarray | float) -> np.ndarray | float:
         k, mid = float(self.cfg.prob_k), float(self.cfg.prob_mid)
         return 1.0 / (1.0 + np.exp(-k * (np.asarray(x) - mid)))
 
-    def _theta_ewma(self, delta: pd.Series) -> pd.Series:
-        mu = delta.ewm(alpha=self.cfg.ewma_alpha).mean()
-        var = delta.ewm(alpha=self.cfg.ewma_alpha).var()
-        std = np.sqrt(var.fillna(0.0))
-        return (mu + self.cfg.ewma_k * std).astype(float)
-
-    def _theta_from_custom(self, drift: pd.Series, df: pd.DataFrame) -> Optional[pd.Series]:
-        """Return custom θ if a custom model is configured; else None."""
+    def _custom_spec(self) -> Optional[_CustomModel]:
+        """Registry entry of the configured custom model (None when no custom model is set)."""
         name = self.cfg.custom_model
         if not name:
             return None
-        fn = _CUSTOM_MODELS.get(name)
-        if not fn:
+        cached = self._spec
+        if cached is not None and cached[0] == name and cached[1] == _registry_version:
+            return cached[2]
+        spec = _CUSTOM_MODELS.get(name)
+        if spec is None:
             raise ValueError(f"Custom model '{name}' not found. Available: {list_custom_models()}")
-        theta = fn(drift, dict(self.cfg.custom_params or {}), df)
-        theta = pd.to_numeric(pd.Series(theta), errors="raise").astype(float)
-        if len(theta) != len(drift):
+        self._spec = (name, _registry_version, spec)
+        return spec
+
+    def _theta_one(
+        self, spec: _CustomModel, drift: np.ndarray,
+        df: Optional[pd.DataFrame] = None, cols: Optional[Dict[str, np.ndarray]] = None,
+        feats: Optional[RollingFeatures] = None,
+    ) -> np.ndarray:
+        """Evaluate a custom model on one contiguous stretch of drift; returns float64 θ."""
+        params = dict(self.cfg.custom_params or {})
+        if spec.array and spec.features:
+            if feats is None:
+                feats = RollingFeatures(drift, kernel=self.cfg.kernel)
+            theta = np.ascontiguousarray(spec.fn(drift, params, cols or {}, feats), dtype=np.float64)
+        elif spec.array:
+            theta = np.ascontiguousarray(spec.fn(drift, params, cols or {}), dtype=np.float64)
+        else:
+            index = df.index if df is not None else None
+            theta = spec.fn(pd.Series(drift, index=index), params, df)
+            theta = pd.to_numeric(pd.Series(theta), errors="raise").to_numpy(float)
+        if theta.shape != drift.shape:
             raise ValueError("Custom model returned θ of mismatched length.")
         return theta
 
+    def _model_columns(self, spec: _CustomModel, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        miss = [col for col in spec.columns if col not in df.columns]
+        if miss:
+            raise ValueError(f"Custom model '{self.cfg.custom_model}' needs missing columns: {miss}")
+        return {col: np.ascontiguousarray(df[col], dtype=np.float64) for col in spec.columns}
+
     # ----------------- Native / EWMA / Custom path -----------------
     def _analyze_native(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-        c, rng = self.cfg, np.random.default_rng(self.cfg.seed)
-        fc = df[c.col_fc].to_numpy(float)
-        ac = df[c.col_ac].to_numpy(float)
-        cost = df[c.col_cost].to_numpy(float)
-        drift = np.abs(fc - ac)
+        # Single stream == one segment spanning the whole (already copied & sorted) frame.
+        offsets = np.array([0, len(df)], dtype=np.int64)
+        res, engine, kernel = self._native_core(df, offsets)
+        out = df
+        with trace.stage("assemble", len(out)):
+            for k, v in res.items():
+                out[k] = v
+        with trace.stage("report", len(out)):
+            report = self._make_report(out, engine=engine)
+        report["flags"] = {"kernel": kernel}
+        return out, report
 
-        E = np.zeros_like(drift)
-        Theta = np.zeros_like(drift)
-        rupture = np.zeros_like(drift, dtype=bool)
-        loss = np.zeros_like(drift, dtype=float)
-
-        # Try custom θ first
-        custom_theta = self._theta_from_custom(pd.Series(drift), df)
-
-        if custom_theta is not None:
-            Theta = custom_theta.to_numpy(float)
-            mem = 0.0
-            for i, d in enumerate(drift):
-                th = Theta[i]
-                if d > th:
-                    rupture[i] = True; loss[i] = d * cost[i]; mem = 0.0
-                else:
-                    mem = mem + c.c * d
-                E[i] = mem
+    def _analyze_segmented(self, df: pd.DataFrame, groupby: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """Run the native/EWMA/custom recurrence for every segment in one pass.
+
+        Rows are laid out contiguously by segment (date order kept within a segment) and the
+        recurrence resets at each segment offset, so no per-segment frames are built or concatenated.
+        """
+        with trace.stage("layout", len(df)):
+            out, offsets, uniques, counts = self._segment_layout(df, groupby)
+        res, engine, kernel = self._native_core(out, offsets, keys=uniques)
+        with trace.stage("assemble", len(out)):
+            for k, v in res.items():
+                out[k] = v
+        with trace.stage("by_segment", len(out)):
+            by_seg = self._segment_totals(res, offsets, uniques, counts)
+        with trace.stage("report", len(out)):
+            rep = self._make_report(out, engine=engine, by_segment=by_seg)
+        rep["flags"] = {"kernel": kernel}
+        return out, rep
+
+    def _segment_totals(
+        self, res: Dict[str, np.ndarray], offsets: np.ndarray, keys: Any, counts: np.ndarray,
+    ) -> Dict[str, Any]:
+        """by_segment report entries (n, ruptures, loss) from segment-contiguous result columns."""
+        by_seg: Dict[str, Any] = {}
+        if offsets[-1]:
+            starts = offsets[:-1]
+            seg_rupt = np.add.reduceat(res["rupture"].astype(np.int64), starts)
+            loss = res["loss"]
+            for j, seg in enumerate(keys):
+                by_seg[str(seg)] = {
+                    "n": int(counts[j]),
+                    "ruptures": int(seg_rupt[j]),
+                    # pairwise np.sum per segment, as pandas' Series.sum (reduceat adds sequentially)
+                    "loss": float(np.sum(loss[offsets[j]:offsets[j + 1]])),
+                }
+        return by_seg
+
+    def _segment_layout(self, df: pd.DataFrame, groupby: str) -> Tuple[pd.DataFrame, np.ndarray, Any, np.ndarray]:
+        """Reorder rows segment-contiguously (sorted keys, date order kept within a segment).
+        Returns (frame, offsets, segment keys, row counts); rows with a NaN key are dropped like groupby."""
+        if groupby not in df.columns:
+            raise ValueError(f"groupby '{groupby}' not found in DataFrame.")
+        codes, uniques = pd.factorize(df[groupby], sort=True)
+        order = np.argsort(codes, kind="stable")
+        order = order[codes[order] >= 0]
+        counts = np.bincount(codes[order], minlength=len(uniques))
+        offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return df.take(order).reset_index(drop=True), offsets, uniques, counts
+
+    def _custom_theta_segmented(
+        self, df: pd.DataFrame, drift: np.ndarray, offsets: np.ndarray, keys: Optional[Sequence[Any]] = None,
+    ) -> np.ndarray:
+        """Custom θ evaluated independently per segment.
+
+        Array models see contiguous float64 slices and their result is cached by model name,
+        params and a fingerprint of (drift, offsets, declared columns); Series models are
+        recomputed every call because they may read anything in ``df``. Models that declare
+        ``features`` read rolling windows from one RollingFeatures store per (drift, offsets),
+        kept on the engine so param variants of a rerun reuse it. With timings on, every model call
+        is recorded as plug-in time (and per segment when ``keys`` name the segments).
+        """
+        spec = self._custom_spec()
+        cols = self._model_columns(spec, df) if spec.array else {}
+        key = feats = None
+        if spec.array:
+            base = _fingerprint(drift, offsets)
+            params = json.dumps(self.cfg.custom_params or {}, sort_keys=True, default=repr)
+            key = (self.cfg.custom_model, params, base, _fingerprint(*cols.values()))
+            hit = _THETA_CACHE.get(key)
+            if hit is not None:
+                return hit
+            if spec.features:
+                with trace.stage("features", len(drift)):
+                    feats = self._feature_store(base, drift, offsets)
+        timer = trace.current()
+        plugin = f"custom_model:{self.cfg.custom_model}"
+        Theta = np.empty_like(drift)
+        for j in range(len(offsets) - 1):
+            s, e = int(offsets[j]), int(offsets[j + 1])
+            if timer is not None:
+                t0 = time.perf_counter()
+            if spec.array:
+                Theta[s:e] = self._theta_one(spec, drift[s:e], cols={k: v[s:e] for k, v in cols.items()},
+                                             feats=feats.segment(j) if feats is not None else None)
+            else:
+                Theta[s:e] = self._theta_one(spec, drift[s:e], df=df.iloc[s:e])
+            if timer is not None:
+                dt = time.perf_counter() - t0
+                timer.add(plugin, dt, e - s, kind="plugin")
+                if keys is not None:
+                    timer.add(str(keys[j]), dt, e - s, kind="segment")
+        if key is not None:
+            _THETA_CACHE.put(key, Theta)
+        return Theta
+
+    def _feature_store(self, fingerprint: str, drift: np.ndarray, offsets: np.ndarray) -> RollingFeatures:
+        """Rolling-feature store for this (drift, offsets); recent ones are kept for reruns."""
+        kernel = self.cfg.kernel
+        return self._features.get((fingerprint, kernel), lambda: RollingFeatures(drift, offsets, kernel=kernel))
+
+    def _native_core(
+        self, df: pd.DataFrame | QSIFrame, offsets: np.ndarray, keys: Optional[Sequence[Any]] = None,
+    ) -> Tuple[Dict[str, np.ndarray], str, str]:
+        """Compute result columns over segment-contiguous rows; offsets[j]:offsets[j+1] is segment j
+        (keyed by keys[j] when grouped). Returns (columns, engine label, kernel label)."""
+        c = self.cfg
+        kern = get_kernels(c.kernel)
+        fc = np.asarray(df[c.col_fc], dtype=np.float64)
+        ac = np.asarray(df[c.col_ac], dtype=np.float64)
+        cost = np.asarray(df[c.col_cost], dtype=np.float64)
+        drift = np.abs(fc - ac)
+        n_seg = len(offsets) - 1
+
+        n = len(drift)
+        if c.custom_model:
+            with trace.stage("theta", n):
+                Theta = self._custom_theta_segmented(df, drift, offsets, keys)
+            with trace.stage("recurrence", n):
+                E, rupture, loss = kern.scan_memory(drift, Theta, cost, offsets, c.c, np.zeros(n_seg))
+            engine = "custom"
         elif c.use_ewma:
-            Theta = self._theta_ewma(pd.Series(drift)).to_numpy(float)
-            mem = 0.0
-            for i, d in enumerate(drift):
-                if d > Theta[i]:
-                    rupture[i] = True; loss[i] = d * cost[i]; mem = 0.0
-                else:
-                    mem = mem + c.c * d
-                E[i] = mem
+            with trace.stage("theta", n):
+                Theta = kern.ewma_theta_batch(drift, offsets, c.ewma_alpha, c.ewma_k)
+            with trace.stage("recurrence", n):
+                E, rupture, loss = kern.scan_memory(drift, Theta, cost, offsets, c.c, np.zeros(n_seg))
+            engine = self._engine_label()
         else:
-            mem = 0.0
-            for i, d in enumerate(drift):
-                eps = float(rng.normal(0.0, c.sigma)) if c.sigma > 0 else 0.0
-                th = max(0.0, c.base_threshold + c.a * mem + eps)
-                Theta[i] = th
-                if d > th:
-                    rupture[i] = True; loss[i] = d * cost[i]; mem = 0.0
-                else:
-                    mem = mem + c.c * d
-                E[i] = mem
-
-        margin = drift - Theta
-        p = self._sigmoid(margin)
+            with trace.stage("noise", n):
+                noise = self._noise_segmented(offsets, keys)
+            with trace.stage("recurrence", n):
+                E, Theta, rupture, loss = kern.scan_native(
+                    drift, cost, noise, offsets, c.base_threshold, c.a, c.c, np.zeros(n_seg)
+                )
+            engine = self._engine_label()
+
+        with trace.stage("sigmoid", n):
+            p = self._sigmoid(drift - Theta)
+        res = {"drift": drift, "E": E, "Theta": Theta, "rupture": rupture, "rupture_prob": p, "loss": loss}
+        return res, engine, kern.name
+
+    def _noise_segmented(
+        self, offsets: np.ndarray, keys: Optional[Sequence[Any]] = None, sigma: Optional[float] = None,
+    ) -> np.ndarray:
+        """Pre-drawn Θ noise per row (empty when sigma == 0); ``sigma`` overrides cfg.sigma.
+        Every segment replays the default_rng stream of its seed from its start."""
+        c = self.cfg
+        sigma = c.sigma if sigma is None else float(sigma)
+        if sigma <= 0 or offsets[-1] == 0:
+            return np.empty(0, dtype=float)
+        lengths = np.diff(offsets)
+        if c.seed_by_segment and keys is not None:
+            return np.concatenate([
+                np.random.default_rng(self._segment_seed(k)).normal(0.0, sigma, int(n))
+                for k, n in zip(keys, lengths)
+            ])
+        draws = np.random.default_rng(c.seed).normal(0.0, sigma, int(lengths.max()))
+        pos = np.arange(offsets[-1], dtype=np.int64) - np.repeat(offsets[:-1], lengths)
+        return draws[pos]
+
+    # ----------------- Process-pool sharding of grouped analysis -----------------
+    def _analyze_parallel(self, df: pd.DataFrame, groupby: str, use_cog: bool) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """Shard segments across ``cfg.n_workers`` processes, balanced by row count, and merge back
+        in the serial (sorted segment) order. Seeds are per segment, so results match the serial run
+        for any worker count. Custom models must be registered at import time to exist in workers."""
+        if groupby not in df.columns:
+            raise ValueError(f"groupby '{groupby}' not found in DataFrame.")
+        codes, uniques = pd.factorize(df[groupby], sort=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        shards = _balance_shards(counts, self.cfg.n_workers)
+        jobs = [df[np.isin(codes, shard)] for shard in shards]
 
-        out = df.copy()
-        out["drift"], out["E"], out["Theta"] = drift, E, Theta
-        out["rupture"], out["rupture_prob"], out["loss"] = rupture, p, loss
-        report = self._make_report(out, engine=("custom" if custom_theta is not None else self._engine_label()))
-        return out, report
+        if len(jobs) <= 1:
+            results = [_run_shard(self.cfg, groupby, use_cog, j) for j in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=len(jobs)) as ex:
+                results = list(ex.map(_run_shard, [self.cfg] * len(jobs), [groupby] * len(jobs),
+                                      [use_cog] * len(jobs), jobs))
+
+        # each shard output is segment-contiguous in sorted key order; stitch segments back globally
+        where: Dict[str, Tuple[int, int]] = {}
+        info: Dict[str, Any] = {}
+        base = 0
+        for o, seg_rep in results:
+            for key, r in seg_rep.items():
+                where[key] = (base, base + r["n"])
+                info[key] = r
+                base += r["n"]
+        merged = pd.concat([o for o, _ in results], ignore_index=True) if results else df.iloc[:0]
+        by_seg: Dict[str, Any] = {}
+        spans = []
+        for u in uniques:
+            key = str(u)
+            if key in where:
+                spans.append(np.arange(*where[key]))
+                by_seg[key] = info[key]
+        out = merged.take(np.concatenate(spans)).reset_index(drop=True) if spans else merged
+
+        if use_cog:
+            engine, kernel = "cognize", None
+        else:
+            engine = "custom" if self.cfg.custom_model else self._engine_label()
+            kernel = get_kernels(self.cfg.kernel).name
+        rep = self._make_report(out, engine=engine, by_segment=by_seg)
+        rep["flags"] = {"n_workers": len(jobs)}
+        if kernel:
+            rep["flags"]["kernel"] = kernel
+        return out, rep
 
     # ----------------- Cognize single-stream (with optional custom θ live) -----------------
-    def _analyze_cognize(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    def _cognize_state(self, seed: Optional[int] = None) -> Any:
+        """Fresh Cognize state wired with the meta-policy manager (one per stream/segment)."""
         c = self.cfg
-        s = EpistemicState(V0=0.0, threshold=c.base_threshold, realign_strength=c.c)
+        seed = c.seed if seed is None else seed
+        # seeded so Cognize runs are reproducible for a fixed cfg.seed (stream == batch, checkpoints)
+        s = EpistemicState(V0=0.0, threshold=c.base_threshold, realign_strength=c.c, rng_seed=seed)
         s.inject_policy(threshold=threshold_adaptive, realign=realign_tanh, collapse=collapse_soft_decay)
         s.policy_manager = PolicyManager(
             base_specs=SAFE_SPECS, memory=PolicyMemory(), shadow=ShadowRunner(),
-            epsilon=c.epsilon, promote_margin=c.promote_margin, cooldown_steps=c.cooldown_steps
+            epsilon=c.epsilon, promote_margin=c.promote_margin, cooldown_steps=c.cooldown_steps,
+            rng=np.random.default_rng(seed),
         )
+        return s
+
+    def _cognize_step(self, s: Any, V: float, theta: Optional[float] = None) -> Tuple[float, float, bool, float]:
+        """Feed one drift value to a Cognize state; returns (E, Θ, rupture, rupture_prob)."""
+        # If configured: drive Cognize with the enterprise θ at this step
+        if theta is not None:
+            try:
+                s.threshold = float(theta)
+            except Exception:
+                # Defensive: ignore bad/missing values and keep previous threshold
+                pass
+
+        s.receive(V)
+        last = s.last() or {}
+
+        # SAFE Θ extraction (Cognize keys may vary)
+        theta_val = last.get("Θ")
+        if theta_val is None:
+            theta_val = last.get("threshold")
+        if theta_val is None:
+            theta_val = getattr(s, "threshold", 0.0)
+        theta_val = float(theta_val)
+
+        margin = float(last.get("∆", V) - theta_val)
+        p = float(self._sigmoid(margin))
+        rupt = bool(last.get("ruptured", margin > 0.0))
+        E = float(last.get("E", getattr(s, "E", 0.0)))
+
+        if rupt:
+            s.E = 0.0  # keep semantics aligned with native: reset memory on rupture
+        return E, theta_val, rupt, p
+
+    def _analyze_cognize_groups(self, df: pd.DataFrame, groupby: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        parts: List[pd.DataFrame] = []
+        by_seg: Dict[str, Any] = {}
+        for seg, sub in df.groupby(groupby, sort=True):
+            with trace.stage(str(seg), len(sub), kind="segment"):
+                o, _ = self._analyze_cognize(sub, seed=self._segment_seed(seg))
+            o[groupby] = seg
+            parts.append(o)
+            by_seg[str(seg)] = {
+                "n": int(len(o)),
+                "ruptures": int(o["rupture"].sum()),
+                "loss": float(o["loss"].sum()),
+            }
+        with trace.stage("assemble", len(df)):
+            out = pd.concat(parts, ignore_index=True)
+        with trace.stage("report", len(out)):
+            return out, self._make_report(out, engine="cognize", by_segment=by_seg)
 
-        # Precompute drift + optional custom θ
-        drift_series = (df[c.col_fc] - df[c.col_ac]).abs().astype(float)
-        custom_theta = self._theta_from_custom(drift_series, df)
-
-        rows = []
-        idx = 0
-        for _, r in df.iterrows():
-            V = float(abs(r[c.col_fc] - r[c.col_ac]))
-
-            # If configured: drive Cognize with the enterprise θ at this step
-            if custom_theta is not None and c.cognize_respect_custom_theta:
-                try:
-                    s.threshold = float(custom_theta.iloc[idx])
-                except Exception:
-                    # Defensive: ignore bad index/missing and keep previous threshold
-                    pass
-
-            s.receive(V)
-            last = s.last() or {}
-
-            # SAFE Θ extraction (Cognize keys may vary)
-            theta_val = last.get("Θ")
-            if theta_val is None:
-                theta_val = last.get("threshold")
-            if theta_val is None:
-                theta_val = getattr(s, "threshold", 0.0)
-            theta_val = float(theta_val)
-
-            margin = float(last.get("∆", V) - theta_val)
-            p = float(self._sigmoid(margin))
-            rupt = bool(last.get("ruptured", margin > 0.0))
-            loss = V * float(r[c.col_cost]) if rupt else 0.0
-
-            rows.append({
-                c.col_date: r[c.col_date],
-                c.col_fc: r[c.col_fc],
-                c.col_ac: r[c.col_ac],
-                c.col_cost: r[c.col_cost],
-                "drift": V,
-                "E": float(last.get("E", getattr(s, "E", 0.0))),
-                "Theta": theta_val,
-                "rupture": rupt,
-                "rupture_prob": p,
-                "loss": float(loss),
-            })
-
-            if rupt:
-                s.E = 0.0  # keep semantics aligned with native: reset memory on rupture
-            idx += 1
-
-        out = pd.DataFrame(rows)
+    def _analyze_cognize(self, df: pd.DataFrame, seed: Optional[int] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        c = self.cfg
+        s = self._cognize_state(seed)
+
+        # Precompute drift + optional custom θ as plain arrays; the loop below only touches Cognize
+        drift = np.abs(df[c.col_fc].to_numpy(float) - df[c.col_ac].to_numpy(float))
+        respect = bool(c.custom_model) and c.cognize_respect_custom_theta
+        with trace.stage("theta", len(drift)):
+            custom_theta = (self._custom_theta_segmented(df, drift, np.array([0, len(drift)], dtype=np.int64))
+                            if respect else None)
+
+        n = len(drift)
+        E = np.empty(n)
+        Theta = np.empty(n)
+        rupture = np.zeros(n, dtype=bool)
+        prob = np.empty(n)
+        step = self._cognize_step
+        # python floats: Cognize sees exactly what the per-row loop used to feed it
+        V = drift.tolist()
+        theta_in = custom_theta.tolist() if respect else [None] * n
+        with trace.stage("cognize", n):
+            for i in range(n):
+                E[i], Theta[i], rupture[i], prob[i] = step(s, V[i], theta_in[i])
+        loss = np.where(rupture, drift * df[c.col_cost].to_numpy(float), 0.0)
+
+        out = pd.DataFrame({
+            c.col_date: df[c.col_date].to_numpy(),
+            c.col_fc: df[c.col_fc].to_numpy(),
+            c.col_ac: df[c.col_ac].to_numpy(),
+            c.col_cost: df[c.col_cost].to_numpy(),
+            "drift": drift,
+            "E": E,
+            "Theta": Theta,
+            "rupture": rupture,
+            "rupture_prob": prob,
+            "loss": loss,
+        })
         # Label as "cognize" (with note if we respected a custom θ)
-        engine_label = "cognize" if custom_theta is None or not c.cognize_respect_custom_theta else "cognize+customθ"
-        report = self._make_report(out, engine=engine_label)
+        engine_label = "cognize+customθ" if respect else "cognize"
+        with trace.stage("report", n):
+            report = self._make_report(out, engine=engine_label)
         return out, report
 
     # ----------------- Cognize graph (segments coupling) -----------------
@@ -379,7 +1266,7 @@ class QSIEngine:
         G = EpistemicGraph(damping=c.graph_damping, max_depth=c.max_graph_depth)
         segments = sorted(df[groupby].dropna().unique().tolist())
         for seg in segments:
-            st = make_simple_state(0.0)
+            st = make_simple_state(0.0, seed=self._segment_seed(seg))
             st.threshold = c.base_threshold
             G.add(str(seg), st)
 
@@ -387,43 +1274,59 @@ class QSIEngine:
         for i in range(len(segments) - 1):
             G.link(str(segments[i]), str(segments[i + 1]), mode="pressure", weight=0.2, decay=0.9, cooldown=3)
 
-        frames: List[pd.DataFrame] = []
-        for ts, frame in df.groupby(c.col_date, sort=True):
-            for seg, r in frame.groupby(groupby):
-                V = float(abs(r.iloc[0][c.col_fc] - r.iloc[0][c.col_ac]))
-                G.step(str(seg), V)
-
-            snap = []
-            for seg in segments:
-                st = G.nodes[str(seg)]
+        # Dense T×S panel: row index of the first observation per (timestamp, segment), -1 == absent
+        with trace.stage("graph_panel", len(df)):
+            P = self._graph_panel(df, groupby, segments)
+        T, S = P.row.shape
+        names = [str(seg) for seg in segments]
+        V = np.abs(df[c.col_fc].to_numpy(float) - df[c.col_ac].to_numpy(float))
+
+        m = int(P.present.sum())
+        t_idx = np.empty(m, dtype=np.int64)
+        s_idx = np.empty(m, dtype=np.int64)
+        E = np.empty(m)
+        Theta = np.empty(m)
+        rupture = np.zeros(m, dtype=bool)
+        prob = np.empty(m)
+        k = 0
+        t_graph = time.perf_counter()
+        for t in range(T):
+            cols = np.flatnonzero(P.present[t]).tolist()
+            rows = P.row[t, cols].tolist()
+            for j, i in zip(cols, rows):
+                G.step(names[j], float(V[i]))
+            for j in cols:
+                st = G.nodes[names[j]]
                 post = st.last() if hasattr(st, "last") else {}
                 theta_val = post.get("Θ") or post.get("threshold") or getattr(st, "threshold", 0.0)
                 theta_val = float(theta_val)
                 delta_val = float(post.get("∆", 0.0))
                 margin = delta_val - theta_val
-                p = float(self._sigmoid(margin))
-                rupt = bool(post.get("ruptured", margin > 0.0))
-
-                row = frame[frame[groupby] == seg].iloc[0]
-                V = float(abs(row[c.col_fc] - row[c.col_ac]))
-                loss = V * float(row[c.col_cost]) if rupt else 0.0
-
-                snap.append({
-                    c.col_date: ts,
-                    groupby: seg,
-                    c.col_fc: row[c.col_fc],
-                    c.col_ac: row[c.col_ac],
-                    c.col_cost: row[c.col_cost],
-                    "drift": V,
-                    "E": float(post.get("E", 0.0)),
-                    "Theta": theta_val,
-                    "rupture": rupt,
-                    "rupture_prob": p,
-                    "loss": float(loss),
-                })
-            frames.append(pd.DataFrame(snap))
-
-        out = pd.concat(frames, ignore_index=True)
+                t_idx[k] = t; s_idx[k] = j
+                E[k] = float(post.get("E", 0.0))
+                Theta[k] = theta_val
+                rupture[k] = bool(post.get("ruptured", margin > 0.0))
+                prob[k] = float(self._sigmoid(margin))
+                k += 1
+        timer = trace.current()
+        if timer is not None:
+            timer.add("cognize_graph", time.perf_counter() - t_graph, m)
+
+        src = P.row[t_idx, s_idx]
+        drift = V[src]
+        out = pd.DataFrame({
+            c.col_date: P.dates[t_idx],
+            groupby: [segments[j] for j in s_idx.tolist()],
+            c.col_fc: df[c.col_fc].to_numpy()[src],
+            c.col_ac: df[c.col_ac].to_numpy()[src],
+            c.col_cost: df[c.col_cost].to_numpy()[src],
+            "drift": drift,
+            "E": E,
+            "Theta": Theta,
+            "rupture": rupture,
+            "rupture_prob": prob,
+            "loss": np.where(rupture, drift * df[c.col_cost].to_numpy(float)[src], 0.0),
+        })
 
         graph_meta = {}
         try:
@@ -436,36 +1339,132 @@ class QSIEngine:
         except Exception:
             pass
 
-        rep = self._make_report(
-            out, engine="cognize-graph",
-            by_segment=out.groupby(groupby)["loss"].sum().to_dict()
-        )
+        with trace.stage("report", len(out)):
+            rep = self._make_report(
+                out, engine="cognize-graph",
+                by_segment=out.groupby(groupby)["loss"].sum().to_dict()
+            )
         if graph_meta:
             rep["graph"] = graph_meta
         return out, rep
 
+    def _graph_panel(self, df: pd.DataFrame, groupby: str, segments: List[Any]) -> SimpleNamespace:
+        """Index ``df`` as a dense T×S panel (sorted timestamps × ``segments``).
+
+        ``row[t, s]`` is the position in ``df`` of the first row observed for that timestamp and
+        segment (-1 if absent); ``present`` is the matching mask and ``dates`` the timestamps.
+        """
+        c = self.cfg
+        keep = df[groupby].notna().to_numpy() & df[c.col_date].notna().to_numpy()
+        pos = np.flatnonzero(keep)
+        t_codes, dates = pd.factorize(df[c.col_date].to_numpy()[pos], sort=True)
+        s_codes = pd.Index(segments).get_indexer(df[groupby].to_numpy()[pos])
+        T, S = len(dates), len(segments)
+        # first occurrence per cell in frame order (mirrors groupby(...).iloc[0])
+        cell = t_codes.astype(np.int64) * S + s_codes
+        cells, first = np.unique(cell, return_index=True)
+        row = np.full(T * S, -1, dtype=np.int64)
+        row[cells] = pos[first]
+        row = row.reshape(T, S)
+        return SimpleNamespace(row=row, present=row >= 0, dates=np.asarray(dates))
+
     # ----------------- Reporting -----------------
-    def _make_report(self, df_out: pd.DataFrame, engine: str, by_segment: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _make_report(
+        self, df_out: pd.DataFrame | QSIFrame, engine: str, by_segment: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        events_cols = [self.cfg.col_date, "drift", "Theta", "rupture_prob", "loss"]
+        if self.cfg.col_segment and self.cfg.col_segment in df_out:
+            events_cols.insert(1, self.cfg.col_segment)
+        if isinstance(df_out, QSIFrame):
+            drift, rupt = df_out["drift"], df_out["rupture"]
+            n = len(df_out)
+            stats = (int(rupt.sum()), float(df_out["loss"].sum()),
+                     float(drift.mean()) if n else float("nan"),
+                     float(np.median(drift)) if n else float("nan"),
+                     float(drift.max()) if n else float("nan"))
+            events = pd.DataFrame({k: df_out[k][rupt] for k in events_cols})
+        else:
+            n = len(df_out)
+            stats = (int(df_out["rupture"].sum()), float(df_out["loss"].sum()), float(df_out["drift"].mean()),
+                     float(df_out["drift"].median()), float(df_out["drift"].max()))
+            events = df_out.loc[df_out["rupture"], events_cols].reset_index(drop=True)
         summary = {
-            "n": int(len(df_out)),
-            "ruptures": int(df_out["rupture"].sum()),
-            "total_loss": float(df_out["loss"].sum()),
-            "mean_drift": float(df_out["drift"].mean()),
-            "median_drift": float(df_out["drift"].median()),
-            "max_drift": float(df_out["drift"].max()),
+            "n": int(n),
+            "ruptures": stats[0],
+            "total_loss": stats[1],
+            "mean_drift": stats[2],
+            "median_drift": stats[3],
+            "max_drift": stats[4],
             "engine": engine,
             "config": asdict(self.cfg),
         }
-        events_cols = [self.cfg.col_date, "drift", "Theta", "rupture_prob", "loss"]
-        if self.cfg.col_segment and self.cfg.col_segment in df_out.columns:
-            events_cols.insert(1, self.cfg.col_segment)
-        events = df_out.loc[df_out["rupture"], events_cols].reset_index(drop=True)
         rep = {"summary": summary, "events": events}
         if by_segment is not None:
             rep["by_segment"] = by_segment
         return rep
 
 
+# ----------------- Output profiles -----------------
+_OUTPUT_PROFILES = ("full", "compact", "summary_only")
+_RESULT_FLOATS = ("drift", "E", "Theta", "rupture_prob", "loss")
+_OVERRIDE_CONFIGS_MAX = 256          # validated per-call configs kept per engine
+_FEATURE_STORES_MAX = 4              # rolling-feature stores (distinct drift arrays) kept per engine
+
+
+# ----------------- Seed helpers -----------------
+def _stable_seed(seed: int, key: Any) -> int:
+    """63-bit seed from a stable hash of (seed, key); same in every process (unlike hash())."""
+    h = hashlib.blake2b(f"{seed}|{key}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(h, "little") >> 1
+
+
+# ----------------- Sweep helpers -----------------
+_SWEEP_PARAMS = ("base_threshold", "a", "c", "sigma", "ewma_alpha", "ewma_k", "use_ewma")
+
+def _expand_grid(grid: Any) -> List[Dict[str, Any]]:
+    """{param: values} -> Cartesian product of override dicts; a list of dicts passes through."""
+    if isinstance(grid, dict):
+        names = list(grid.keys())
+        values = [v if isinstance(v, (list, tuple, np.ndarray)) else [v] for v in grid.values()]
+        return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    return [dict(v) for v in grid]
+
+
+# ----------------- Ensemble helpers -----------------
+_ENSEMBLE_BLOCK = 1 << 18          # rows x paths per kernel block (Θ, E and noise buffers)
+_ENSEMBLE_SHARED_MAX = 1 << 23     # max pre-drawn shared-seed noise values (64 MiB)
+
+def _q_label(q: float) -> str:
+    return f"q{int(round(q * 100)):02d}"
+
+def _distribution(x: np.ndarray, qs: Sequence[float]) -> Dict[str, Any]:
+    """Mean / std / min / max and requested quantiles of a per-path total."""
+    d = {"mean": float(x.mean()), "std": float(x.std()), "min": float(x.min()), "max": float(x.max())}
+    d.update({_q_label(q): float(v) for q, v in zip(qs, np.quantile(x, qs))} if qs else {})
+    return d
+
+
+# ----------------- Process-pool helpers -----------------
+def _balance_shards(counts: np.ndarray, n_shards: int) -> List[np.ndarray]:
+    """Greedy largest-first assignment of segments to shards by row count; codes sorted per shard."""
+    n_shards = max(1, min(int(n_shards), int((counts > 0).sum())))
+    heap = [(0, i) for i in range(n_shards)]
+    members: List[List[int]] = [[] for _ in range(n_shards)]
+    for j in np.argsort(-counts, kind="stable"):
+        if counts[j] == 0:
+            continue
+        load, i = heapq.heappop(heap)
+        members[i].append(int(j))
+        heapq.heappush(heap, (load + int(counts[j]), i))
+    return [np.sort(np.asarray(m, dtype=np.int64)) for m in members if m]
+
+def _run_shard(cfg: QSIConfig, groupby: str, use_cog: bool, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Worker entrypoint: analyze one shard of already prepped rows; returns (out, by_segment)."""
+    eng = QSIEngine(cfg)
+    out, rep = eng._analyze_cognize_groups(df, groupby) if use_cog else eng._analyze_segmented(df, groupby)
+    return out, rep["by_segment"]
+
+
 # ----------------- Convenience: demo data -----------------
 def generate_dummy(
     days: int = 60,
@@ -476,19 +1475,19 @@ def generate_dummy(
     rng = np.random.default_rng(seed)
     dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=days)
     if segments:
-        rows = []
-        for seg in segments:
-            fc = rng.normal(1000, 100, days).round().astype(int)
-            ac = fc - rng.normal(0, 150, days).round().astype(int)
-            for i in range(days):
-                rows.append({
-                    "Date": dates[i],
-                    "Forecast": fc[i],
-                    "Actual": ac[i],
-                    "Unit_Cost": unit_cost,
-                    "Segment": seg
-                })
-        return pd.DataFrame(rows)
+        # same draws (per segment: forecast, then actual noise) and row order as building row by row
+        fc = np.empty((len(segments), days), dtype=int)
+        ac = np.empty((len(segments), days), dtype=int)
+        for j in range(len(segments)):
+            fc[j] = rng.normal(1000, 100, days).round().astype(int)
+            ac[j] = fc[j] - rng.normal(0, 150, days).round().astype(int)
+        return pd.DataFrame({
+            "Date": np.tile(dates.values, len(segments)),
+            "Forecast": fc.ravel(),
+            "Actual": ac.ravel(),
+            "Unit_Cost": unit_cost,
+            "Segment": pd.Series(segments).repeat(days).to_numpy(),
+        })
     else:
         fc = rng.normal(1000, 100, days).round().astype(int)
         ac = fc - rng.normal(0, 150, days).round().astype(int)
@@ -1,10 +1,17 @@
 # qsi_epistemic.py
 from __future__ import annotations
 from dataclasses import dataclass, replace
+from types import SimpleNamespace
+import os
+import time
 from typing import Optional, Dict, Any, Tuple, Callable, List, Sequence
 import numpy as np
 import pandas as pd
 
+from .qsi_frame import QSIFrame
+from .qsi_cache import result_cache, cache_key, data_fingerprint, config_fingerprint, callable_token
+from . import qsi_trace as trace
+
 # ====================================================
 #              Custom Diagnostics Registry
 # ====================================================
@@ -20,6 +27,14 @@ def register_custom_diag(name: str, fn: CustomDiagFn) -> None:
 def list_custom_diags() -> List[str]:
     return sorted(_CUSTOM_DIAG.keys())
 
+def _lap(timer: Optional[trace.StageTimer], name: str, t0: float, rows: int) -> float:
+    """Close stage ``name`` begun at ``t0`` (when timing) and return the next stage's start."""
+    if timer is None:
+        return t0
+    now = time.perf_counter()
+    timer.add(name, now - t0, rows)
+    return now
+
 
 # ====================================================
 #                     Config
@@ -67,6 +82,12 @@ class EpistemicConfig:
     # Weekend definition as weekday indices (0=Mon ... 6=Sun). User sets e.g. "5,6" for Sat/Sun.
     weekend_days: Tuple[int, ...] = (5, 6)
 
+    # Memoize enrich() by (df_out content, config) in qsi_cache
+    result_cache: bool = False
+
+    # Per-stage wall-clock / row counts (and per custom diagnostic) in out["timings"]
+    timings: bool = False
+
     # ---- validator (keeps UI inputs safe but everything is overridable) ----
     def validate(self) -> "EpistemicConfig":
         def clamp(x, lo, hi):
@@ -123,25 +144,77 @@ class EpistemicConfig:
 # ====================================================
 class EpistemicAnalytics:
 
+    # ---------- Columns (coerced once) ----------
+    @staticmethod
+    def _columns(df_out: pd.DataFrame | QSIFrame, cfg: EpistemicConfig) -> SimpleNamespace:
+        """
+        Every array enrich needs, coerced exactly once: float64 actual/forecast (NaN where
+        unparseable), drift/Theta/loss (NaN -> 0), bool rupture, weekday (-1 == missing date),
+        optional group codes and policy mask. A QSIFrame is already typed and is used as is.
+        """
+        if isinstance(df_out, QSIFrame):
+            required = {"drift", "Theta", "loss", "rupture"}
+            missing = required - set(df_out.columns)
+            if missing:
+                raise ValueError(f"df_out missing required columns: {sorted(missing)}")
+            col = df_out.columns
+            num = lambda k: np.nan_to_num(np.asarray(col[k], dtype=np.float64), nan=0.0, posinf=np.inf, neginf=-np.inf)
+            cols = SimpleNamespace(
+                n=len(df_out), actual=df_out.actual, forecast=df_out.forecast,
+                drift=num("drift"), theta=num("Theta"), loss=num("loss"),
+                rupture=np.asarray(col["rupture"], dtype=bool), weekday=df_out.weekday(),
+                groups=None, policy=None,
+            )
+            if cfg.groupby and cfg.groupby == df_out.segment:
+                cols.groups = (df_out.codes, df_out.categories)
+            elif cfg.groupby and cfg.groupby in col:
+                codes, uniques = pd.factorize(col[cfg.groupby], sort=True)
+                cols.groups = (codes, np.asarray(uniques))
+            if cfg.policy_col and cfg.policy_col in col:
+                cols.policy = np.asarray(col[cfg.policy_col]).astype(bool)
+            return cols
+
+        required = {"Date", "Forecast", "Actual", "drift", "Theta", "loss", "rupture"}
+        missing = required - set(df_out.columns)
+        if missing:
+            raise ValueError(f"df_out missing required columns: {sorted(missing)}")
+        num = lambda k: pd.to_numeric(df_out[k], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        weekday = pd.to_datetime(df_out["Date"], errors="coerce").dt.weekday
+        cols = SimpleNamespace(
+            n=len(df_out), actual=num("Actual"), forecast=num("Forecast"),
+            drift=np.nan_to_num(num("drift"), nan=0.0, posinf=np.inf, neginf=-np.inf),
+            theta=np.nan_to_num(num("Theta"), nan=0.0, posinf=np.inf, neginf=-np.inf),
+            loss=np.nan_to_num(num("loss"), nan=0.0, posinf=np.inf, neginf=-np.inf),
+            rupture=df_out["rupture"].astype(bool).to_numpy(),
+            weekday=weekday.to_numpy(dtype=np.float64, na_value=-1.0).astype(np.int8),
+            groups=None, policy=None,
+        )
+        if cfg.groupby and (cfg.groupby in df_out.columns):
+            codes, uniques = pd.factorize(df_out[cfg.groupby], sort=True)
+            cols.groups = (codes, np.asarray(uniques))
+        if cfg.policy_col and (cfg.policy_col in df_out.columns):
+            cols.policy = df_out[cfg.policy_col].astype(bool).to_numpy()
+        return cols
+
     # ---------- Baseline ----------
     @staticmethod
-    def _load_baseline(df_out: pd.DataFrame, cfg: EpistemicConfig) -> pd.Series:
+    def _load_baseline(drift: np.ndarray, cfg: EpistemicConfig) -> np.ndarray:
         if cfg.baseline_mode == "file" and cfg.baseline_file:
             base = pd.read_csv(cfg.baseline_file)
             for k in ("drift", "Delta"):
                 if k in base.columns:
-                    s = pd.to_numeric(base[k], errors="coerce").dropna().astype(float)
+                    s = pd.to_numeric(base[k], errors="coerce").dropna().to_numpy(dtype=np.float64)
                     if len(s) == 0:
                         raise ValueError("Baseline file parsed but contained no numeric drift values.")
                     return s
             raise ValueError("Baseline file must include 'drift' or 'Delta'.")
         # window mode
-        n = max(1, min(int(cfg.baseline_window), len(df_out)))
-        return pd.to_numeric(df_out["drift"], errors="coerce").fillna(0.0).iloc[:n].astype(float)
+        n = max(1, min(int(cfg.baseline_window), len(drift)))
+        return drift[:n]
 
     # ---------- PSI ----------
     @staticmethod
-    def _psi(actual: pd.Series, expected: pd.Series, bins: int, min_bins: int, floor: float) -> float:
+    def _psi(actual: np.ndarray, expected: np.ndarray, bins: int, min_bins: int, floor: float) -> float:
         q = np.linspace(0.0, 1.0, max(2, int(bins)) + 1)
         cuts = np.unique(np.quantile(expected, q))
         if len(cuts) < max(3, min_bins):      # need at least 3 cut points to form >=2 bins
@@ -156,18 +229,23 @@ class EpistemicAnalytics:
 
     # ---------- Scope ----------
     @staticmethod
-    def _safe_quantile(x: pd.Series, q: float) -> float:
-        x = pd.to_numeric(x, errors="coerce").dropna()
+    def _finite(x: Any) -> np.ndarray:
+        x = np.asarray(pd.to_numeric(x, errors="coerce"), dtype=np.float64)
+        return x[~np.isnan(x)]
+
+    @staticmethod
+    def _safe_quantile(x: np.ndarray, q: float) -> float:
+        x = EpistemicAnalytics._finite(x)
         if len(x) == 0:
             return 0.0
         q = float(min(max(q, 0.0), 1.0))
         return float(np.quantile(x, q))
 
     @staticmethod
-    def _scope_score(actual: pd.Series, baseline: pd.Series, lo: float, hi: float) -> float:
+    def _scope_score(actual: np.ndarray, baseline: np.ndarray, lo: float, hi: float) -> float:
         L = EpistemicAnalytics._safe_quantile(baseline, lo)
         H = EpistemicAnalytics._safe_quantile(baseline, hi)
-        a = pd.to_numeric(actual, errors="coerce").dropna()
+        a = EpistemicAnalytics._finite(actual)
         if len(a) == 0:
             return 0.0
         return float(((a >= L) & (a <= H)).mean())
@@ -175,91 +253,129 @@ class EpistemicAnalytics:
     # ---------- ETA to persistent breach ----------
     @staticmethod
     def _eta_to_breach(
-        margin: pd.Series,
+        margin: np.ndarray,
         k: int,
         lookback: int,
         min_points: int
     ) -> Tuple[Optional[int], str]:
-        m = pd.to_numeric(margin, errors="coerce").dropna()
+        m = EpistemicAnalytics._finite(margin)
         if len(m) < max(1, min_points):
             return None, "insufficient_points"
         if len(m) > lookback:
-            m = m.iloc[-lookback:]
+            m = m[-lookback:]
         x = np.arange(len(m), dtype=float)
-        y = m.to_numpy(dtype=float)
         try:
-            b1, b0 = np.polyfit(x, y, deg=1)  # slope, intercept
+            b1, b0 = np.polyfit(x, m, deg=1)  # slope, intercept
         except Exception:
             return None, "fit_failed"
-        if (m > 0).tail(k).all():
+        if (m[-k:] > 0).all():
             return 0, "already_breaching"
+        # first t in the next 365 steps whose k-step projection stays above zero
         start = len(m)
-        for t in range(start, start + 365):
-            if all((b0 + b1 * (t + j)) > 0 for j in range(k)):
-                return t - start, "projected"
+        t = np.arange(start, start + 365)
+        ok = ((b0 + b1 * (t[:, None] + np.arange(k))) > 0).all(axis=1)
+        if ok.any():
+            return int(np.argmax(ok)), "projected"
         return None, "no_breach_within_horizon"
 
     # ---------- Board-aligned extras ----------
     @staticmethod
-    def _pareto_share(loss_series: pd.Series, top_frac: float) -> float:
-        s = pd.to_numeric(loss_series, errors="coerce").fillna(0.0).sort_values(ascending=False)
+    def _pareto_share(loss: np.ndarray, top_frac: float) -> float:
+        s = np.nan_to_num(np.asarray(loss, dtype=np.float64), nan=0.0, posinf=np.inf, neginf=-np.inf)
         if len(s) == 0:
             return 0.0
+        s = np.ascontiguousarray(np.sort(s)[::-1])
         k = max(1, int(np.ceil(float(top_frac) * len(s))))
-        return float(s.iloc[:k].sum() / max(s.sum(), 1e-9))
+        return float(s[:k].sum() / max(s.sum(), 1e-9))
 
     @staticmethod
-    def _weekend_mask(dts: pd.Series, weekend_days: Sequence[int]) -> pd.Series:
-        # weekday: 0=Mon ... 6=Sun
+    def _weekend_mask(weekday: np.ndarray, weekend_days: Sequence[int]) -> np.ndarray:
+        # weekday: 0=Mon ... 6=Sun, -1 == missing date (never weekend)
         wd = set(int(d) for d in weekend_days if 0 <= int(d) <= 6)
-        return pd.to_datetime(dts, errors="coerce").dt.weekday.isin(sorted(wd))
+        return np.isin(weekday, sorted(wd))
 
     # ---------- Public: enrich ----------
     @staticmethod
-    def enrich(df_out: pd.DataFrame, cfg_in: EpistemicConfig) -> Dict[str, Any]:
+    def enrich(
+        df_out: pd.DataFrame | QSIFrame, cfg_in: EpistemicConfig, tracer: Optional[trace.Tracer] = None,
+    ) -> Dict[str, Any]:
         """
         Compute board-level epistemic diagnostics on processed output (df_out).
-        df_out must have: Date, Forecast, Actual, drift, Theta, loss, rupture.
+        df_out must have: Date, Forecast, Actual, drift, Theta, loss, rupture — or be the QSIFrame
+        returned by ``QSIEngine.analyze`` on a QSIFrame, whose columns are used without coercion.
+        With cfg.timings (or a ``tracer``) the result gains "timings": seconds / rows per stage and
+        per custom diagnostic (plug-ins).
         """
         cfg = cfg_in.validate()
-        required = {"Date", "Forecast", "Actual", "drift", "Theta", "loss", "rupture"}
-        missing = required - set(df_out.columns)
-        if missing:
-            raise ValueError(f"df_out missing required columns: {sorted(missing)}")
+        with trace.timing(cfg.timings, tracer) as timer:
+            if not cfg.result_cache:
+                out = EpistemicAnalytics._enrich(df_out, cfg)
+            else:
+                cache = result_cache()
+                with trace.stage("cache_lookup", len(df_out)):
+                    key = EpistemicAnalytics._result_key(df_out, cfg)
+                    out, tier = cache.get(key)
+                if out is None:
+                    out = EpistemicAnalytics._enrich(df_out, cfg)
+                    with trace.stage("cache_store"):
+                        cache.put(key, out)
+                out["cache"] = {"hit": tier is not None, "tier": tier, "key": key}
+            if timer is not None:
+                out["timings"] = timer.report()
+            elif cfg.result_cache:
+                out.pop("timings", None)
+        return out
+
+    @staticmethod
+    def _result_key(df_out: pd.DataFrame | QSIFrame, cfg: EpistemicConfig) -> str:
+        """Result-cache key: df_out content, canonical config, today's date (the expiry estimate is
+        relative to it), the baseline file's identity and the registered diagnostics' code."""
+        base = None
+        if cfg.baseline_mode == "file" and cfg.baseline_file:
+            try:
+                st = os.stat(cfg.baseline_file)
+                base = [os.path.abspath(cfg.baseline_file), st.st_size, st.st_mtime_ns]
+            except OSError:
+                base = [cfg.baseline_file, None]
+        diags = sorted((name, callable_token(fn)) for name, fn in _CUSTOM_DIAG.items())
+        return cache_key("enrich", data_fingerprint(df_out), config_fingerprint(replace(cfg, timings=False)),
+                         str(pd.Timestamp.today().date()), base, diags)
+
+    @staticmethod
+    def _enrich(df_out: pd.DataFrame | QSIFrame, cfg: EpistemicConfig) -> Dict[str, Any]:
+        with trace.stage("columns", len(df_out)):
+            X = EpistemicAnalytics._columns(df_out, cfg)
+        timer = trace.current()
+        t = time.perf_counter()
 
         eps = 1e-9
-        # Safe casts
-        date = pd.to_datetime(df_out["Date"], errors="coerce")
-        actual = pd.to_numeric(df_out["Actual"], errors="coerce")
-        forecast = pd.to_numeric(df_out["Forecast"], errors="coerce")
-        drift = pd.to_numeric(df_out["drift"], errors="coerce").fillna(0.0)
-        theta = pd.to_numeric(df_out["Theta"], errors="coerce").fillna(0.0)
-        loss = pd.to_numeric(df_out["loss"], errors="coerce").fillna(0.0)
-        rupture = df_out["rupture"].astype(bool)
-
-        denom = (actual.abs() + eps)
-        pct_err = (drift / denom).replace([np.inf, -np.inf], np.nan).fillna(0.0)
+        drift, loss, rupture = X.drift, X.loss, X.rupture
+        denom = np.abs(X.actual) + eps
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct_err = _finite_or_zero(drift / denom)
+            loss_per_unit = _finite_or_zero(loss / denom)
 
         on_target = pct_err <= float(cfg.on_target_pct)
-        over = (forecast > actual) & ~on_target
-        under = (forecast < actual) & ~on_target
+        over = (X.forecast > X.actual) & ~on_target
+        under = (X.forecast < X.actual) & ~on_target
         severe = pct_err >= float(cfg.severe_pct)
 
         econ = {
             "total_loss": float(loss.sum()),
-            "loss_per_unit_mean": float((loss / denom).replace([np.inf, -np.inf], np.nan).fillna(0.0).mean()),
+            "loss_per_unit_mean": float(loss_per_unit.mean()),
             "overforecast_count": int(over.sum()),
             "underforecast_count": int(under.sum()),
             "on_target_count": int(on_target.sum()),
             "severe_miss_count": int(severe.sum()),
             "severe_miss_rate": float(severe.mean()),
         }
+        t = _lap(timer, "economics", t, X.n)
 
         # Baseline & recent windows
-        baseline = EpistemicAnalytics._load_baseline(df_out, cfg)
+        baseline = EpistemicAnalytics._load_baseline(drift, cfg)
         recent_len = int(cfg.recent_window) if cfg.recent_window else len(baseline)
-        recent_len = max(1, min(recent_len, len(df_out)))
-        recent = drift.iloc[-recent_len:].astype(float)
+        recent_len = max(1, min(recent_len, X.n))
+        recent = drift[-recent_len:]
 
         scope = EpistemicAnalytics._scope_score(recent, baseline, cfg.scope_q_lo, cfg.scope_q_hi)
         psi = EpistemicAnalytics._psi(
@@ -271,7 +387,7 @@ class EpistemicAnalytics:
         )
 
         # Margin series for ETA
-        margin = (drift - theta).astype(float)
+        margin = drift - X.theta
         eta_days, eta_note = EpistemicAnalytics._eta_to_breach(
             margin, cfg.expiry_k, cfg.expiry_lookback, cfg.min_points_for_trend
         )
@@ -286,10 +402,11 @@ class EpistemicAnalytics:
             "eta_rationale": eta_note,
             "expiry_estimate_date": expiry_date,
         }
+        t = _lap(timer, "epistemic", t, X.n)
 
         # Diagnostics: quantiles & windows (QUANTILES FULLY DYNAMIC)
-        def qdict(s: pd.Series, qs: Tuple[float, ...]) -> Dict[str, float]:
-            s = pd.to_numeric(s, errors="coerce").dropna()
+        def qdict(s: np.ndarray, qs: Tuple[float, ...]) -> Dict[str, float]:
+            s = EpistemicAnalytics._finite(s)
             labels = [f"q{int(round(q*100)):02d}" for q in qs]
             if len(s) == 0:
                 return {lbl: 0.0 for lbl in labels}
@@ -303,14 +420,15 @@ class EpistemicAnalytics:
             "recent_quantiles":   qdict(recent,   cfg.quantiles),
             "quantiles_used":     list(cfg.quantiles),
         }
+        t = _lap(timer, "diagnostics", t, X.n)
 
         # ---------------- Alignment block (dynamic) ----------------
         top_share = EpistemicAnalytics._pareto_share(loss, top_frac=cfg.pareto_top_frac)
-        weekend = EpistemicAnalytics._weekend_mask(date, cfg.weekend_days)
+        weekend = EpistemicAnalytics._weekend_mask(X.weekday, cfg.weekend_days)
         weekday = ~weekend
 
-        wk_drift = float(pd.to_numeric(drift[weekend], errors="coerce").dropna().mean()) if weekend.any() else 0.0
-        wd_drift = float(pd.to_numeric(drift[weekday], errors="coerce").dropna().mean()) if weekday.any() else 0.0
+        wk_drift = float(drift[weekend].mean()) if weekend.any() else 0.0
+        wd_drift = float(drift[weekday].mean()) if weekday.any() else 0.0
         weekend_multiplier = (wk_drift / wd_drift) if wd_drift > 0 else (np.inf if wk_drift > 0 else 0.0)
 
         alignment = {
@@ -323,23 +441,19 @@ class EpistemicAnalytics:
 
         # Policy vs non-policy variance (if provided)
         policy_breakdown: Optional[Dict[str, Any]] = None
-        if cfg.policy_col and (cfg.policy_col in df_out.columns):
-            pc = df_out[cfg.policy_col].astype(bool)
+        if X.policy is not None:
+            pc = X.policy
 
-            def econ_slice(mask: pd.Series) -> Dict[str, Any]:
-                sl = df_out[mask]
-                if sl.empty:
+            def econ_slice(mask: np.ndarray) -> Dict[str, Any]:
+                if not mask.any():
                     return {"n": 0, "ruptures": 0, "total_loss": 0.0,
                             "loss_per_unit_mean": 0.0, "mean_drift": 0.0, "std_drift": 0.0}
-                loss_sl = pd.to_numeric(sl["loss"], errors="coerce").fillna(0.0)
-                denom_sl = (pd.to_numeric(sl["Actual"], errors="coerce").abs() + eps)
-                drift_sl = pd.to_numeric(sl["drift"], errors="coerce").fillna(0.0)
-                d = (loss_sl / denom_sl).replace([np.inf, -np.inf], np.nan).fillna(0.0)
+                drift_sl = drift[mask]
                 return {
-                    "n": int(len(sl)),
-                    "ruptures": int(sl["rupture"].sum()),
-                    "total_loss": float(loss_sl.sum()),
-                    "loss_per_unit_mean": float(d.mean()),
+                    "n": int(mask.sum()),
+                    "ruptures": int(rupture[mask].sum()),
+                    "total_loss": float(loss[mask].sum()),
+                    "loss_per_unit_mean": float(loss_per_unit[mask].mean()),
                     "mean_drift": float(drift_sl.mean()),
                     "std_drift": float(drift_sl.std(ddof=0)),
                 }
@@ -354,34 +468,49 @@ class EpistemicAnalytics:
                 if policy_breakdown["policy_true"]["n"] and policy_breakdown["policy_false"]["n"] else 0.0
             )
 
+        t = _lap(timer, "alignment", t, X.n)
+
         # ---------------- Optional segment breakdown ----------------
         by_group: Optional[Dict[str, Any]] = None
-        if cfg.groupby and (cfg.groupby in df_out.columns):
+        if X.groups is not None:
             by_group = {}
-            for g, sub in df_out.groupby(cfg.groupby, sort=True):
-                denom_g = (pd.to_numeric(sub["Actual"], errors="coerce").abs() + eps)
-                drift_g = pd.to_numeric(sub["drift"], errors="coerce").fillna(0.0)
-                pct_err_g = (drift_g / denom_g).replace([np.inf, -np.inf], np.nan).fillna(0.0)
-                on_t_g = (pct_err_g <= cfg.on_target_pct)
-                severe_g = (pct_err_g >= cfg.severe_pct)
-                by_group[str(g)] = {
-                    "n": int(len(sub)),
-                    "ruptures": int(sub["rupture"].sum()),
-                    "loss": float(pd.to_numeric(sub["loss"], errors="coerce").fillna(0.0).sum()),
-                    "on_target_rate": float(on_t_g.mean()) if len(sub) else 0.0,
-                    "severe_rate": float(severe_g.mean()) if len(sub) else 0.0,
-                    "mean_drift": float(drift_g.mean()) if len(sub) else 0.0,
+            codes, keys = X.groups
+            # rows grouped contiguously (row order kept within a group); one reduceat per metric
+            order = np.argsort(codes, kind="stable")
+            order = order[codes[order] >= 0]
+            counts = np.bincount(codes[order], minlength=len(keys))
+            if len(order):
+                starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+                present = counts > 0
+                sums = {
+                    name: np.add.reduceat(arr[order], starts[present])
+                    for name, arr in (("ruptures", rupture.astype(np.int64)), ("loss", loss), ("drift", drift),
+                                      ("on_target", on_target.astype(np.int64)), ("severe", severe.astype(np.int64)))
                 }
+                for i, j in enumerate(np.flatnonzero(present)):
+                    n_g = int(counts[j])
+                    by_group[str(keys[j])] = {
+                        "n": n_g,
+                        "ruptures": int(sums["ruptures"][i]),
+                        "loss": float(sums["loss"][i]),
+                        "on_target_rate": float(sums["on_target"][i] / n_g),
+                        "severe_rate": float(sums["severe"][i] / n_g),
+                        "mean_drift": float(sums["drift"][i] / n_g),
+                    }
+            _lap(timer, "by_group", t, X.n)
 
         # ---------------- Custom diagnostics plug-ins ----------------
         custom_out: Dict[str, Any] = {}
+        if _CUSTOM_DIAG and isinstance(df_out, QSIFrame):
+            df_out = df_out.to_pandas()
         for name, fn in _CUSTOM_DIAG.items():
-            try:
-                res = fn(df_out, cfg)
-                if isinstance(res, dict):
-                    custom_out[name] = res
-            except Exception as e:
-                custom_out[name] = {"error": f"{type(e).__name__}: {e}"}
+            with trace.stage(f"custom_diag:{name}", X.n, kind="plugin"):
+                try:
+                    res = fn(df_out, cfg)
+                    if isinstance(res, dict):
+                        custom_out[name] = res
+                except Exception as e:
+                    custom_out[name] = {"error": f"{type(e).__name__}: {e}"}
 
         out: Dict[str, Any] = {
             "economics": econ,
@@ -397,4 +526,10 @@ class EpistemicAnalytics:
             out["policy_breakdown"] = policy_breakdown
         if custom_out:
             out["custom"] = custom_out
-        return out
\ No newline at end of file
+        return out
+
+
+def _finite_or_zero(x: np.ndarray) -> np.ndarray:
+    """±inf and NaN -> 0 (in place)."""
+    x[~np.isfinite(x)] = 0.0
+    return x
@@ -0,0 +1,249 @@
+# qsi_frame.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Optional, Tuple
+import copy
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86_400 * 10**9
+
+
+# ====================================================
+#               Validated columnar input
+# ====================================================
+class QSIFrame:
+    """
+    Validated, compact columnar input for ``QSIEngine.analyze`` and ``EpistemicAnalytics.enrich``,
+    built once and passed around without further coercion or copies.
+
+    Forecast / actual / cost are contiguous float64 arrays, dates are int64 nanoseconds since the
+    epoch and the segment column (if any) is stored as int32 codes into sorted ``categories``
+    (-1 == missing key). Any other column rides along as a NumPy array in ``columns``.
+
+        frame = QSIFrame.from_pandas(df, segment="SKU")           # validate + date-sort once
+        out, rep = QSIEngine(cfg).analyze(frame, groupby="SKU")   # out is a QSIFrame too
+        diag = EpistemicAnalytics.enrich(out, EpistemicConfig(groupby="SKU"))
+        out.to_pandas()                                           # zero-copy DataFrame view
+    """
+
+    __slots__ = ("date", "forecast", "actual", "cost", "codes", "categories", "columns",
+                 "names", "segment", "date_sorted")
+
+    def __init__(
+        self,
+        date: np.ndarray,
+        forecast: np.ndarray,
+        actual: np.ndarray,
+        cost: np.ndarray,
+        codes: Optional[np.ndarray] = None,
+        categories: Optional[np.ndarray] = None,
+        columns: Optional[Dict[str, np.ndarray]] = None,
+        names: Tuple[str, str, str, str] = ("Date", "Forecast", "Actual", "Unit_Cost"),
+        segment: Optional[str] = None,
+        date_sorted: Optional[bool] = None,
+    ):
+        self.date = np.ascontiguousarray(date, dtype=np.int64)
+        self.forecast = np.ascontiguousarray(forecast, dtype=np.float64)
+        self.actual = np.ascontiguousarray(actual, dtype=np.float64)
+        self.cost = np.ascontiguousarray(cost, dtype=np.float64)
+        n = len(self.date)
+        if not (len(self.forecast) == len(self.actual) == len(self.cost) == n):
+            raise ValueError("QSIFrame columns must have equal length.")
+        if (codes is None) != (segment is None):
+            raise ValueError("segment codes and segment name go together.")
+        self.codes = None if codes is None else np.ascontiguousarray(codes, dtype=np.int32)
+        self.categories = None if categories is None else np.asarray(categories)
+        if self.codes is not None and len(self.codes) != n:
+            raise ValueError("QSIFrame columns must have equal length.")
+        self.columns: Dict[str, np.ndarray] = {}
+        for k, v in (columns or {}).items():
+            v = np.asarray(v)
+            if len(v) != n:
+                raise ValueError(f"QSIFrame column '{k}' has length {len(v)}, expected {n}.")
+            self.columns[str(k)] = v
+        self.names = tuple(str(x) for x in names)
+        self.segment = None if segment is None else str(segment)
+        self.date_sorted = bool(np.all(self.date[1:] >= self.date[:-1])) if date_sorted is None else bool(date_sorted)
+
+    # ----------------- Construction -----------------
+    @classmethod
+    def from_pandas(
+        cls,
+        df: pd.DataFrame,
+        segment: Optional[str] = None,
+        columns: Optional[Iterable[str]] = None,
+        col_date: str = "Date",
+        col_fc: str = "Forecast",
+        col_ac: str = "Actual",
+        col_cost: str = "Unit_Cost",
+        sort: bool = True,
+    ) -> "QSIFrame":
+        """
+        Validate ``df`` once (the checks ``QSIEngine`` applies to DataFrames) and store it columnar.
+        ``columns`` picks the extra columns to carry (default: all others). With ``sort`` the rows
+        are stably date-ordered; already ordered input is detected and not permuted.
+        """
+        need = [col_date, col_fc, col_ac, col_cost]
+        miss = [x for x in need + ([segment] if segment else []) if x not in df.columns]
+        if miss:
+            raise ValueError(f"Missing columns: {miss}. Required: {need}")
+        skip = set(need) | ({segment} if segment else set())
+        extra = [k for k in (df.columns if columns is None else columns) if k not in skip]
+        return cls.from_arrays(
+            df[col_date], df[col_fc], df[col_ac], df[col_cost],
+            segments=df[segment] if segment else None,
+            columns={str(k): df[k].to_numpy() for k in extra},
+            names=(col_date, col_fc, col_ac, col_cost), segment=segment, sort=sort,
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        dates: Any,
+        forecast: Any,
+        actual: Any,
+        cost: Any,
+        segments: Any = None,
+        columns: Optional[Dict[str, Any]] = None,
+        names: Tuple[str, str, str, str] = ("Date", "Forecast", "Actual", "Unit_Cost"),
+        segment: Optional[str] = None,
+        sort: bool = True,
+        assume_sorted: bool = False,
+    ) -> "QSIFrame":
+        """
+        Validate plain arrays (dates as datetime64, parseable values or int64 ns) without building a
+        DataFrame. ``segments`` holds one key per row and is stored under ``segment`` (default
+        "segment"). ``assume_sorted`` asserts the input is already date-ordered: rows are never
+        permuted and unordered input raises instead of being sorted.
+        """
+        date = _as_ns(dates, names[0])
+        fc = np.asarray(forecast, dtype=np.float64)
+        ac = np.asarray(actual, dtype=np.float64)
+        cost = np.asarray(cost, dtype=np.float64)
+        if not (len(fc) == len(ac) == len(cost) == len(date)):
+            raise ValueError("QSIFrame columns must have equal length.")
+        if np.isnan(fc).any() or np.isnan(ac).any():
+            raise ValueError("NaNs in Forecast/Actual.")
+        if (cost < 0).any():
+            raise ValueError("Unit_Cost must be >= 0.")
+
+        codes = categories = None
+        if segments is not None:
+            codes, uniques = pd.factorize(segments, sort=True)
+            categories = np.asarray(uniques)
+            segment = segment or "segment"
+        else:
+            segment = None
+        cols = {str(k): np.asarray(v) for k, v in (columns or {}).items()}
+
+        ordered = len(date) < 2 or bool(np.all(date[1:] >= date[:-1]))
+        if assume_sorted and not ordered:
+            raise ValueError(f"assume_sorted=True but '{names[0]}' is not in non-decreasing order.")
+        if sort and not ordered:
+            order = np.argsort(date, kind="stable")
+            date, fc, ac, cost = date[order], fc[order], ac[order], cost[order]
+            codes = None if codes is None else codes[order]
+            cols = {k: v[order] for k, v in cols.items()}
+            ordered = True
+        return cls(date, fc, ac, cost, codes, categories, cols,
+                   names=names, segment=segment, date_sorted=ordered)
+
+    # ----------------- Views -----------------
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns or name in self.names or (name == self.segment and name is not None)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Column by name: core columns as stored, the segment as keys, extras as carried."""
+        if name in self.columns:
+            return self.columns[name]
+        if name == self.segment and name is not None:
+            return self.segment_keys()
+        core = dict(zip(self.names, (self.date.view("datetime64[ns]"), self.forecast, self.actual, self.cost)))
+        if name in core:
+            return core[name]
+        raise KeyError(name)
+
+    def __repr__(self) -> str:
+        seg = f", segment={self.segment!r} ({len(self.categories)} keys)" if self.segment else ""
+        return f"QSIFrame(n={len(self)}{seg}, columns={list(self.columns)})"
+
+    def segment_keys(self) -> np.ndarray:
+        """Segment key per row (object array, None where the key is missing)."""
+        if self.codes is None:
+            raise ValueError("QSIFrame has no segment column.")
+        keys = np.empty(len(self.categories) + 1, dtype=object)
+        keys[:-1] = self.categories
+        keys[-1] = None
+        return keys[self.codes]
+
+    def weekday(self) -> np.ndarray:
+        """Day of week per row (0=Mon ... 6=Sun); 1970-01-01 was a Thursday."""
+        return ((self.date // NS_PER_DAY + 3) % 7).astype(np.int8)
+
+    def with_columns(self, **cols: np.ndarray) -> "QSIFrame":
+        """Shallow copy with extra columns added or replaced (arrays are shared, not copied)."""
+        out = copy.copy(self)
+        out.columns = {**self.columns}
+        for k, v in cols.items():
+            v = np.asarray(v)
+            if len(v) != len(self):
+                raise ValueError(f"QSIFrame column '{k}' has length {len(v)}, expected {len(self)}.")
+            out.columns[k] = v
+        return out
+
+    def take(self, order: np.ndarray) -> "QSIFrame":
+        """Rows ``order`` (positions) as a new frame."""
+        return QSIFrame(
+            self.date[order], self.forecast[order], self.actual[order], self.cost[order],
+            None if self.codes is None else self.codes[order], self.categories,
+            {k: v[order] for k, v in self.columns.items()},
+            names=self.names, segment=self.segment,
+        )
+
+    def sort_by_date(self) -> "QSIFrame":
+        """Stable date order (self when already ordered)."""
+        return self if self.date_sorted else self.take(np.argsort(self.date, kind="stable"))
+
+    def segment_layout(self) -> Tuple["QSIFrame", np.ndarray, np.ndarray]:
+        """Rows reordered segment-contiguously (sorted keys, row order kept within a segment; missing
+        keys dropped). Returns (frame, offsets, row counts); segment j is offsets[j]:offsets[j+1]."""
+        if self.codes is None:
+            raise ValueError("QSIFrame has no segment column.")
+        order = np.argsort(self.codes, kind="stable")
+        order = order[self.codes[order] >= 0]
+        counts = np.bincount(self.codes[order], minlength=len(self.categories))
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return self.take(order), offsets, counts
+
+    def to_pandas(self, names: Optional[Tuple[str, str, str, str]] = None) -> pd.DataFrame:
+        """DataFrame over the same buffers (no copies); the segment becomes a categorical column.
+        ``names`` relabels the four core columns."""
+        names = tuple(names) if names is not None else self.names
+        data: Dict[str, Any] = {
+            names[0]: self.date.view("datetime64[ns]"),
+            names[1]: self.forecast,
+            names[2]: self.actual,
+            names[3]: self.cost,
+        }
+        if self.segment is not None:
+            data[self.segment] = pd.Categorical.from_codes(self.codes, categories=self.categories)
+        data.update(self.columns)
+        return pd.DataFrame(data, copy=False)
+
+
+def _as_ns(dates: Any, name: str) -> np.ndarray:
+    """Dates as int64 ns since the epoch; unparseable values raise, missing ones are rejected."""
+    if isinstance(dates, np.ndarray) and np.issubdtype(dates.dtype, np.datetime64):
+        out = dates.astype("datetime64[ns]", copy=False).view(np.int64)
+    else:
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, errors="raise")
+        out = np.asarray(pd.Series(dates).to_numpy(dtype="datetime64[ns]")).view(np.int64)
+    if np.any(out == np.iinfo(np.int64).min):
+        raise ValueError(f"Missing dates in '{name}'.")
+    return out
+
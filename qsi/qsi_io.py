@@ -0,0 +1,341 @@
+# qsi_io.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import os
+import numpy as np
+import pandas as pd
+
+from .qsi_frame import QSIFrame
+
+# ---------------- PyArrow (optional) ----------------
+_USE_ARROW = False
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+    _USE_ARROW = True
+except Exception:
+    _USE_ARROW = False
+
+
+def _fmt(path: str) -> str:
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext in (".arrow", ".feather", ".ipc"):
+        return "arrow"
+    if ext in (".csv", ".txt", ".gz"):
+        return "csv"
+    raise ValueError(f"Unsupported file type '{ext}' for {path}. Use .csv, .parquet or .arrow.")
+
+def _need_arrow() -> None:
+    if not _USE_ARROW:
+        raise ImportError("Parquet support requires pyarrow (pip install pyarrow).")
+
+
+# ====================================================
+#                  Chunked readers
+# ====================================================
+def iter_frames(path: str, chunksize: int = 100_000, columns: Optional[list] = None) -> Iterator[pd.DataFrame]:
+    """Yield ``path`` as DataFrames of at most ``chunksize`` rows (CSV, Parquet or Arrow IPC)."""
+    chunksize = max(1, int(chunksize))
+    fmt = _fmt(path)
+    if fmt == "parquet":
+        _need_arrow()
+        pf = pq.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif fmt == "arrow":
+        _need_arrow()
+        table = _read_ipc(path)
+        table = table.select(columns) if columns is not None else table
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns, float_precision="round_trip")
+
+
+# ====================================================
+#                  Incremental writer
+# ====================================================
+class FrameWriter:
+    """Append frames (DataFrame, QSIFrame or Arrow table) to one CSV, Parquet or Arrow IPC file;
+    the first frame fixes the schema. IPC files are written uncompressed so they can be memory-mapped."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.fmt = _fmt(self.path)
+        if self.fmt == "parquet":
+            _need_arrow()
+        self._writer = None
+        self._schema = None
+        self._started = False
+        self.rows = 0
+
+    def write(self, df: Any) -> None:
+        if df is None or len(df) == 0:
+            return
+        if self.fmt in ("parquet", "arrow"):
+            table = to_arrow(df, schema=self._schema)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = (pq.ParquetWriter(self.path, self._schema) if self.fmt == "parquet"
+                                else pa.ipc.new_file(self.path, self._schema))
+            self._writer.write_table(table)
+        else:
+            if not isinstance(df, pd.DataFrame):
+                df = df.to_pandas()
+            df.to_csv(self.path, mode=("a" if self._started else "w"), header=not self._started, index=False)
+        self._started = True
+        self.rows += int(len(df))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "FrameWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ====================================================
+#            Arrow tables <-> QSIFrame / pandas
+# ====================================================
+def to_arrow(data: Any, schema: Optional["pa.Schema"] = None) -> "pa.Table":
+    """Arrow table from a DataFrame, QSIFrame or table. QSIFrame columns are wrapped without copies
+    (the segment becomes a dictionary column)."""
+    _need_arrow()
+    if isinstance(data, pa.Table):
+        return data if schema is None else data.cast(schema)
+    if isinstance(data, QSIFrame):
+        cols: Dict[str, Any] = {
+            data.names[0]: pa.array(data.date.view("datetime64[ns]")),
+            data.names[1]: pa.array(data.forecast),
+            data.names[2]: pa.array(data.actual),
+            data.names[3]: pa.array(data.cost),
+        }
+        if data.segment is not None:
+            cols[data.segment] = pa.DictionaryArray.from_arrays(
+                pa.array(data.codes, mask=data.codes < 0), pa.array(data.categories))
+        cols.update({k: pa.array(v) for k, v in data.columns.items()})
+        table = pa.table(cols)
+        return table if schema is None else table.cast(schema)
+    return pa.Table.from_pandas(data, schema=schema, preserve_index=False)
+
+def frame_from_arrow(
+    table: "pa.Table",
+    segment: Optional[str] = None,
+    names: Tuple[str, str, str, str] = ("Date", "Forecast", "Actual", "Unit_Cost"),
+    sort: bool = True,
+) -> QSIFrame:
+    """
+    QSIFrame over an Arrow table with the usual validation. float64 columns without nulls and
+    timestamp[ns] dates are viewed, not copied (e.g. straight out of a memory-mapped IPC file);
+    other numeric types are converted once. A dictionary-encoded segment maps to codes directly.
+    """
+    _need_arrow()
+    miss = [x for x in list(names) + ([segment] if segment else []) if x not in table.column_names]
+    if miss:
+        raise ValueError(f"Missing columns: {miss}. Required: {list(names)}")
+    date = _arrow_numpy(table[names[0]].cast(pa.timestamp("ns")))
+    fc, ac, cost = (_arrow_numpy(table[k], np.float64) for k in names[1:])
+    segments = _arrow_segments(table[segment]) if segment else None
+    extra = {k: _arrow_numpy(table[k]) for k in table.column_names if k not in names and k != segment}
+    return QSIFrame.from_arrays(date, fc, ac, cost, segments=segments, columns=extra,
+                                names=names, segment=segment, sort=sort)
+
+def _arrow_numpy(col: "pa.ChunkedArray", dtype: Any = None) -> np.ndarray:
+    """NumPy view of a column (a single contiguous chunk without nulls is zero-copy)."""
+    arr = col.combine_chunks() if col.num_chunks != 1 else col.chunk(0)
+    if pa.types.is_dictionary(arr.type):
+        arr = arr.dictionary_decode()
+    if dtype is not None and arr.null_count:
+        arr = arr.cast(pa.float64())              # nulls -> NaN, rejected by validation
+    out = arr.to_numpy(zero_copy_only=False)
+    return out if dtype is None else np.asarray(out, dtype=dtype)
+
+def _arrow_segments(col: "pa.ChunkedArray") -> Any:
+    """Segment keys per row; dictionary columns become a Categorical over their codes."""
+    if not pa.types.is_dictionary(col.type):
+        return _arrow_numpy(col)
+    col = col.unify_dictionaries()
+    if col.num_chunks == 0:
+        return pd.Categorical([])
+    codes = pa.chunked_array([c.indices for c in col.chunks]).combine_chunks()
+    codes = codes.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int64, copy=False)
+    return pd.Categorical.from_codes(codes, categories=pd.Index(col.chunk(0).dictionary.to_pylist()))
+
+
+# ====================================================
+#     Memory-mapped reads with predicate pushdown
+# ====================================================
+_DATE_PARTS = {"year": "%Y", "month": "%Y-%m", "day": "%Y-%m-%d"}
+
+def _read_ipc(path: str) -> "pa.Table":
+    """Whole Arrow IPC file, memory-mapped: columns are views into the mapping, nothing is copied."""
+    source = pa.memory_map(str(path), "r")
+    try:
+        return pa.ipc.open_file(source).read_all()
+    except pa.ArrowInvalid:                        # IPC stream rather than file format
+        return pa.ipc.open_stream(pa.memory_map(str(path), "r")).read_all()
+
+def _dataset_format(path: str) -> str:
+    if os.path.isdir(path):
+        for _, _, files in os.walk(path):
+            for f in files:
+                ext = os.path.splitext(f)[1].lower()
+                if ext in (".parquet", ".pq"):
+                    return "parquet"
+                if ext in (".arrow", ".feather", ".ipc"):
+                    return "arrow"
+        raise ValueError(f"No .parquet or .arrow files under {path}.")
+    fmt = _fmt(path)
+    if fmt == "csv":
+        raise ValueError(f"read_table needs Parquet or Arrow IPC input, got {path}.")
+    return fmt
+
+def read_table(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    segments: Optional[Iterable[Any]] = None,
+    segment_col: str = "Segment",
+    start: Any = None,
+    end: Any = None,
+    date_col: str = "Date",
+) -> "pa.Table":
+    """
+    Read a Parquet / Arrow IPC file or a hive-partitioned directory (as written by ``write_dataset``)
+    as an Arrow table, loading only what the run needs.
+
+    segments:   keep rows whose ``segment_col`` is in this collection
+    start, end: inclusive date bounds on ``date_col``
+    Predicates are pushed down: partition directories that cannot match are never opened and
+    Parquet row groups are skipped by their statistics. Arrow IPC is memory-mapped; an unfiltered
+    IPC file is returned zero-copy. Partition-derived date buckets are dropped from the result.
+    """
+    _need_arrow()
+    path = str(path)
+    fmt = _dataset_format(path)
+    if fmt == "arrow" and not os.path.isdir(path):
+        table = _read_ipc(path)
+        expr = _predicate(table.schema.names, segments, segment_col, start, end, date_col, None)
+        if expr is not None:
+            table = table.filter(expr)
+        return table.select(list(columns)) if columns is not None else table
+
+    dataset = ds.dataset(
+        path, format="ipc" if fmt == "arrow" else "parquet",
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True) if os.path.isdir(path) else None,
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+    )
+    names = dataset.schema.names
+    bucket = next((f"{date_col}_{g}" for g in _DATE_PARTS if f"{date_col}_{g}" in names), None)
+    expr = _predicate(names, segments, segment_col, start, end, date_col, bucket)
+    if columns is None:
+        columns = [k for k in names if k != bucket]
+    return dataset.to_table(columns=list(columns), filter=expr)
+
+def _predicate(
+    names: Sequence[str], segments: Optional[Iterable[Any]], segment_col: str,
+    start: Any, end: Any, date_col: str, bucket: Optional[str],
+) -> Optional["ds.Expression"]:
+    """Row filter for segment membership and an inclusive date range (plus the matching
+    partition-bucket range so whole directories are pruned)."""
+    terms = []
+    if segments is not None:
+        if segment_col not in names:
+            raise ValueError(f"Segment column '{segment_col}' not found; columns: {list(names)}")
+        terms.append(ds.field(segment_col).isin(list(segments)))
+    for bound, op in ((start, "ge"), (end, "le")):
+        if bound is None:
+            continue
+        if date_col not in names:
+            raise ValueError(f"Date column '{date_col}' not found; columns: {list(names)}")
+        ts = pd.Timestamp(bound)
+        terms.append(getattr(ds.field(date_col), f"__{op}__")(pa.scalar(ts.to_datetime64())))
+        if bucket is not None:
+            key = ts.strftime(_DATE_PARTS[bucket.rsplit("_", 1)[1]])
+            terms.append(getattr(ds.field(bucket), f"__{op}__")(key))
+    expr = None
+    for t in terms:
+        expr = t if expr is None else expr & t
+    return expr
+
+def read_frame(
+    path: str,
+    segment: Optional[str] = None,
+    segments: Optional[Iterable[Any]] = None,
+    start: Any = None,
+    end: Any = None,
+    names: Tuple[str, str, str, str] = ("Date", "Forecast", "Actual", "Unit_Cost"),
+    columns: Optional[Sequence[str]] = None,
+) -> QSIFrame:
+    """
+    ``read_table`` straight into a QSIFrame for ``QSIEngine.analyze``: the four core columns (named
+    by ``names``), the ``segment`` column and any extra ``columns``, filtered to ``segments`` and
+    the ``start``..``end`` date range before anything is materialized.
+
+        frame = read_frame("runs/2024", segment="SKU", segments=["A", "B"], start="2024-03-01")
+        out, rep = QSIEngine(cfg).analyze(frame, groupby="SKU")
+    """
+    want = list(dict.fromkeys(list(names) + ([segment] if segment else []) + list(columns or [])))
+    table = read_table(path, columns=want, segments=segments, segment_col=segment or "Segment",
+                       start=start, end=end, date_col=names[0])
+    return frame_from_arrow(table, segment=segment, names=names)
+
+
+# ====================================================
+#         Partitioned writes (segment / date)
+# ====================================================
+def write_dataset(
+    data: Any,
+    base_dir: str,
+    segment: Optional[str] = None,
+    date_col: str = "Date",
+    date_partition: Optional[str] = "month",
+    format: str = "parquet",
+    existing: str = "delete_matching",
+) -> List[str]:
+    """
+    Write a DataFrame / QSIFrame / Arrow table as a hive-partitioned dataset:
+    ``base_dir/<segment>=<key>/<date_col>_<bucket>=<period>/part-0.<ext>``.
+
+    date_partition: "year" | "month" | "day" | None (bucket column derived from ``date_col``)
+    format:         "parquet" or "arrow" (uncompressed IPC, memory-mappable on read)
+    existing:       "delete_matching" replaces only the partitions being written;
+                    "overwrite_or_ignore" / "error" as in pyarrow.dataset.write_dataset
+    Returns the written file paths. Read back (with pushdown) via ``read_table`` / ``read_frame``.
+    """
+    _need_arrow()
+    if format not in ("parquet", "arrow"):
+        raise ValueError("format must be 'parquet' or 'arrow'.")
+    if date_partition is not None and date_partition not in _DATE_PARTS:
+        raise ValueError(f"date_partition must be one of {list(_DATE_PARTS)} or None.")
+    table = to_arrow(data)
+    keys = []
+    if segment:
+        if segment not in table.column_names:
+            raise ValueError(f"Segment column '{segment}' not found.")
+        keys.append(segment)
+    if date_partition:
+        if date_col not in table.column_names:
+            raise ValueError(f"Date column '{date_col}' not found.")
+        bucket = f"{date_col}_{date_partition}"
+        table = table.append_column(bucket, pc.strftime(table[date_col], format=_DATE_PARTS[date_partition]))
+        keys.append(bucket)
+
+    written: List[str] = []
+    ext = "parquet" if format == "parquet" else "arrow"
+    ds.write_dataset(
+        table, str(base_dir), format="parquet" if format == "parquet" else "ipc",
+        partitioning=ds.partitioning(pa.schema([table.schema.field(k) for k in keys]), flavor="hive") if keys else None,
+        basename_template=f"part-{{i}}.{ext}",
+        existing_data_behavior=existing,
+        file_visitor=lambda f: written.append(f.path),
+    )
+    return sorted(written)
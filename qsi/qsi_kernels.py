@@ -0,0 +1,494 @@
+# qsi_kernels.py
+from __future__ import annotations
+from types import SimpleNamespace
+from typing import Any, Tuple
+import math
+import numpy as np
+import pandas as pd
+
+# ---------------- Numba (optional) ----------------
+_USE_NUMBA = False
+try:
+    from numba import njit
+    _USE_NUMBA = True
+except Exception:
+    _USE_NUMBA = False
+
+
+# ====================================================
+#            Segmented recurrence kernels
+# ====================================================
+# All kernels walk segment-contiguous arrays once; offsets[j]:offsets[j+1] is segment j and the
+# memory / EWMA state resets at every segment start. They are written in the numba-compatible
+# subset of Python/NumPy so the same source serves as the interpreted fallback and the JIT kernel.
+# Noise is pre-drawn by the caller (an empty array means "no noise").
+#
+# Per-segment state is passed in and updated in place so a run can be resumed where it stopped
+# (streaming / checkpoints): ``mem`` holds one memory value per segment and ``ewma_state`` one row
+# [mean, cov, old_wt, sum_wt, sum_wt2] per segment (all zeros == no observation yet).
+EWMA_STATE_WIDTH = 5
+
+def scan_memory(
+    drift: np.ndarray, theta: np.ndarray, cost: np.ndarray, offsets: np.ndarray, c: float,
+    mem: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Memory accumulation with rupture reset against a precomputed θ (custom / EWMA)."""
+    E = np.zeros_like(drift)
+    rupture = np.zeros(len(drift), dtype=np.bool_)
+    loss = np.zeros_like(drift)
+    for j in range(len(offsets) - 1):
+        m = mem[j]
+        for i in range(offsets[j], offsets[j + 1]):
+            d = drift[i]
+            if d > theta[i]:
+                rupture[i] = True; loss[i] = d * cost[i]; m = 0.0
+            else:
+                m = m + c * d
+            E[i] = m
+        mem[j] = m
+    return E, rupture, loss
+
+def scan_native(
+    drift: np.ndarray, cost: np.ndarray, noise: np.ndarray, offsets: np.ndarray,
+    base: float, a: float, c: float, mem: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Native θ = max(0, base + a·E + ε) with memory accumulation and rupture reset."""
+    E = np.zeros_like(drift)
+    Theta = np.zeros_like(drift)
+    rupture = np.zeros(len(drift), dtype=np.bool_)
+    loss = np.zeros_like(drift)
+    noisy = len(noise) > 0
+    for j in range(len(offsets) - 1):
+        m = mem[j]
+        for i in range(offsets[j], offsets[j + 1]):
+            d = drift[i]
+            eps = noise[i] if noisy else 0.0
+            th = max(0.0, base + a * m + eps)
+            Theta[i] = th
+            if d > th:
+                rupture[i] = True; loss[i] = d * cost[i]; m = 0.0
+            else:
+                m = m + c * d
+            E[i] = m
+        mem[j] = m
+    return E, Theta, rupture, loss
+
+def ewma_theta(
+    drift: np.ndarray, offsets: np.ndarray, alpha: float, k: float, ewma_state: np.ndarray
+) -> np.ndarray:
+    """θ = EWMA mean + k·EWMA std per segment.
+
+    Mirrors pandas ``ewm(alpha, adjust=True).mean()/.var()`` step for step (bit-identical),
+    with the undefined first variance treated as 0.
+    """
+    theta = np.zeros_like(drift)
+    f = 1.0 - alpha
+    for j in range(len(offsets) - 1):
+        s, e = offsets[j], offsets[j + 1]
+        if s == e:
+            continue
+        mean = ewma_state[j, 0]; cov = ewma_state[j, 1]; old_wt = ewma_state[j, 2]
+        sum_wt = ewma_state[j, 3]; sum_wt2 = ewma_state[j, 4]
+        if old_wt == 0.0:
+            # first observation of the segment
+            mean = drift[s]; cov = 0.0; old_wt = 1.0; sum_wt = 1.0; sum_wt2 = 1.0
+            theta[s] = mean
+            s += 1
+        for i in range(s, e):
+            x = drift[i]
+            sum_wt *= f; sum_wt2 *= f * f; old_wt *= f
+            old_mean = mean
+            if mean != x:
+                mean = (old_wt * old_mean + x) / (old_wt + 1.0)
+            cov = (old_wt * (cov + (old_mean - mean) * (old_mean - mean)) + (x - mean) * (x - mean)) / (old_wt + 1.0)
+            sum_wt += 1.0; sum_wt2 += 1.0; old_wt += 1.0
+            num = sum_wt * sum_wt
+            den = num - sum_wt2
+            var = (num / den) * cov if den > 0 else 0.0
+            theta[i] = mean + k * math.sqrt(var)
+        ewma_state[j, 0] = mean; ewma_state[j, 1] = cov; ewma_state[j, 2] = old_wt
+        ewma_state[j, 3] = sum_wt; ewma_state[j, 4] = sum_wt2
+    return theta
+
+def ewma_theta_batch(drift: np.ndarray, offsets: np.ndarray, alpha: float, k: float) -> np.ndarray:
+    """``ewma_theta`` from a fresh state with no state out (batch runs). Interpreted, the recurrence
+    is slow, so this hands it to pandas ``ewm`` (one grouped call), which it matches bit for bit."""
+    s = pd.Series(drift)
+    if len(offsets) > 2:
+        s = s.groupby(np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)), sort=False)
+    ew = s.ewm(alpha=alpha)
+    var = np.nan_to_num(ew.var().to_numpy(), nan=0.0)
+    return ew.mean().to_numpy() + k * np.sqrt(var)
+
+
+# ====================================================
+#          Config-axis sweep kernels (aggregates only)
+# ====================================================
+# Same recurrences as above, evaluated for K parameter variants at once. Only per-config aggregates
+# are kept: out[:, 0] = total loss, out[:, 1] = rupture count, out[:, 2] = sum of margins (drift - θ).
+# The interpreted versions update length-K state vectors with elementwise array ops (vectorized over
+# the config axis); the ``_loops`` twins do the same arithmetic with an explicit config loop, which
+# numba compiles in a fraction of the time array expressions take. Both give identical results.
+SWEEP_OUT_WIDTH = 3
+
+def sweep_native(
+    drift: np.ndarray, cost: np.ndarray, z: np.ndarray, offsets: np.ndarray,
+    base: np.ndarray, a: np.ndarray, c: np.ndarray, sigma: np.ndarray, out: np.ndarray,
+) -> None:
+    """Native θ for K configs; ``z`` is the shared standard-normal draw per row (empty = no noise)."""
+    noisy = len(z) > 0
+    for j in range(len(offsets) - 1):
+        mem = np.zeros(len(base))
+        for i in range(offsets[j], offsets[j + 1]):
+            d = drift[i]
+            if noisy:
+                th = np.maximum(0.0, base + a * mem + sigma * z[i])
+            else:
+                th = np.maximum(0.0, base + a * mem)
+            hit = d > th
+            out[:, 0] += np.where(hit, d * cost[i], 0.0)
+            out[:, 1] += np.where(hit, 1.0, 0.0)
+            out[:, 2] += d - th
+            mem = np.where(hit, 0.0, mem + c * d)
+
+def sweep_ewma(
+    drift: np.ndarray, cost: np.ndarray, offsets: np.ndarray,
+    alpha: np.ndarray, k: np.ndarray, out: np.ndarray,
+) -> None:
+    """EWMA θ (see ``ewma_theta``) for K configs. Ruptures against a precomputed θ do not depend
+    on the memory factor c, so no memory state is carried."""
+    f = 1.0 - alpha
+    for j in range(len(offsets) - 1):
+        s, e = offsets[j], offsets[j + 1]
+        if s == e:
+            continue
+        K = len(alpha)
+        mean = np.full(K, drift[s]); cov = np.zeros(K); old_wt = np.ones(K)
+        sum_wt = np.ones(K); sum_wt2 = np.ones(K)
+        for i in range(s, e):
+            d = drift[i]
+            if i == s:
+                th = mean.copy()
+            else:
+                sum_wt = sum_wt * f; sum_wt2 = sum_wt2 * (f * f); old_wt = old_wt * f
+                old_mean = mean
+                mean = np.where(mean != d, (old_wt * old_mean + d) / (old_wt + 1.0), mean)
+                cov = (old_wt * (cov + (old_mean - mean) * (old_mean - mean)) + (d - mean) * (d - mean)) / (old_wt + 1.0)
+                sum_wt = sum_wt + 1.0; sum_wt2 = sum_wt2 + 1.0; old_wt = old_wt + 1.0
+                num = sum_wt * sum_wt
+                den = num - sum_wt2
+                pos = den > 0
+                var = np.where(pos, (num / np.where(pos, den, 1.0)) * cov, 0.0)
+                th = mean + k * np.sqrt(var)
+            hit = d > th
+            out[:, 0] += np.where(hit, d * cost[i], 0.0)
+            out[:, 1] += np.where(hit, 1.0, 0.0)
+            out[:, 2] += d - th
+
+
+def _sweep_native_loops(
+    drift: np.ndarray, cost: np.ndarray, z: np.ndarray, offsets: np.ndarray,
+    base: np.ndarray, a: np.ndarray, c: np.ndarray, sigma: np.ndarray, out: np.ndarray,
+) -> None:
+    noisy = len(z) > 0
+    K = len(base)
+    mem = np.zeros(K)
+    for j in range(len(offsets) - 1):
+        mem[:] = 0.0
+        for i in range(offsets[j], offsets[j + 1]):
+            d = drift[i]
+            for q in range(K):
+                if noisy:
+                    th = max(0.0, base[q] + a[q] * mem[q] + sigma[q] * z[i])
+                else:
+                    th = max(0.0, base[q] + a[q] * mem[q])
+                if d > th:
+                    out[q, 0] += d * cost[i]; out[q, 1] += 1.0; mem[q] = 0.0
+                else:
+                    mem[q] = mem[q] + c[q] * d
+                out[q, 2] += d - th
+
+def _sweep_ewma_loops(
+    drift: np.ndarray, cost: np.ndarray, offsets: np.ndarray,
+    alpha: np.ndarray, k: np.ndarray, out: np.ndarray,
+) -> None:
+    K = len(alpha)
+    for q in range(K):
+        f = 1.0 - alpha[q]
+        for j in range(len(offsets) - 1):
+            s, e = offsets[j], offsets[j + 1]
+            if s == e:
+                continue
+            mean = drift[s]; cov = 0.0; old_wt = 1.0; sum_wt = 1.0; sum_wt2 = 1.0
+            for i in range(s, e):
+                d = drift[i]
+                if i == s:
+                    th = mean
+                else:
+                    sum_wt *= f; sum_wt2 *= f * f; old_wt *= f
+                    old_mean = mean
+                    if mean != d:
+                        mean = (old_wt * old_mean + d) / (old_wt + 1.0)
+                    cov = (old_wt * (cov + (old_mean - mean) * (old_mean - mean)) + (d - mean) * (d - mean)) / (old_wt + 1.0)
+                    sum_wt += 1.0; sum_wt2 += 1.0; old_wt += 1.0
+                    num = sum_wt * sum_wt
+                    den = num - sum_wt2
+                    var = (num / den) * cov if den > 0 else 0.0
+                    th = mean + k[q] * math.sqrt(var)
+                if d > th:
+                    out[q, 0] += d * cost[i]; out[q, 1] += 1.0
+                out[q, 2] += d - th
+
+
+# ====================================================
+#        Monte Carlo ensemble (noise-path axis)
+# ====================================================
+# One block of consecutive rows of a single segment, advanced for all N noise paths at once.
+# ``z`` is (rows, N) noise already scaled by sigma and ``mem`` the per-path memory carried across
+# blocks (zeros at a segment start). Θ and E of every path are written to (rows, N) outputs, ``hits``
+# counts ruptures per row and ``acc`` accumulates [loss, ruptures] per path. Path k follows
+# scan_native exactly for its own noise column.
+ENSEMBLE_ACC_WIDTH = 2
+
+def ensemble_native(
+    drift: np.ndarray, cost: np.ndarray, z: np.ndarray, base: float, a: float, c: float,
+    mem: np.ndarray, Theta: np.ndarray, E: np.ndarray, hits: np.ndarray, acc: np.ndarray,
+) -> None:
+    for i in range(len(drift)):
+        d = drift[i]
+        th = np.maximum(0.0, base + a * mem + z[i])
+        hit = d > th
+        Theta[i] = th
+        mem[:] = np.where(hit, 0.0, mem + c * d)
+        E[i] = mem
+        hits[i] = np.count_nonzero(hit)
+        acc[:, 0] += np.where(hit, d * cost[i], 0.0)
+        acc[:, 1] += hit
+
+def _ensemble_native_loops(
+    drift: np.ndarray, cost: np.ndarray, z: np.ndarray, base: float, a: float, c: float,
+    mem: np.ndarray, Theta: np.ndarray, E: np.ndarray, hits: np.ndarray, acc: np.ndarray,
+) -> None:
+    N = len(mem)
+    for i in range(len(drift)):
+        d = drift[i]
+        cnt = 0
+        for k in range(N):
+            th = max(0.0, base + a * mem[k] + z[i, k])
+            Theta[i, k] = th
+            if d > th:
+                cnt += 1; acc[k, 0] += d * cost[i]; acc[k, 1] += 1.0; mem[k] = 0.0
+            else:
+                mem[k] = mem[k] + c * d
+            E[i, k] = mem[k]
+        hits[i] = cnt
+
+
+# ====================================================
+#          Sliding-window features (per segment)
+# ====================================================
+# Trailing fixed-size windows that never cross a segment boundary (offsets as above); NaNs occupy a
+# slot but are not counted, and rows with fewer than ``min_periods`` valid values get NaN.
+#
+# Moments: the compiled kernel uses Welford add/remove updates, so a stream applying the same per-row
+# updates from the segment start (qsi_window.RollingMoments) reproduces them bit for bit. Interpreted,
+# that per-row loop is slow, so the numpy twin takes window sums from prefix sums of the values and
+# their squares (centred on each segment's mean to keep the sums small); equal up to rounding.
+def rolling_moments(
+    x: np.ndarray, offsets: np.ndarray, window: int, min_periods: int, ddof: int, out: np.ndarray,
+) -> None:
+    """out[i, 0] = window mean, out[i, 1] = window variance (``ddof``; NaN when count <= ddof)."""
+    n = len(x)
+    if n == 0:
+        return
+    n_seg = len(offsets) - 1
+    seg = np.repeat(np.arange(n_seg), np.diff(offsets))
+    valid = ~np.isnan(x)
+    vx = np.where(valid, x, 0.0)
+    cnt = np.bincount(seg, weights=valid, minlength=n_seg)
+    shift = (np.bincount(seg, weights=vx, minlength=n_seg) / np.maximum(cnt, 1.0))[seg]
+    v = np.where(valid, vx - shift, 0.0)
+    c0 = np.concatenate(([0], np.cumsum(valid)))
+    c1 = np.concatenate(([0.0], np.cumsum(v)))
+    c2 = np.concatenate(([0.0], np.cumsum(v * v)))
+    hi = np.arange(1, n + 1)
+    lo = np.maximum(offsets[:-1][seg], hi - window)
+    nobs = c0[hi] - c0[lo]
+    s1 = c1[hi] - c1[lo]
+    s2 = c2[hi] - c2[lo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s1 / nobs
+        m2 = np.maximum(s2 - s1 * mean, 0.0)
+        var = np.where(nobs <= ddof, np.nan, np.where(nobs == 1, 0.0, m2 / (nobs - ddof)))
+    ok = (nobs > 0) & (nobs >= min_periods)
+    out[:, 0] = np.where(ok, mean + shift, np.nan)
+    out[:, 1] = np.where(ok, var, np.nan)
+
+def _rolling_moments_loops(
+    x: np.ndarray, offsets: np.ndarray, window: int, min_periods: int, ddof: int, out: np.ndarray,
+) -> None:
+    for j in range(len(offsets) - 1):
+        s, e = offsets[j], offsets[j + 1]
+        nobs = 0
+        mean = 0.0
+        m2 = 0.0
+        for i in range(s, e):
+            v = x[i]
+            if not np.isnan(v):
+                nobs += 1
+                d = v - mean
+                mean += d / nobs
+                m2 += d * (v - mean)
+            if i - window >= s:
+                u = x[i - window]
+                if not np.isnan(u):
+                    nobs -= 1
+                    if nobs == 0:
+                        mean = 0.0
+                        m2 = 0.0
+                    else:
+                        d = u - mean
+                        mean -= d / nobs
+                        m2 -= d * (u - mean)
+            if nobs == 0 or nobs < min_periods:
+                out[i, 0] = np.nan
+                out[i, 1] = np.nan
+            else:
+                out[i, 0] = mean
+                if nobs <= ddof:
+                    out[i, 1] = np.nan
+                elif nobs == 1:
+                    out[i, 1] = 0.0
+                else:
+                    out[i, 1] = max(m2, 0.0) / (nobs - ddof)
+
+# Quantiles follow pandas ``rolling(window, min_periods).quantile(q, interpolation="linear")`` bit for
+# bit. The compiled kernel processes rows in blocks; each block ranks only its own values plus the
+# trailing window feeding it and keeps the window as a Fenwick tree of rank counts, so insert / evict /
+# k-th smallest are O(log w) on a cache-sized tree and the whole pass is O(n log w), every quantile in
+# ``qs`` read from the same window state. Interpreted, that loop is far slower than pandas' own
+# skiplist, so the numpy set hands the batch to pandas (one grouped call per quantile).
+QUANTILE_BLOCK = 1024
+
+def _segment_rolling(x: np.ndarray, offsets: np.ndarray, window: int, min_periods: int) -> Any:
+    """pandas trailing-window object over ``x`` whose windows stay inside each segment."""
+    s = pd.Series(x)
+    if len(offsets) <= 2:
+        return s.rolling(window, min_periods=min_periods)
+    seg = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    return s.groupby(seg, sort=False).rolling(window, min_periods=min_periods)
+
+def rolling_quantiles(
+    x: np.ndarray, offsets: np.ndarray, window: int, min_periods: int, qs: np.ndarray, out: np.ndarray,
+) -> None:
+    """out[i, j] = linear-interpolated qs[j] quantile of the valid values in the trailing window."""
+    if min_periods > window:                 # pandas rejects it; no window ever has enough values
+        out[:] = np.nan
+        return
+    r = _segment_rolling(x, offsets, window, min_periods)
+    for j in range(len(qs)):
+        out[:, j] = r.quantile(float(qs[j])).to_numpy()
+
+def _rolling_quantiles_loops(
+    x: np.ndarray, offsets: np.ndarray, window: int, min_periods: int, qs: np.ndarray, out: np.ndarray,
+) -> None:
+    block = max(window, QUANTILE_BLOCK)
+    for g in range(len(offsets) - 1):
+        s, e = offsets[g], offsets[g + 1]
+        for b0 in range(s, e, block):
+            b1 = min(e, b0 + block)
+            a0 = max(s, b0 - window + 1)         # first row any window in this block can see
+            vals = x[a0:b1]
+            m = len(vals)
+            order = np.argsort(vals, kind="mergesort")
+            rank = np.empty(m, dtype=np.int64)
+            for r in range(m):
+                rank[order[r]] = r
+            tree = np.zeros(m + 1, dtype=np.int64)   # Fenwick tree of rank counts in the window
+            top = 1
+            while top * 2 <= m:
+                top *= 2
+            nobs = 0
+            for i in range(a0, b1):
+                # x[i] enters the window
+                if not np.isnan(x[i]):
+                    p = rank[i - a0] + 1
+                    while p <= m:
+                        tree[p] += 1
+                        p += p & (-p)
+                    nobs += 1
+                # x[i - window] leaves it
+                if i - window >= a0 and not np.isnan(x[i - window]):
+                    p = rank[i - window - a0] + 1
+                    while p <= m:
+                        tree[p] -= 1
+                        p += p & (-p)
+                    nobs -= 1
+                if i < b0:
+                    continue                     # still filling the trailing window
+                for j in range(len(qs)):
+                    if nobs == 0 or nobs < min_periods:
+                        out[i, j] = np.nan
+                        continue
+                    f = qs[j] * (nobs - 1)
+                    idx = int(f)
+                    need = 1 if idx == f else 2
+                    lo = 0.0
+                    hi = 0.0
+                    for t in range(need):
+                        # (idx + t)-th smallest present value: descend the tree by prefix counts
+                        pos = 0
+                        rem = idx + t + 1
+                        step = top
+                        while step > 0:
+                            nxt = pos + step
+                            if nxt <= m and tree[nxt] < rem:
+                                pos = nxt
+                                rem -= tree[nxt]
+                            step >>= 1
+                        if t == 0:
+                            lo = vals[order[pos]]
+                        else:
+                            hi = vals[order[pos]]
+                    out[i, j] = lo if need == 1 else lo + (hi - lo) * (f - idx)
+
+
+# ---------------- Kernel selection ----------------
+_NUMPY_KERNELS = SimpleNamespace(
+    name="numpy", scan_memory=scan_memory, scan_native=scan_native, ewma_theta=ewma_theta,
+    ewma_theta_batch=ewma_theta_batch,
+    sweep_native=sweep_native, sweep_ewma=sweep_ewma, ensemble_native=ensemble_native,
+    rolling_moments=rolling_moments, rolling_quantiles=rolling_quantiles,
+)
+_NUMBA_KERNELS = None
+
+def _numba_kernels() -> SimpleNamespace:
+    # compiled lazily on first use; fastmath stays off so results match the interpreted kernels bit for bit
+    global _NUMBA_KERNELS
+    if _NUMBA_KERNELS is None:
+        ewma = njit(nogil=True)(ewma_theta)
+
+        def ewma_batch(drift, offsets, alpha, k):
+            return ewma(drift, offsets, alpha, k, np.zeros((len(offsets) - 1, EWMA_STATE_WIDTH)))
+
+        _NUMBA_KERNELS = SimpleNamespace(
+            name="numba",
+            scan_memory=njit(nogil=True)(scan_memory),
+            scan_native=njit(nogil=True)(scan_native),
+            ewma_theta=ewma, ewma_theta_batch=ewma_batch,
+            sweep_native=njit(nogil=True)(_sweep_native_loops),
+            sweep_ewma=njit(nogil=True)(_sweep_ewma_loops),
+            ensemble_native=njit(nogil=True)(_ensemble_native_loops),
+            rolling_moments=njit(nogil=True)(_rolling_moments_loops),
+            rolling_quantiles=njit(nogil=True)(_rolling_quantiles_loops),
+        )
+    return _NUMBA_KERNELS
+
+def get_kernels(prefer: str = "auto") -> SimpleNamespace:
+    """Resolve a kernel set: "auto" (numba if installed), "numba" or "numpy"."""
+    prefer = str(prefer or "auto").lower()
+    if prefer not in ("auto", "numba", "numpy"):
+        raise ValueError(f"Unknown kernel '{prefer}'. Use 'auto', 'numba' or 'numpy'.")
+    if prefer != "numpy" and _USE_NUMBA:
+        return _numba_kernels()
+    return _NUMPY_KERNELS
@@ -0,0 +1,474 @@
+# qsi_serve.py
+"""
+Local scoring service: an asyncio HTTP/1.1 server (TCP or Unix socket) in front of one QSIEngine.
+
+Concurrent requests are coalesced into micro-batches — up to ``max_batch`` requests, waiting at
+most ``max_wait_ms`` after the first one — and each batch is scored by one segmented
+``analyze_arrays`` call (every request is a segment), then split back per request.
+
+    python -m qsi.qsi_serve --port 8765 -c qsi.json
+
+    POST /score        {"key": "SKU-1", "dates": [...], "forecast": [...], "actual": [...],
+                        "cost": 40.0 | [...], "overrides": {"a": 0.2}}
+    POST /score/batch  {"requests": [<score request>, ...]}
+    GET  /health       service stats
+
+A request scores exactly like ``analyze_arrays`` on its own rows grouped under its ``key``
+(omit it unless cfg.seed_by_segment, where the key names the noise stream). ``LocalClient``
+exercises the same path in-process (JSON round trip, no sockets) for tests.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from .qsi_engine import QSIEngine, QSIConfig
+from .qsi_frame import QSIFrame
+from .qsi_cli import load_config, _import_all, _json_default
+
+RESULT_COLS = ("drift", "E", "Theta", "rupture", "rupture_prob", "loss")
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+_CONFIG_FIELDS = frozenset(QSIConfig.__dataclass_fields__)
+
+
+# ====================================================
+#                   Service Config
+# ====================================================
+@dataclass
+class ServiceConfig:
+    host: str = "127.0.0.1"
+    port: int = 8765                   # 0: pick a free port (see ScoringService.address)
+    unix_path: Optional[str] = None    # serve on a Unix socket instead of TCP
+
+    # Micro-batching
+    max_batch: int = 64                # requests per engine call
+    max_wait_ms: float = 5.0           # how long the first request of a batch waits for company
+    max_batch_rows: int = 1_000_000    # rows per engine call (a single larger request runs alone)
+
+    def validate(self) -> "ServiceConfig":
+        return replace(
+            self,
+            port=max(0, int(self.port)),
+            max_batch=max(1, int(self.max_batch)),
+            max_wait_ms=max(0.0, float(self.max_wait_ms)),
+            max_batch_rows=max(1, int(self.max_batch_rows)),
+        )
+
+
+@dataclass
+class _Pending:
+    key: Optional[str]
+    dates: np.ndarray
+    forecast: np.ndarray
+    actual: np.ndarray
+    cost: np.ndarray
+    overrides: str                     # canonical JSON; requests only share a call with equal overrides
+    future: asyncio.Future
+
+
+# ====================================================
+#                   Scoring service
+# ====================================================
+class ScoringService:
+    """
+    Micro-batching front end for QSIEngine.
+
+        svc = ScoringService(QSIConfig(use_cognize=False), ServiceConfig(port=0))
+        await svc.start()                 # serve HTTP (svc.address) and the batcher
+        res = await svc.score(request)    # or in-process, without the server
+        await svc.stop()
+
+    One batcher task scores one batch at a time in a worker thread, so the event loop keeps
+    accepting (and queueing) requests while a batch runs.
+    """
+
+    def __init__(self, config: Optional[QSIConfig] = None, service: Optional[ServiceConfig] = None):
+        self.cfg = (config or QSIConfig()).validate()
+        self.svc = (service or ServiceConfig()).validate()
+        self.engine = QSIEngine(self.cfg)
+        self.stats: Dict[str, Any] = {"requests": 0, "rows": 0, "batches": 0, "engine_calls": 0,
+                                      "max_batch_seen": 0, "errors": 0, "busy_seconds": 0.0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.address: Any = None
+
+    # ----------------- Lifecycle -----------------
+    async def start(self, serve: bool = True) -> "ScoringService":
+        """Start the batcher and (with ``serve``) the HTTP listener."""
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qsi-serve")
+        self._batcher = asyncio.create_task(self._run_batches())
+        if serve:
+            if self.svc.unix_path:
+                self._server = await asyncio.start_unix_server(self._handle, path=self.svc.unix_path)
+                self.address = self.svc.unix_path
+            else:
+                self._server = await asyncio.start_server(self._handle, self.svc.host, self.svc.port)
+                self.address = self._server.sockets[0].getsockname()[:2]
+        return self
+
+    async def stop(self) -> None:
+        """Stop listening, score what is already queued, then shut the batcher down."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        q, self._queue = self._queue, None          # score() refuses new requests from here on
+        if self._batcher is not None:
+            await q.put(None)
+            await self._batcher
+            self._batcher = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __aenter__(self) -> "ScoringService":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    # ----------------- Scoring -----------------
+    async def score(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue one request and wait for its slice of the micro-batch result.
+        Malformed requests raise ValueError here, before they can join a batch."""
+        if self._queue is None:
+            raise RuntimeError("ScoringService is not running (start() not awaited, or stopped).")
+        item = self._parse(request)
+        await self._queue.put(item)
+        return await item.future
+
+    def _parse(self, request: Dict[str, Any]) -> _Pending:
+        if not isinstance(request, dict):
+            raise ValueError("A score request must be a JSON object.")
+        miss = [k for k in ("dates", "forecast", "actual") if k not in request]
+        if miss:
+            raise ValueError(f"Missing fields: {miss}. Required: ['dates', 'forecast', 'actual'] (+ 'cost').")
+        try:
+            fc = np.asarray(request["forecast"], dtype=np.float64)
+            ac = np.asarray(request["actual"], dtype=np.float64)
+            cost = np.broadcast_to(np.asarray(request.get("cost", 0.0), dtype=np.float64), fc.shape)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"forecast / actual / cost must be numbers: {exc}") from None
+        raw_dates = request["dates"]
+        if not (fc.ndim == 1 and len(fc) and np.ndim(raw_dates) == 1 and len(fc) == len(ac) == len(raw_dates)):
+            raise ValueError("dates / forecast / actual / cost must be non-empty and of equal length.")
+        if not (np.isfinite(fc).all() and np.isfinite(ac).all() and np.isfinite(cost).all()):
+            raise ValueError("forecast / actual / cost must be finite (no NaN or inf).")
+        try:    # the engine's own checks (dates parse, cost >= 0), per request
+            frame = QSIFrame.from_arrays(raw_dates, fc, ac, cost, sort=False)
+        except (TypeError, ValueError, OverflowError) as exc:
+            raise ValueError(str(exc)) from None
+        dates = frame.date.view("datetime64[ns]")
+        overrides = request.get("overrides") or {}
+        if not isinstance(overrides, dict):
+            raise ValueError("overrides must be an object.")
+        bad = sorted(set(overrides) - _CONFIG_FIELDS)
+        if bad:
+            raise ValueError(f"Unknown overrides {bad}.")
+        key = request.get("key")
+        return _Pending(
+            key=None if key is None else str(key), dates=dates, forecast=fc, actual=ac, cost=cost,
+            overrides=json.dumps(overrides, sort_keys=True, default=repr),
+            future=asyncio.get_running_loop().create_future(),
+        )
+
+    async def _run_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        q, carry, stopping = self._queue, None, False
+        while not stopping or carry is not None:
+            first = carry if carry is not None else await q.get()
+            carry = None
+            if first is None:
+                break
+            batch, rows = [first], len(first.forecast)
+            deadline = loop.time() + self.svc.max_wait_ms / 1000.0
+            while len(batch) < self.svc.max_batch:
+                try:
+                    remaining = deadline - loop.time()
+                    item = q.get_nowait() if remaining <= 0 else await asyncio.wait_for(q.get(), remaining)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                if rows + len(item.forecast) > self.svc.max_batch_rows:
+                    carry = item
+                    break
+                batch.append(item)
+                rows += len(item.forecast)
+            batch = [b for b in batch if not b.future.cancelled()]
+            if not batch:
+                continue
+            t0 = time.perf_counter()
+            try:
+                results, calls = await loop.run_in_executor(self._executor, self._score_batch, batch)
+            except Exception as exc:                   # engine failure: fail this batch, keep serving
+                results, calls = [exc] * len(batch), 0
+            self._record(batch, rows, calls, time.perf_counter() - t0)
+            for b, res in zip(batch, results):
+                if b.future.done():
+                    continue
+                if isinstance(res, Exception):
+                    b.future.set_exception(res)
+                else:
+                    b.future.set_result(res)
+
+    def _record(self, batch: List[_Pending], rows: int, calls: int, seconds: float) -> None:
+        """Update stats (on the event loop only; the worker thread never touches them)."""
+        s = self.stats
+        s["requests"] += len(batch)
+        s["rows"] += rows
+        s["batches"] += 1
+        s["engine_calls"] += calls
+        s["max_batch_seen"] = max(s["max_batch_seen"], len(batch))
+        s["busy_seconds"] += seconds
+
+    # ----------------- Batch → engine calls -----------------
+    def _score_batch(self, batch: List[_Pending]) -> Tuple[List[Any], int]:
+        """One segmented engine call per (overrides, wave); a wave never holds a key twice. If a
+        wave's call fails its requests are retried one by one, so only the failing one errors.
+        Returns (result or exception per request, engine calls made)."""
+        results: List[Any] = [None] * len(batch)
+        calls = 0
+        groups: Dict[str, List[int]] = {}
+        for i, b in enumerate(batch):
+            groups.setdefault(b.overrides, []).append(i)
+        for ov, idx in groups.items():
+            overrides = json.loads(ov)
+            waves: List[List[int]] = []
+            for i in idx:
+                key = batch[i].key
+                wave = next((w for w in waves if key is None or all(batch[j].key != key for j in w)), None)
+                if wave is None:
+                    waves.append([i])
+                else:
+                    wave.append(i)
+            for wave in waves:
+                try:
+                    calls += 1
+                    for i, res in zip(wave, self._score_wave([batch[i] for i in wave], overrides)):
+                        results[i] = res
+                except Exception as exc:
+                    if len(wave) == 1:
+                        results[wave[0]] = exc
+                        continue
+                    for i in wave:          # isolate the failing request: score members one by one
+                        try:
+                            calls += 1
+                            results[i] = self._score_wave([batch[i]], overrides)[0]
+                        except Exception as one:
+                            results[i] = one
+        return results, calls
+
+    def _score_wave(self, items: List[_Pending], overrides: Dict[str, Any]) -> List[Dict[str, Any]]:
+        labels = [b.key if b.key is not None else f"\x00{i}" for i, b in enumerate(items)]
+        lens = np.array([len(b.forecast) for b in items])
+        segs = np.repeat(np.array(labels, dtype=object), lens)
+        out, rep = self.engine.analyze_arrays(
+            np.concatenate([b.dates for b in items]), np.concatenate([b.forecast for b in items]),
+            np.concatenate([b.actual for b in items]), np.concatenate([b.cost for b in items]),
+            segments=segs, overrides=overrides,
+        )
+        by_seg = rep.get("by_segment") or {}
+        if out is None:                                  # output="summary_only"
+            return [{"key": b.key, **by_seg.get(lbl, {})} for b, lbl in zip(items, labels)]
+
+        c = self.engine._for_call(overrides).cfg
+        seg_col = c.col_segment or "segment"
+        codes, uniq = pd.factorize(np.asarray(out[seg_col], dtype=object))
+        order = np.argsort(codes, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(uniq)))))
+        where = {u: j for j, u in enumerate(uniq)}
+        cols = {k: np.asarray(out[k]) for k in RESULT_COLS}
+        dates = np.asarray(out[c.col_date], dtype="datetime64[ns]")
+
+        res = []
+        for b, lbl in zip(items, labels):
+            j = where[lbl]
+            rows = order[starts[j]:starts[j + 1]]
+            vals = {k: v[rows] for k, v in cols.items()}
+            rupt = vals["rupture"].astype(bool)
+            res.append({
+                "key": b.key,
+                "n": int(len(rows)),
+                "ruptures": int(rupt.sum()),
+                "total_loss": float(vals["loss"].sum()),
+                "engine": rep["summary"].get("engine"),
+                "results": {
+                    "dates": pd.DatetimeIndex(dates[rows]).astype(str).tolist(),
+                    **{k: (rupt.tolist() if k == "rupture" else v.tolist()) for k, v in vals.items()},
+                },
+                "batch": {"requests": len(items)},
+            })
+        return res
+
+    # ----------------- HTTP -----------------
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+        if path == "/health":
+            return 200, {"status": "ok", "stats": self.stats, "service": asdict(self.svc)}
+        if path not in ("/score", "/score/batch"):
+            return 404, {"error": f"no route {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            payload = json.loads(body.decode("utf-8") or "null")
+            if path == "/score":
+                return 200, await self.score(payload)
+            reqs = payload.get("requests") if isinstance(payload, dict) else None
+            if not isinstance(reqs, list):
+                raise ValueError("/score/batch expects {\"requests\": [...]}")
+            done = await asyncio.gather(*(self.score(r) for r in reqs), return_exceptions=True)
+            return 200, {"results": [{"error": f"{type(r).__name__}: {r}"} if isinstance(r, Exception) else r
+                                     for r in done]}
+        except ValueError as exc:
+            self.stats["errors"] += 1
+            return 400, {"error": str(exc)}
+        except Exception as exc:
+            self.stats["errors"] += 1
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Minimal HTTP/1.1 with keep-alive: request line, headers, Content-Length body."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, target = line.decode("latin-1").split()[:2]
+                headers: Dict[str, str] = {}
+                while True:
+                    h = await reader.readline()
+                    if not h.strip():
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                status, payload = await self._route(method.upper(), target, body)
+                data = json.dumps(payload, default=_json_default).encode("utf-8")
+                keep = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep else 'close'}\r\n\r\n"
+                    .encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+# ====================================================
+#                       Clients
+# ====================================================
+class LocalClient:
+    """In-process stand-in for ``ServiceClient``: same JSON payloads and errors, no sockets."""
+
+    def __init__(self, service: ScoringService):
+        self.service = service
+
+    async def score(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        req = json.loads(json.dumps(request, default=_json_default))
+        return json.loads(json.dumps(await self.service.score(req), default=_json_default))
+
+    async def health(self) -> Dict[str, Any]:
+        return json.loads(json.dumps((await self.service._route("GET", "/health", b""))[1]))
+
+
+class ServiceClient:
+    """Async HTTP client for a running service (one connection per call, so calls may overlap)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None):
+        self.host, self.port, self.unix_path = host, int(port), unix_path
+
+    async def score(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._call("POST", "/score", request)
+
+    async def score_many(self, requests: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return (await self._call("POST", "/score/batch", {"requests": list(requests)}))["results"]
+
+    async def health(self) -> Dict[str, Any]:
+        return await self._call("GET", "/health", None)
+
+    async def _call(self, method: str, path: str, payload: Any) -> Any:
+        if self.unix_path:
+            reader, writer = await asyncio.open_unix_connection(self.unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            body = b"" if payload is None else json.dumps(payload, default=_json_default).encode("utf-8")
+            writer.write(
+                f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                h = await reader.readline()
+                if not h.strip():
+                    break
+                k, _, v = h.decode("latin-1").partition(":")
+                if k.strip().lower() == "content-length":
+                    length = int(v)
+            data = json.loads(await reader.readexactly(length))
+        finally:
+            writer.close()
+        if status != 200:
+            raise (ValueError if status == 400 else RuntimeError)(data.get("error", f"HTTP {status}"))
+        return data
+
+
+# ====================================================
+#                      Entry point
+# ====================================================
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m qsi.qsi_serve", description="Local QSI scoring service.")
+    p.add_argument("-c", "--config", help="JSON/TOML config file (engine section, imports)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--unix", dest="unix_path", help="serve on this Unix socket path instead of TCP")
+    p.add_argument("--max-batch", type=int, default=64)
+    p.add_argument("--max-wait-ms", type=float, default=5.0)
+    p.add_argument("--max-batch-rows", type=int, default=1_000_000)
+    args = p.parse_args(argv)
+    try:
+        cfg = load_config(args.config)
+        _import_all(cfg.get("imports") or [])
+        engine = QSIConfig(**(cfg.get("engine") or {}))
+    except Exception as exc:
+        print(f"qsi: config error: {exc}", file=sys.stderr)
+        return 2
+    svc = ScoringService(engine, ServiceConfig(
+        host=args.host, port=args.port, unix_path=args.unix_path, max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms, max_batch_rows=args.max_batch_rows,
+    ))
+    try:
+        asyncio.run(svc.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,426 @@
+# qsi_stream.py
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, Optional, List, Union
+import json
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+from .qsi_engine import QSIEngine, QSIConfig, list_custom_models
+from .qsi_kernels import get_kernels, EWMA_STATE_WIDTH
+
+RowLike = Union[pd.DataFrame, pd.Series, Dict[str, Any]]
+RESULT_COLS = ["drift", "E", "Theta", "rupture", "rupture_prob", "loss"]
+CHECKPOINT_VERSION = 1
+
+
+# ====================================================
+#                 Per-segment live state
+# ====================================================
+@dataclass
+class _SegmentState:
+    mem: float = 0.0                                   # memory accumulator E
+    ewma: np.ndarray = field(default_factory=lambda: np.zeros(EWMA_STATE_WIDTH))
+    rng: Optional[np.random.Generator] = None          # native Θ noise stream
+    window: Optional[deque] = None                     # trailing drift buffer for custom θ
+    cols_window: Optional[deque] = None                # trailing declared-column rows (array models)
+    rows_window: Optional[deque] = None                # trailing input rows (Series models read df)
+    stepper: Any = None                                # incremental custom-θ evaluator
+    warm: bool = False                                 # custom θ defined at least once
+    pending: List[Dict[str, Any]] = field(default_factory=list)   # rows held until a backfilled θ is known
+    cognize: Any = None                                # Cognize EpistemicState
+    last_ts: Optional[pd.Timestamp] = None
+    n: int = 0
+
+
+# ====================================================
+#            Running report (bounded memory)
+# ====================================================
+class _RunningReport:
+    """Accumulates report totals chunk by chunk without keeping scored rows."""
+
+    def __init__(self, cfg: QSIConfig, groupby: Optional[str] = None):
+        self.cfg, self.groupby = cfg, groupby
+        self.n = 0
+        self.ruptures = 0
+        self.total_loss = 0.0
+        self.drift_sum = 0.0
+        self.drift_max = -np.inf
+        self.by_segment: Dict[Any, Dict[str, Any]] = {}   # original key -> totals (str key in the report)
+        self.events: List[pd.DataFrame] = []
+
+    def add(self, out: pd.DataFrame) -> None:
+        if out is None or out.empty:
+            return
+        rupt = out["rupture"].to_numpy(bool)
+        self.n += int(len(out))
+        self.ruptures += int(rupt.sum())
+        self.total_loss += float(out["loss"].sum())
+        self.drift_sum += float(out["drift"].sum())
+        self.drift_max = max(self.drift_max, float(out["drift"].max()))
+        if self.groupby:
+            agg = out.groupby(self.groupby, sort=False).agg(
+                n=("rupture", "size"), ruptures=("rupture", "sum"), loss=("loss", "sum"))
+            for seg, r in agg.iterrows():
+                cur = self.by_segment.setdefault(seg, {"n": 0, "ruptures": 0, "loss": 0.0})
+                cur["n"] += int(r["n"]); cur["ruptures"] += int(r["ruptures"]); cur["loss"] += float(r["loss"])
+        if rupt.any():
+            c = self.cfg
+            cols = [c.col_date, "drift", "Theta", "rupture_prob", "loss"]
+            if c.col_segment and c.col_segment in out.columns:
+                cols.insert(1, c.col_segment)
+            self.events.append(out.loc[rupt, cols])
+
+    def report(self, engine: str) -> Dict[str, Any]:
+        summary = {
+            "n": int(self.n),
+            "ruptures": int(self.ruptures),
+            "total_loss": float(self.total_loss),
+            "mean_drift": float(self.drift_sum / self.n) if self.n else float("nan"),
+            "median_drift": None,   # not available without holding every row
+            "max_drift": float(self.drift_max) if self.n else float("nan"),
+            "engine": engine,
+            "config": asdict(self.cfg),
+        }
+        events = (pd.concat(self.events, ignore_index=True) if self.events
+                  else pd.DataFrame(columns=[self.cfg.col_date, "drift", "Theta", "rupture_prob", "loss"]))
+        rep: Dict[str, Any] = {"summary": summary, "events": events}
+        if self.groupby:
+            try:    # batch orders segments by their original keys (2 before 10), not their str form
+                keys = sorted(self.by_segment)
+            except TypeError:
+                keys = sorted(self.by_segment, key=str)
+            rep["by_segment"] = {str(k): self.by_segment[k] for k in keys}
+        return rep
+
+
+# ====================================================
+#                      QSI Stream
+# ====================================================
+class QSIStream:
+    """
+    Streaming counterpart to QSIEngine: keeps live per-segment state and scores rows as they arrive.
+    Feeding the same rows (in date order) yields the same drift/E/Theta/rupture/rupture_prob/loss
+    as one batch ``QSIEngine.analyze`` call with the same config.
+
+    API:
+        stream = QSIStream(cfg, groupby=None or "SKU")
+        scored = stream.update(rows)     # dict / Series (one row) or DataFrame (micro-batch)
+        rest = stream.flush()            # rows still held for a backfilled θ, scored with θ=NaN
+        stream.save("state.qsi"); stream = QSIStream.load("state.qsi")   # checkpoint / resume
+
+    Custom θ models are evaluated on a trailing buffer of ``custom_params["window"]`` drifts (the
+    whole segment history when the model has no window). Rows before the model's first defined θ
+    are scored with θ=NaN as they arrive, like batch; only for models registered with
+    ``backfill=True`` are they held and released once θ is defined, matching the batch backfill.
+    """
+
+    def __init__(self, config: Optional[QSIConfig] = None, groupby: Optional[str] = None):
+        self.engine = QSIEngine(config)
+        self.cfg = self.engine.cfg
+        self.groupby = groupby
+        self._states: Dict[Any, _SegmentState] = {}
+
+        c = self.cfg
+        self.use_cognize = c.cognize_active
+        if self.use_cognize and groupby and c.use_graph:
+            raise ValueError("QSIStream does not support Cognize graph mode.")
+        self.use_custom = bool(c.custom_model) and (not self.use_cognize or c.cognize_respect_custom_theta)
+        if c.custom_model and c.custom_model not in list_custom_models():
+            raise ValueError(f"Custom model '{c.custom_model}' not found. Available: {list_custom_models()}")
+        self._spec = self.engine._custom_spec() if self.use_custom else None
+        if self._spec is not None and not self._spec.streaming:
+            raise ValueError(f"Custom model '{c.custom_model}' does not declare streaming support "
+                             "(register_array_model(..., streaming=True)).")
+        win = (c.custom_params or {}).get("window")
+        self._window_len = int(win) if win is not None else None
+        self._kern = get_kernels(c.kernel)
+
+        if self.use_cognize:
+            self.engine_label = "cognize" if not (c.custom_model and c.cognize_respect_custom_theta) else "cognize+customθ"
+        elif c.custom_model:
+            self.engine_label = "custom"
+        else:
+            self.engine_label = self.engine._engine_label()
+
+    # ----------------- Public -----------------
+    @property
+    def segments(self) -> List[Any]:
+        return list(self._states.keys())
+
+    def update(self, rows: RowLike) -> pd.DataFrame:
+        """Score one row or a micro-batch; returns the rows whose results are final."""
+        frame = self._coerce(rows)
+        if frame.empty:
+            return self._empty(frame)
+        keys = self._keys(frame)
+        if self.use_cognize or self.use_custom:
+            return self._update_rows(frame, keys)
+        return self._update_kernel(frame, keys)
+
+    def flush(self) -> pd.DataFrame:
+        """Release rows still waiting for a defined custom θ (batch equivalent: θ stays NaN)."""
+        recs: List[Dict[str, Any]] = []
+        for st in self._states.values():
+            pend, st.pending = st.pending, []
+            for rec in pend:
+                recs.append(self._score_row(st, rec, np.nan))
+        return self._records_frame(recs)
+
+    # ----------------- Checkpoint / resume -----------------
+    def save(self, path: str) -> None:
+        """Write the full per-segment detector state to a compressed ``.npz`` checkpoint.
+
+        Numeric state (memory, EWMA moments, counts, last timestamps, custom-θ windows) is stored
+        as arrays and the config, segment keys and RNG states as JSON. Cognize states, incremental
+        custom-θ steppers, rows held in custom-θ warm-up and the trailing input rows of Series custom
+        models are pickled, so only load checkpoints you wrote yourself.
+        """
+        keys = list(self._states.keys())
+        sts = [self._states[k] for k in keys]
+        meta = {
+            "version": CHECKPOINT_VERSION,
+            "config": asdict(self.cfg),
+            "groupby": self.groupby,
+            "keys": [k.item() if isinstance(k, np.generic) else k for k in keys],
+            "rng": [st.rng.bit_generator.state if st.rng is not None else None for st in sts],
+            "warm": [bool(st.warm) for st in sts],
+        }
+        windows = [np.asarray(st.window if st.window is not None else (), dtype=float) for st in sts]
+        n_cols = len(self._spec.columns) if self._spec is not None else 0
+        arrays: Dict[str, np.ndarray] = {
+            "meta": np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+            "mem": np.array([st.mem for st in sts], dtype=float),
+            "ewma": np.array([st.ewma for st in sts], dtype=float).reshape(len(sts), EWMA_STATE_WIDTH),
+            "n": np.array([st.n for st in sts], dtype=np.int64),
+            "last_ts": np.array([pd.Timestamp(st.last_ts).value if st.last_ts is not None else pd.NaT.value
+                                 for st in sts], dtype=np.int64),
+            "window_len": np.array([len(w) for w in windows], dtype=np.int64),
+            "window": np.concatenate(windows) if windows else np.empty(0, dtype=float),
+        }
+        if n_cols:
+            arrays["cols_window"] = np.concatenate(
+                [np.asarray(st.cols_window, dtype=float).reshape(len(st.cols_window), n_cols) for st in sts]
+            ) if sts else np.empty((0, n_cols), dtype=float)
+        objects: Dict[str, Any] = {}
+        if self.use_cognize:
+            objects["cognize"] = [st.cognize for st in sts]
+        if any(st.pending for st in sts):
+            objects["pending"] = [st.pending for st in sts]
+        if any(st.stepper is not None for st in sts):
+            objects["steppers"] = [st.stepper for st in sts]
+        if any(st.rows_window for st in sts):
+            objects["rows"] = [list(st.rows_window or ()) for st in sts]
+        if objects:
+            arrays["objects"] = np.frombuffer(pickle.dumps(objects, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            np.savez_compressed(fh, **arrays)
+        os.replace(tmp, path)   # never leave a half-written checkpoint behind
+
+    @classmethod
+    def load(cls, path: str) -> "QSIStream":
+        """Restore a stream from a checkpoint written by ``save``; config and groupby come from the file."""
+        with np.load(path, allow_pickle=False) as z:
+            arrays = {k: z[k] for k in z.files}
+        meta = json.loads(arrays["meta"].tobytes().decode("utf-8"))
+        if int(meta.get("version", 0)) != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {meta.get('version')!r}.")
+        objects = pickle.loads(arrays["objects"].tobytes()) if "objects" in arrays else {}
+
+        stream = cls(QSIConfig(**meta["config"]), groupby=meta["groupby"])
+        win_off = np.concatenate([[0], np.cumsum(arrays["window_len"])])
+        for j, key in enumerate(meta["keys"]):
+            st = stream._state(key)
+            st.mem = float(arrays["mem"][j])
+            st.ewma = arrays["ewma"][j].copy()
+            st.n = int(arrays["n"][j])
+            ts = pd.Timestamp(int(arrays["last_ts"][j]))
+            st.last_ts = None if pd.isna(ts) else ts
+            st.warm = bool(meta["warm"][j])
+            if meta["rng"][j] is not None:
+                st.rng.bit_generator.state = meta["rng"][j]
+            if st.window is not None:
+                st.window.extend(arrays["window"][win_off[j]:win_off[j + 1]].tolist())
+            if "steppers" in objects:
+                st.stepper = objects["steppers"][j]
+            if st.cols_window is not None:
+                st.cols_window.extend(map(tuple, arrays["cols_window"][win_off[j]:win_off[j + 1]].tolist()))
+            if "cognize" in objects:
+                st.cognize = objects["cognize"][j]
+            if "pending" in objects:
+                st.pending = objects["pending"][j]
+            if st.rows_window is not None and "rows" in objects:
+                st.rows_window.extend(objects["rows"][j])
+        return stream
+
+    # ----------------- Input handling -----------------
+    def _coerce(self, rows: RowLike) -> pd.DataFrame:
+        if isinstance(rows, pd.Series):
+            rows = rows.to_frame().T.infer_objects()
+        elif isinstance(rows, dict):
+            rows = pd.DataFrame([rows])
+        frame = self.engine._prep(rows)
+        if self.groupby:
+            if self.groupby not in frame.columns:
+                raise ValueError(f"groupby '{self.groupby}' not found in DataFrame.")
+            frame = frame[frame[self.groupby].notna()].reset_index(drop=True)   # batch drops NaN keys
+        return frame
+
+    def _keys(self, frame: pd.DataFrame) -> np.ndarray:
+        c = self.cfg
+        keys = frame[self.groupby].to_numpy() if self.groupby else np.full(len(frame), None, dtype=object)
+        # per-segment arrival must be non-decreasing in time
+        first = frame.groupby(keys, sort=False)[c.col_date].min() if self.groupby else \
+            pd.Series([frame[c.col_date].iloc[0]], index=[None])
+        for k, ts in first.items():
+            st = self._states.get(k)
+            if st is not None and st.last_ts is not None and ts < st.last_ts:
+                raise ValueError(f"Out-of-order row for segment {k!r}: {ts} < last seen {st.last_ts}.")
+        return keys
+
+    def _state(self, key: Any) -> _SegmentState:
+        st = self._states.get(key)
+        if st is None:
+            st = _SegmentState()
+            seed = self.engine._segment_seed(key)   # batch replays each segment's seed from its start
+            if self.cfg.sigma > 0:
+                st.rng = np.random.default_rng(seed)
+            if self.use_custom:
+                st.window = deque(maxlen=self._window_len)
+                if self._spec.columns:
+                    st.cols_window = deque(maxlen=self._window_len)
+                if not self._spec.array:
+                    st.rows_window = deque(maxlen=self._window_len)
+                if self._spec.incremental is not None:
+                    st.stepper = self._spec.incremental(dict(self.cfg.custom_params or {}))
+            if self.use_cognize:
+                st.cognize = self.engine._cognize_state(seed)
+            self._states[key] = st
+        return st
+
+    # ----------------- Native / EWMA: vectorized through the shared kernels -----------------
+    def _update_kernel(self, frame: pd.DataFrame, keys: np.ndarray) -> pd.DataFrame:
+        c, kern = self.cfg, self._kern
+        if self.groupby:
+            codes, uniques = pd.factorize(keys)
+        else:
+            codes, uniques = np.zeros(len(keys), dtype=np.intp), [None]
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes, minlength=len(uniques))
+        offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        states = [self._state(k) for k in uniques]
+
+        fc = frame[c.col_fc].to_numpy(float)[order]
+        ac = frame[c.col_ac].to_numpy(float)[order]
+        cost = frame[c.col_cost].to_numpy(float)[order]
+        drift = np.abs(fc - ac)
+        mem = np.array([st.mem for st in states], dtype=float)
+
+        if c.use_ewma:
+            est = np.array([st.ewma for st in states], dtype=float).reshape(len(states), EWMA_STATE_WIDTH)
+            Theta = kern.ewma_theta(drift, offsets, c.ewma_alpha, c.ewma_k, est)
+            E, rupture, loss = kern.scan_memory(drift, Theta, cost, offsets, c.c, mem)
+            for st, row in zip(states, est):
+                st.ewma = row
+        else:
+            if c.sigma > 0:
+                noise = np.concatenate([st.rng.normal(0.0, c.sigma, int(n)) for st, n in zip(states, counts)])
+            else:
+                noise = np.empty(0, dtype=float)
+            E, Theta, rupture, loss = kern.scan_native(
+                drift, cost, noise, offsets, c.base_threshold, c.a, c.c, mem
+            )
+
+        dates = frame[c.col_date].to_numpy()[order]
+        for j, st in enumerate(states):
+            st.mem = float(mem[j])
+            st.n += int(counts[j])
+            st.last_ts = pd.Timestamp(dates[offsets[j + 1] - 1])
+
+        p = self.engine._sigmoid(drift - Theta)
+        out = frame.copy()
+        for name, vals in zip(RESULT_COLS, (drift, E, Theta, rupture, p, loss)):
+            col = np.empty_like(vals)
+            col[order] = vals
+            out[name] = col
+        return out
+
+    # ----------------- Custom θ / Cognize: row at a time -----------------
+    def _update_rows(self, frame: pd.DataFrame, keys: np.ndarray) -> pd.DataFrame:
+        c = self.cfg
+        drift = np.abs(frame[c.col_fc].to_numpy(float) - frame[c.col_ac].to_numpy(float))
+        cols = self.engine._model_columns(self._spec, frame) if self.use_custom and self._spec.columns else {}
+        col_rows = np.column_stack(list(cols.values())).tolist() if cols else None
+        records = frame.to_dict("records")
+        out: List[Dict[str, Any]] = []
+        for i, rec in enumerate(records):
+            st = self._state(keys[i])
+            st.last_ts = pd.Timestamp(rec[c.col_date])
+            if st.rows_window is not None:
+                st.rows_window.append(dict(rec))
+            rec["drift"] = float(drift[i])
+            th = np.nan
+            if self.use_custom:
+                st.window.append(rec["drift"])
+                if col_rows is not None:
+                    st.cols_window.append(tuple(col_rows[i]))
+                th = float(st.stepper.update(rec["drift"])) if st.stepper is not None else self._theta_last(st)
+                if np.isnan(th) and not st.warm and self._spec.backfill:
+                    st.pending.append(rec)
+                    continue
+                st.warm = True
+            pend, st.pending = st.pending, []
+            for r in pend + [rec]:
+                out.append(self._score_row(st, r, th))
+        return self._records_frame(out)
+
+    def _theta_last(self, st: _SegmentState) -> float:
+        """Custom θ of the newest row, evaluated on the segment's trailing window (Series models also
+        get that window's input rows as ``df``, like the segment frame they see in batch)."""
+        spec = self._spec
+        drift = np.fromiter(st.window, dtype=float, count=len(st.window))
+        if st.rows_window is not None:
+            return float(self.engine._theta_one(spec, drift, df=pd.DataFrame(list(st.rows_window)))[-1])
+        cols: Dict[str, np.ndarray] = {}
+        if st.cols_window is not None:
+            w = np.asarray(st.cols_window, dtype=float).reshape(len(st.cols_window), len(spec.columns))
+            cols = {col: np.ascontiguousarray(w[:, i]) for i, col in enumerate(spec.columns)}
+        return float(self.engine._theta_one(spec, drift, cols=cols)[-1])
+
+    def _score_row(self, st: _SegmentState, rec: Dict[str, Any], theta: float) -> Dict[str, Any]:
+        c = self.cfg
+        d = rec["drift"]
+        if self.use_cognize:
+            E, th, rupt, p = self.engine._cognize_step(st.cognize, d, theta if self.use_custom else None)
+        else:
+            th = theta
+            rupt = bool(d > th)
+            st.mem = 0.0 if rupt else st.mem + c.c * d
+            E = st.mem
+            p = float(self.engine._sigmoid(d - th))
+        st.n += 1
+        rec.update({
+            "E": E, "Theta": th, "rupture": rupt, "rupture_prob": p,
+            "loss": d * float(rec[c.col_cost]) if rupt else 0.0,
+        })
+        return rec
+
+    # ----------------- Output -----------------
+    def _records_frame(self, recs: List[Dict[str, Any]]) -> pd.DataFrame:
+        if not recs:
+            return pd.DataFrame(columns=RESULT_COLS)
+        out = pd.DataFrame.from_records(recs)
+        out["rupture"] = out["rupture"].astype(bool)
+        return out
+
+    def _empty(self, frame: pd.DataFrame) -> pd.DataFrame:
+        out = frame.copy()
+        for name in RESULT_COLS:
+            out[name] = pd.Series(dtype=bool if name == "rupture" else float)
+        return out
@@ -0,0 +1,232 @@
+# qsi_synth.py
+from __future__ import annotations
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from .qsi_engine import _stable_seed
+from .qsi_frame import QSIFrame
+
+# Bits of the "Scenario" column (which injected effects are active on a row)
+SCENARIO_LEVEL_SHIFT = 1
+SCENARIO_VOLATILITY = 2
+SCENARIO_COST_SPIKE = 4
+SCENARIO_WEEKEND = 8
+_TRUTH_MASK = SCENARIO_LEVEL_SHIFT | SCENARIO_VOLATILITY
+
+# Segments drawn per RNG block: output does not depend on how it is chunked
+_BLOCK_SEGMENTS = 256
+
+
+# ====================================================
+#                  Generator Config
+# ====================================================
+@dataclass
+class SynthConfig:
+    # Panel size
+    n_segments: int = 100
+    days: int = 365
+    seed: int = 42
+    end: Optional[str] = None              # last date (default: today, like generate_dummy)
+
+    # Base process per segment j (generate_dummy at level_j = forecast_mean):
+    #   Forecast ~ N(level_j, forecast_sd·s_j),  Actual = Forecast − N(0, noise_sd·s_j),  s_j = level_j / forecast_mean
+    forecast_mean: float = 1000.0
+    forecast_sd: float = 100.0
+    noise_sd: float = 150.0
+    level_sd: float = 0.0                  # log-normal dispersion of level_j across segments
+    unit_cost: float = 40.0
+    cost_sd: float = 0.0                   # log-normal dispersion of unit cost across segments
+    integer: bool = True                   # whole units, like generate_dummy
+
+    # Scenario injection: events per segment ~ Poisson(rate), onsets uniform after `warmup` days
+    warmup: int = 30                       # scenario-free lead-in (the epistemic baseline window)
+    level_shift_rate: float = 0.0
+    level_shift_size: float = 0.3          # Actual moves by ±size·level_j
+    level_shift_days: int = 0              # 0: persists to the end of the series
+    burst_rate: float = 0.0
+    burst_scale: float = 4.0               # noise sd multiplier inside a volatility burst
+    burst_days: int = 14
+    cost_spike_rate: float = 0.0
+    cost_spike_mult: float = 3.0
+    cost_spike_days: int = 7
+    weekend_effect: float = 0.0            # Actual ×(1 + effect) on weekend_days (forecast misses it)
+    weekend_days: Tuple[int, ...] = (5, 6)
+
+    def validate(self) -> "SynthConfig":
+        def pos(x): return max(0.0, float(x))
+        return replace(
+            self,
+            n_segments=max(1, int(self.n_segments)),
+            days=max(1, int(self.days)),
+            seed=int(self.seed),
+            forecast_sd=pos(self.forecast_sd),
+            noise_sd=pos(self.noise_sd),
+            level_sd=pos(self.level_sd),
+            unit_cost=pos(self.unit_cost),
+            cost_sd=pos(self.cost_sd),
+            warmup=max(0, int(self.warmup)),
+            level_shift_rate=pos(self.level_shift_rate),
+            level_shift_size=pos(self.level_shift_size),
+            level_shift_days=max(0, int(self.level_shift_days)),
+            burst_rate=pos(self.burst_rate),
+            burst_scale=pos(self.burst_scale),
+            burst_days=max(1, int(self.burst_days)),
+            cost_spike_rate=pos(self.cost_spike_rate),
+            cost_spike_mult=pos(self.cost_spike_mult),
+            cost_spike_days=max(1, int(self.cost_spike_days)),
+            weekend_effect=max(-1.0, float(self.weekend_effect)),
+            weekend_days=tuple(sorted({int(d) % 7 for d in self.weekend_days})),
+        )
+
+
+# ====================================================
+#                 Block generation
+# ====================================================
+def _segment_names(n: int) -> np.ndarray:
+    """S0..S{n-1}, zero-padded so lexical order equals numeric order."""
+    w = len(str(n - 1))
+    return np.array([f"S{j:0{w}d}" for j in range(n)], dtype=object)
+
+def _windows(rng: np.random.Generator, n_seg: int, days: int, rate: float, length: int, warmup: int
+             ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(segment, start, end) of Poisson(rate) events per segment; length 0 runs to the end."""
+    counts = rng.poisson(rate, n_seg) if rate > 0 else np.zeros(n_seg, dtype=np.int64)
+    seg = np.repeat(np.arange(n_seg), counts)
+    start = rng.integers(min(warmup, days - 1), days, len(seg))
+    end = np.full(len(seg), days) if length <= 0 else np.minimum(start + length, days)
+    return seg, start, end
+
+def _paint(n_seg: int, days: int, seg: np.ndarray, start: np.ndarray, end: np.ndarray,
+           value: Any = 1.0) -> np.ndarray:
+    """(n_seg, days) sum of ``value`` over every [start, end) window (difference array + cumsum)."""
+    acc = np.zeros((n_seg, days + 1))
+    np.add.at(acc, (seg, start), value)
+    np.add.at(acc, (seg, end), -np.asarray(value, dtype=float))
+    return np.cumsum(acc[:, :-1], axis=1)
+
+def _block(cfg: SynthConfig, b: int, weekend: np.ndarray) -> Dict[str, Any]:
+    """Segments [b·B, (b+1)·B) as (segments, days) matrices, from their own block generator."""
+    j0 = b * _BLOCK_SEGMENTS
+    k = min(_BLOCK_SEGMENTS, cfg.n_segments - j0)
+    T = cfg.days
+    rng = np.random.default_rng(_stable_seed(cfg.seed, f"synth-block:{b}"))
+
+    scale = rng.lognormal(0.0, cfg.level_sd, k) if cfg.level_sd > 0 else np.ones(k)
+    cost_j = cfg.unit_cost * (rng.lognormal(0.0, cfg.cost_sd, k) if cfg.cost_sd > 0 else np.ones(k))
+    level = cfg.forecast_mean * scale
+    fc = level[:, None] + rng.normal(0.0, cfg.forecast_sd, (k, T)) * scale[:, None]
+    noise = rng.normal(0.0, cfg.noise_sd, (k, T)) * scale[:, None]
+    if cfg.integer:
+        fc = fc.round()
+    flags = np.zeros((k, T), dtype=np.int8)
+
+    seg, s, e = _windows(rng, k, T, cfg.burst_rate, cfg.burst_days, cfg.warmup)
+    if len(seg):
+        burst = _paint(k, T, seg, s, e) > 0
+        noise = np.where(burst, noise * cfg.burst_scale, noise)
+        flags |= np.where(burst, SCENARIO_VOLATILITY, 0).astype(np.int8)
+    ac = fc - (noise.round() if cfg.integer else noise)
+
+    seg, s, e = _windows(rng, k, T, cfg.level_shift_rate, cfg.level_shift_days, cfg.warmup)
+    if len(seg):
+        size = rng.choice([-1.0, 1.0], len(seg)) * cfg.level_shift_size * level[seg]
+        ac = ac + _paint(k, T, seg, s, e, size)
+        flags |= np.where(_paint(k, T, seg, s, e) > 0, SCENARIO_LEVEL_SHIFT, 0).astype(np.int8)
+
+    if cfg.weekend_effect and weekend.any():
+        ac = np.where(weekend, ac * (1.0 + cfg.weekend_effect), ac)
+        flags |= np.where(weekend, SCENARIO_WEEKEND, 0).astype(np.int8)
+    if cfg.integer:
+        ac = ac.round()
+    ac = np.maximum(ac, 0.0)
+
+    cost = np.broadcast_to(cost_j[:, None], (k, T))
+    seg, s, e = _windows(rng, k, T, cfg.cost_spike_rate, cfg.cost_spike_days, cfg.warmup)
+    if len(seg):
+        spike = _paint(k, T, seg, s, e) > 0
+        cost = np.where(spike, cost * cfg.cost_spike_mult, cost)
+        flags |= np.where(spike, SCENARIO_COST_SPIKE, 0).astype(np.int8)
+    return {"j0": j0, "forecast": fc, "actual": ac, "cost": np.ascontiguousarray(cost), "flags": flags}
+
+def _assemble(cfg: SynthConfig, parts: List[Dict[str, Any]], dates_ns: np.ndarray, names: np.ndarray,
+              as_frame: bool, order: str) -> pd.DataFrame | QSIFrame:
+    """Rows of whole segments from block slices, segment-major or date-major."""
+    mats = {key: np.concatenate([p[key] for p in parts]) for key in ("forecast", "actual", "cost", "flags")}
+    j0 = parts[0]["j0"]
+    k, T = mats["forecast"].shape
+    if order == "date":
+        flat = {key: m.ravel(order="F") for key, m in mats.items()}
+        date, codes = np.repeat(dates_ns, k), np.tile(np.arange(k, dtype=np.int32), T)
+    else:
+        flat = {key: m.ravel() for key, m in mats.items()}
+        date, codes = np.tile(dates_ns, k), np.repeat(np.arange(k, dtype=np.int32), T)
+    cats = names[j0:j0 + k]
+    extra = {"Truth_Rupture": (flat["flags"] & _TRUTH_MASK) != 0, "Scenario": flat["flags"]}
+    if as_frame:
+        return QSIFrame(date, flat["forecast"], flat["actual"], flat["cost"], codes=codes, categories=cats,
+                        columns=extra, segment="Segment", date_sorted=(order == "date" or k == 1))
+    num = np.int64 if cfg.integer else np.float64
+    return pd.DataFrame({
+        "Date": date.view("datetime64[ns]"),
+        "Forecast": flat["forecast"].astype(num),
+        "Actual": flat["actual"].astype(num),
+        "Unit_Cost": flat["cost"],
+        "Segment": pd.Categorical.from_codes(codes, categories=cats),
+        **extra,
+    })
+
+
+# ====================================================
+#                    Public API
+# ====================================================
+def iter_synthetic(
+    cfg_in: Optional[SynthConfig] = None,
+    chunk_rows: int = 1_000_000,
+    as_frame: bool = False,
+    order: str = "segment",
+) -> Iterator[pd.DataFrame | QSIFrame]:
+    """
+    Stream a synthetic panel in chunks of whole segments (about ``chunk_rows`` rows each).
+
+    Columns: Date, Forecast, Actual, Unit_Cost, Segment (categorical "S000"...), Truth_Rupture
+    (ground truth: row inside an injected level shift or volatility burst) and Scenario (bitmask of
+    the SCENARIO_* effects active on the row). Draws come from per-block generators, so the
+    concatenated chunks are identical for every ``chunk_rows``. ``order="date"`` lays each chunk out
+    date-major (already date-sorted for the engine); ``as_frame`` yields QSIFrames.
+    """
+    cfg = (cfg_in or SynthConfig()).validate()
+    dates = pd.date_range(end=pd.Timestamp(cfg.end) if cfg.end else pd.Timestamp.today().normalize(),
+                          periods=cfg.days)
+    dates_ns = dates.values.astype("datetime64[ns]").view(np.int64)
+    weekend = np.isin(dates.weekday, cfg.weekend_days)
+    names = _segment_names(cfg.n_segments)
+    per = max(1, int(chunk_rows) // cfg.days)
+
+    pending: List[Dict[str, Any]] = []
+    have = 0
+    for b in range((cfg.n_segments + _BLOCK_SEGMENTS - 1) // _BLOCK_SEGMENTS):
+        blk = _block(cfg, b, weekend)
+        k = len(blk["forecast"])
+        pos = 0
+        while pos < k:
+            take = min(per - have, k - pos)
+            pending.append({"j0": blk["j0"] + pos,
+                            **{key: blk[key][pos:pos + take] for key in ("forecast", "actual", "cost", "flags")}})
+            have += take
+            pos += take
+            if have == per:
+                yield _assemble(cfg, pending, dates_ns, names, as_frame, order)
+                pending, have = [], 0
+    if pending:
+        yield _assemble(cfg, pending, dates_ns, names, as_frame, order)
+
+def generate_synthetic(
+    cfg_in: Optional[SynthConfig] = None,
+    as_frame: bool = False,
+    order: str = "segment",
+) -> pd.DataFrame | QSIFrame:
+    """The whole panel of ``iter_synthetic`` as one DataFrame (or QSIFrame)."""
+    cfg = (cfg_in or SynthConfig()).validate()
+    return next(iter_synthetic(cfg, chunk_rows=cfg.n_segments * cfg.days, as_frame=as_frame, order=order))
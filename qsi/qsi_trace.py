@@ -0,0 +1,89 @@
+# qsi_trace.py
+from __future__ import annotations
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+import time
+
+# tracer(event) with event = {"kind": "stage" | "segment" | "plugin", "name", "seconds", "rows"}
+Tracer = Callable[[Dict[str, Any]], None]
+
+
+# ====================================================
+#                Per-run stage timings
+# ====================================================
+class StageTimer:
+    """
+    Wall-clock per stage, segment and plug-in for one ``analyze`` / ``enrich`` call.
+
+    Repeated names accumulate (seconds, rows, calls). Every record is also passed to ``tracer``
+    as it happens. ``report()`` is what lands in ``report["timings"]``.
+    """
+
+    __slots__ = ("stages", "segments", "plugins", "tracer", "_t0")
+
+    def __init__(self, tracer: Optional[Tracer] = None):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.segments: Dict[str, Dict[str, Any]] = {}
+        self.plugins: Dict[str, Dict[str, Any]] = {}
+        self.tracer = tracer
+        self._t0 = time.perf_counter()
+
+    def add(self, name: str, seconds: float, rows: Optional[int] = None, kind: str = "stage") -> None:
+        table = self.stages if kind == "stage" else self.segments if kind == "segment" else self.plugins
+        cur = table.get(name)
+        if cur is None:
+            table[name] = cur = {"seconds": 0.0, "rows": 0, "calls": 0}
+        cur["seconds"] += seconds
+        cur["rows"] += int(rows or 0)
+        cur["calls"] += 1
+        if self.tracer is not None:
+            self.tracer({"kind": kind, "name": name, "seconds": seconds, "rows": rows})
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None, kind: str = "stage") -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0, rows, kind)
+
+    def report(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"total": time.perf_counter() - self._t0, "stages": self.stages}
+        if self.segments:
+            out["segments"] = self.segments
+        if self.plugins:
+            out["plugins"] = self.plugins
+        return out
+
+
+# ====================================================
+#          Active timer (per thread / task)
+# ====================================================
+_CURRENT: ContextVar[Optional[StageTimer]] = ContextVar("qsi_stage_timer", default=None)
+_NOOP = nullcontext()
+
+def current() -> Optional[StageTimer]:
+    """The timer of the enclosing ``timing`` block, or None when instrumentation is off."""
+    return _CURRENT.get()
+
+def stage(name: str, rows: Optional[int] = None, kind: str = "stage") -> Any:
+    """Time a block under ``name`` in the active timer; a shared no-op when none is active."""
+    timer = _CURRENT.get()
+    return _NOOP if timer is None else timer.stage(name, rows, kind)
+
+@contextmanager
+def timing(enabled: bool, tracer: Optional[Tracer] = None) -> Iterator[Optional[StageTimer]]:
+    """Activate a StageTimer for the block when ``enabled`` or a ``tracer`` is given (yields None
+    otherwise). Context-local, so concurrent calls in other threads keep their own timers; a nested
+    block (e.g. analyze_arrays falling back to analyze) records into the enclosing timer."""
+    outer = _CURRENT.get()
+    if outer is not None or (not enabled and tracer is None):
+        yield outer
+        return
+    timer = StageTimer(tracer)
+    token = _CURRENT.set(timer)
+    try:
+        yield timer
+    finally:
+        _CURRENT.reset(token)
@@ -0,0 +1,172 @@
+# qsi_tune.py
+from __future__ import annotations
+from dataclasses import dataclass, field, asdict, replace
+from typing import Dict, Any, Tuple, Optional, List
+from concurrent.futures import ProcessPoolExecutor
+import math
+import numpy as np
+import pandas as pd
+
+from .qsi_engine import QSIEngine, QSIConfig, _stable_seed
+
+# Search ranges mirror QSIConfig.validate() clamps; base_threshold/sigma are unbounded there and get
+# data-driven upper bounds per segment instead.
+_VALIDATE_RANGES: Dict[str, Tuple[float, float]] = {
+    "a": (0.0, 1.0),
+    "c": (0.0, 1.0),
+    "ewma_alpha": (0.0001, 0.9999),
+    "ewma_k": (0.0, 10.0),
+}
+_NATIVE_PARAMS = ("base_threshold", "a", "c", "sigma")
+_EWMA_PARAMS = ("ewma_alpha", "ewma_k")
+
+
+# ====================================================
+#                     Tuner Config
+# ====================================================
+@dataclass
+class TunerConfig:
+    # Search space (None: native knobs, or EWMA knobs when the engine config uses EWMA)
+    params: Optional[Tuple[str, ...]] = None
+    ranges: Dict[str, Tuple[float, float]] = field(default_factory=dict)   # per-param (lo, hi) overrides
+
+    # Successive halving
+    n_candidates: int = 81         # random candidates per segment (current config is always one of them)
+    eta: int = 3                   # keep 1/eta per rung, prefix grows ×eta
+    min_rows: int = 30             # prefix length of the first rung
+
+    # Objective: minimum loss subject to rupture_rate <= max_rupture_rate
+    max_rupture_rate: float = 0.10
+
+    # Compute budget in candidate×row evaluations per segment (None: unlimited)
+    budget_rows: Optional[int] = None
+
+    seed: int = 0
+    n_workers: int = 1
+
+    def validate(self) -> "TunerConfig":
+        rg = {}
+        for k, v in (self.ranges or {}).items():
+            lo, hi = float(v[0]), float(v[1])
+            rg[str(k)] = (min(lo, hi), max(lo, hi))
+        return replace(
+            self,
+            params=(tuple(str(p) for p in self.params) if self.params else None),
+            ranges=rg,
+            n_candidates=max(1, int(self.n_candidates)),
+            eta=max(2, int(self.eta)),
+            min_rows=max(1, int(self.min_rows)),
+            max_rupture_rate=float(min(max(self.max_rupture_rate, 0.0), 1.0)),
+            budget_rows=(None if self.budget_rows is None else max(1, int(self.budget_rows))),
+            seed=int(self.seed),
+            n_workers=max(1, int(self.n_workers)),
+        )
+
+
+# ====================================================
+#                       Tuner
+# ====================================================
+class QSITuner:
+    """
+    Budgeted per-segment search of threshold parameters with successive halving on date prefixes.
+    Every rung scores all surviving candidates in one vectorized ``QSIEngine.sweep`` call.
+
+    API:
+        best = QSITuner(qsi_cfg, TunerConfig(max_rupture_rate=0.1)).tune(df, groupby="SKU")
+        QSIEngine(qsi_cfg).analyze(df_sku, overrides=best["SKU-1"]["overrides"])
+    Ungrouped input is reported under the key "__all__".
+    """
+
+    def __init__(self, qsi_config: Optional[QSIConfig] = None, tuner_config: Optional[TunerConfig] = None):
+        self.qsi_cfg = (qsi_config or QSIConfig()).validate()
+        self.cfg = (tuner_config or TunerConfig()).validate()
+        if self.qsi_cfg.custom_model:
+            raise ValueError("Custom θ models fix the threshold; nothing to tune.")
+
+    def tune(self, df: pd.DataFrame, groupby: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        if groupby:
+            if groupby not in df.columns:
+                raise ValueError(f"groupby '{groupby}' not found in DataFrame.")
+            jobs = [(str(seg), sub) for seg, sub in df.groupby(groupby, sort=True)]
+        else:
+            jobs = [("__all__", df)]
+        keys = [k for k, _ in jobs]
+        frames = [f for _, f in jobs]
+        n = len(jobs)
+        if self.cfg.n_workers > 1 and n > 1:
+            with ProcessPoolExecutor(max_workers=min(self.cfg.n_workers, n)) as ex:
+                results = list(ex.map(_tune_segment, [self.qsi_cfg] * n, [self.cfg] * n, keys, frames,
+                                      chunksize=max(1, n // (4 * self.cfg.n_workers))))
+        else:
+            results = [_tune_segment(self.qsi_cfg, self.cfg, k, f) for k, f in jobs]
+        return dict(zip(keys, results))
+
+
+# ----------------- Per-segment search (process-pool entrypoint) -----------------
+def _search_space(qsi_cfg: QSIConfig, tcfg: TunerConfig, drift: np.ndarray) -> Dict[str, Tuple[float, float]]:
+    params = tcfg.params or (_EWMA_PARAMS if qsi_cfg.use_ewma else _NATIVE_PARAMS)
+    hi_drift = float(np.quantile(drift, 0.99)) if len(drift) else 1.0
+    space: Dict[str, Tuple[float, float]] = {}
+    for p in params:
+        if p in tcfg.ranges:
+            space[p] = tcfg.ranges[p]
+        elif p in _VALIDATE_RANGES:
+            space[p] = _VALIDATE_RANGES[p]
+        elif p == "base_threshold":
+            space[p] = (0.0, max(1.5 * hi_drift, 1.0))
+        elif p == "sigma":
+            space[p] = (0.0, max(float(np.std(drift)) * 0.5, 1e-9))
+        else:
+            raise ValueError(f"Cannot tune '{p}'. Tunable: {sorted(set(_NATIVE_PARAMS + _EWMA_PARAMS))}")
+    return space
+
+def _tune_segment(qsi_cfg: QSIConfig, tcfg: TunerConfig, key: str, df: pd.DataFrame) -> Dict[str, Any]:
+    eng = QSIEngine(qsi_cfg)
+    c = eng.cfg
+    df = eng._prep(df)
+    n = len(df)
+    if n == 0:
+        return {"overrides": {}, "rows_used": 0, "evaluations": 0, "feasible": False}
+    drift = np.abs(df[c.col_fc].to_numpy(float) - df[c.col_ac].to_numpy(float))
+    space = _search_space(c, tcfg, drift)
+
+    rng = np.random.default_rng(_stable_seed(tcfg.seed, key))
+    current = asdict(c)
+    cands: List[Dict[str, Any]] = [{p: current[p] for p in space}]
+    for _ in range(tcfg.n_candidates - 1):
+        cands.append({p: float(rng.uniform(lo, hi)) for p, (lo, hi) in space.items()})
+
+    rungs: List[int] = []
+    r = min(tcfg.min_rows, n)
+    while r < n:
+        rungs.append(r)
+        r *= tcfg.eta
+    rungs.append(n)
+
+    spent, used, best_row = 0, 0, None
+    for r in rungs:
+        cost = len(cands) * r
+        if tcfg.budget_rows is not None and spent > 0 and spent + cost > tcfg.budget_rows:
+            break   # out of budget: keep the leader of the last completed rung
+        table = eng.sweep(df.iloc[:r], cands)
+        spent += cost
+        used = r
+        rate = table["ruptures"].to_numpy(float) / r
+        feasible = rate <= tcfg.max_rupture_rate
+        # feasible first (by loss), then infeasible by how far they exceed the rupture cap
+        order = np.lexsort((table["total_loss"].to_numpy(), np.where(feasible, 0.0, rate), ~feasible))
+        keep = 1 if r == n else max(1, math.ceil(len(cands) / tcfg.eta))
+        best_row = table.iloc[order[0]]
+        cands = [{p: table.iloc[i][p] for p in space} for i in order[:keep]]
+
+    overrides = {p: float(best_row[p]) for p in space}
+    ruptures = int(best_row["ruptures"])
+    return {
+        "overrides": overrides,
+        "total_loss": float(best_row["total_loss"]),
+        "ruptures": ruptures,
+        "rupture_rate": ruptures / used,
+        "feasible": bool(ruptures / used <= tcfg.max_rupture_rate),
+        "rows_used": int(used),
+        "evaluations": int(spent),
+    }
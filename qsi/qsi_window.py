@@ -0,0 +1,323 @@
+# qsi_window.py
+from __future__ import annotations
+from bisect import bisect_left, insort
+from collections import deque
+import copy
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Union
+import math
+import numpy as np
+
+from .qsi_kernels import get_kernels
+
+Quantiles = Union[float, Sequence[float], np.ndarray]
+
+
+def _as_quantiles(q: Quantiles) -> np.ndarray:
+    qs = np.atleast_1d(np.asarray(q, dtype=np.float64))
+    if qs.ndim != 1 or not np.all((qs >= 0.0) & (qs <= 1.0)):
+        raise ValueError("quantiles must lie in [0, 1].")
+    return qs
+
+
+def _as_offsets(n: int, offsets: Optional[np.ndarray]) -> np.ndarray:
+    return np.array([0, n], dtype=np.int64) if offsets is None else np.ascontiguousarray(offsets, dtype=np.int64)
+
+
+# ====================================================
+#              Batch: one pass per window
+# ====================================================
+def rolling_quantiles(
+    x: np.ndarray, window: int, q: Quantiles, min_periods: Optional[int] = None,
+    offsets: Optional[np.ndarray] = None, kernel: str = "auto",
+) -> np.ndarray:
+    """Trailing-window quantiles of ``x`` with pandas ``rolling(window, min_periods).quantile(q)``
+    semantics (linear interpolation, NaNs skipped), bit for bit. Windows never cross a segment
+    boundary when ``offsets`` (segment j == offsets[j]:offsets[j+1]) is given.
+
+    ``q`` may be a scalar (returns shape (n,)) or a sequence (returns (n, len(q)), all quantiles
+    from the same window pass). ``kernel`` as in QSIConfig: numba runs the O(n log w)
+    order-statistics kernel, numpy hands the windows to pandas.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    offsets = _as_offsets(len(x), offsets)
+    window = max(1, int(window))
+    min_periods = window if min_periods is None else max(0, int(min_periods))
+    qs = _as_quantiles(q)
+    out = np.empty((len(x), len(qs)))
+    get_kernels(kernel).rolling_quantiles(x, offsets, window, min_periods, qs, out)
+    return out[:, 0] if np.ndim(q) == 0 else out
+
+def rolling_moments(
+    x: np.ndarray, window: int, min_periods: Optional[int] = None, ddof: int = 0,
+    offsets: Optional[np.ndarray] = None, kernel: str = "auto",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Trailing-window (mean, variance) of ``x``: one Welford add/remove pass per segment (numba) or
+    prefix-sum differences (numpy)."""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    offsets = _as_offsets(len(x), offsets)
+    window = max(1, int(window))
+    min_periods = window if min_periods is None else max(0, int(min_periods))
+    out = np.empty((len(x), 2))
+    get_kernels(kernel).rolling_moments(x, offsets, window, min_periods, int(ddof), out)
+    return out[:, 0].copy(), out[:, 1].copy()
+
+
+# ====================================================
+#         Shared feature store (one per analysis run)
+# ====================================================
+class RollingFeatures:
+    """
+    Rolling window features of one drift array, computed on first request and then shared by every
+    consumer of the run (custom θ models, param variants): moments once per
+    (window, min_periods, ddof), quantiles once per (window, min_periods, q).
+
+        feats = RollingFeatures(drift, offsets)
+        mu, var = feats.moments(14, min_periods=7)
+        p80 = feats.quantile(14, 0.8, min_periods=7)
+        seg = feats.segment(j)            # same store, sliced to segment j
+
+    Windows never cross segment boundaries, so a segment view returns exactly what a store built
+    on that segment alone would.
+    """
+
+    def __init__(self, x: np.ndarray, offsets: Optional[np.ndarray] = None, kernel: str = "auto"):
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.offsets = _as_offsets(len(self.x), offsets)
+        self.kernel = kernel
+        self._moments: Dict[Tuple[int, int, int], Tuple[np.ndarray, np.ndarray]] = {}
+        self._quantiles: Dict[Tuple[int, int], Dict[float, np.ndarray]] = {}
+        self._lo, self._hi = 0, len(self.x)
+        self._root = self
+
+    def __len__(self) -> int:
+        return self._hi - self._lo
+
+    def segment(self, j: int) -> "RollingFeatures":
+        """View of segment ``j``; feature arrays are slices of the shared ones."""
+        root = self._root
+        view = copy.copy(root)
+        view._lo, view._hi = int(root.offsets[j]), int(root.offsets[j + 1])
+        return view
+
+    def moments(self, window: int, min_periods: Optional[int] = None, ddof: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """(mean, variance) over the trailing ``window`` rows."""
+        window = max(1, int(window))
+        key = (window, window if min_periods is None else int(min_periods), int(ddof))
+        root = self._root
+        if key not in root._moments:
+            root._moments[key] = rolling_moments(root.x, window, key[1], key[2], root.offsets, root.kernel)
+        mean, var = root._moments[key]
+        return mean[self._lo:self._hi], var[self._lo:self._hi]
+
+    def mean(self, window: int, min_periods: Optional[int] = None) -> np.ndarray:
+        return self.moments(window, min_periods)[0]
+
+    def std(self, window: int, min_periods: Optional[int] = None, ddof: int = 0) -> np.ndarray:
+        return np.sqrt(self.moments(window, min_periods, ddof)[1])
+
+    def quantiles(self, window: int, qs: Quantiles, min_periods: Optional[int] = None) -> np.ndarray:
+        """(n, len(qs)) trailing-window quantiles; quantiles not cached yet share one pass."""
+        window = max(1, int(window))
+        mp = window if min_periods is None else int(min_periods)
+        qs = [float(q) for q in _as_quantiles(qs)]
+        root = self._root
+        have = root._quantiles.setdefault((window, mp), {})
+        missing = [q for q in dict.fromkeys(qs) if q not in have]
+        if missing:
+            cols = rolling_quantiles(root.x, window, missing, mp, root.offsets, root.kernel)
+            for j, q in enumerate(missing):
+                have[q] = cols[:, j].copy()
+        return np.column_stack([have[q][self._lo:self._hi] for q in qs])
+
+    def quantile(self, window: int, q: float, min_periods: Optional[int] = None) -> np.ndarray:
+        return self.quantiles(window, [q], min_periods)[:, 0]
+
+
+# ====================================================
+#              Streaming: one point at a time
+# ====================================================
+class RollingMoments:
+    """
+    Streaming twin of ``rolling_moments``: the compiled kernel's Welford add/remove updates, one
+    value at a time, so feeding a segment's values from its start reproduces its arrays bit for bit
+    (the numpy kernel's prefix sums agree up to rounding).
+    """
+
+    __slots__ = ("window", "min_periods", "ddof", "_fifo", "nobs", "mean", "m2")
+
+    def __init__(self, window: int, min_periods: Optional[int] = None, ddof: int = 0):
+        self.window = max(1, int(window))
+        self.min_periods = self.window if min_periods is None else max(0, int(min_periods))
+        self.ddof = int(ddof)
+        self._fifo: deque = deque()
+        self.nobs = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, value: float) -> Tuple[float, float]:
+        """Add ``value`` (evicting the oldest when full); returns the window (mean, variance)."""
+        v = float(value)
+        self._fifo.append(v)
+        if not math.isnan(v):
+            self.nobs += 1
+            d = v - self.mean
+            self.mean += d / self.nobs
+            self.m2 += d * (v - self.mean)
+        if len(self._fifo) > self.window:
+            u = self._fifo.popleft()
+            if not math.isnan(u):
+                self.nobs -= 1
+                if self.nobs == 0:
+                    self.mean = 0.0
+                    self.m2 = 0.0
+                else:
+                    d = u - self.mean
+                    self.mean -= d / self.nobs
+                    self.m2 -= d * (u - self.mean)
+        n = self.nobs
+        if n == 0 or n < self.min_periods:
+            return float("nan"), float("nan")
+        if n <= self.ddof:
+            return self.mean, float("nan")
+        return self.mean, (0.0 if n == 1 else max(self.m2, 0.0) / (n - self.ddof))
+
+
+class _OrderStatistics:
+    """
+    Sorted multiset with O(log n) k-th smallest, the streaming counterpart of the batch kernel's
+    Fenwick tree of rank counts: values live in sorted buckets of ~``_LOAD`` and a Fenwick tree over
+    bucket sizes locates the k-th one. Insert / remove are a bisect plus an O(_LOAD) bucket shift;
+    the tree is rebuilt only when a bucket splits or empties.
+    """
+
+    __slots__ = ("_buckets", "_maxes", "_tree", "_top", "n")
+    _LOAD = 64
+
+    def __init__(self):
+        self._buckets: list = []
+        self._maxes: list = []
+        self._tree: list = [0]
+        self._top = 0
+        self.n = 0
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _rebuild(self) -> None:
+        m = len(self._buckets)
+        tree = [0] * (m + 1)
+        for b, bucket in enumerate(self._buckets, 1):
+            tree[b] += len(bucket)
+            up = b + (b & -b)
+            if up <= m:
+                tree[up] += tree[b]
+        self._tree = tree
+        top = 1
+        while top * 2 <= m:
+            top *= 2
+        self._top = top if m else 0
+
+    def _add(self, b: int, delta: int) -> None:
+        tree, m = self._tree, len(self._buckets)
+        p = b + 1
+        while p <= m:
+            tree[p] += delta
+            p += p & -p
+
+    def add(self, v: float) -> None:
+        self.n += 1
+        if not self._buckets:
+            self._buckets.append([v])
+            self._maxes.append(v)
+            self._rebuild()
+            return
+        b = min(bisect_left(self._maxes, v), len(self._maxes) - 1)
+        bucket = self._buckets[b]
+        insort(bucket, v)
+        self._maxes[b] = bucket[-1]
+        if len(bucket) > 2 * self._LOAD:
+            half = len(bucket) // 2
+            self._buckets[b:b + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[b:b + 1] = [bucket[half - 1], bucket[-1]]
+            self._rebuild()
+        else:
+            self._add(b, 1)
+
+    def remove(self, v: float) -> None:
+        b = bisect_left(self._maxes, v)
+        bucket = self._buckets[b]
+        del bucket[bisect_left(bucket, v)]
+        self.n -= 1
+        if bucket:
+            self._maxes[b] = bucket[-1]
+            self._add(b, -1)
+        else:
+            del self._buckets[b], self._maxes[b]
+            self._rebuild()
+
+    def kth(self, k: int) -> float:
+        """k-th smallest (0-based): descend the tree by prefix counts, then index the bucket."""
+        tree, m = self._tree, len(self._buckets)
+        pos, rem, step = 0, k + 1, self._top
+        while step > 0:
+            nxt = pos + step
+            if nxt <= m and tree[nxt] < rem:
+                pos = nxt
+                rem -= tree[nxt]
+            step >>= 1
+        return self._buckets[pos][rem - 1]
+
+
+class SortedWindow:
+    """
+    Fixed-size trailing window with order statistics, updated one value at a time.
+
+    Values are kept in arrival order (for eviction) and in an order-statistics structure (sorted
+    buckets indexed by a Fenwick tree of counts, as in the batch kernel): each push / evict and each
+    quantile read is O(log w). Quantiles match ``rolling_quantiles`` (and pandas) exactly for the
+    same window contents.
+
+        w = SortedWindow(14, min_periods=7)
+        for v in drift:
+            w.push(v)
+            lo, hi = w.quantiles([0.1, 0.9])
+    """
+
+    __slots__ = ("window", "min_periods", "_fifo", "_stats")
+
+    def __init__(self, window: int, min_periods: Optional[int] = None, values: Iterable[float] = ()):
+        self.window = max(1, int(window))
+        self.min_periods = self.window if min_periods is None else max(0, int(min_periods))
+        self._fifo: deque = deque()
+        self._stats = _OrderStatistics()
+        for v in values:
+            self.push(v)
+
+    def __len__(self) -> int:
+        return len(self._fifo)
+
+    def push(self, value: float) -> None:
+        """Append ``value`` (NaN occupies a slot but is not counted) and evict the oldest if full."""
+        value = float(value)
+        self._fifo.append(value)
+        if not math.isnan(value):
+            self._stats.add(value)
+        if len(self._fifo) > self.window:
+            old = self._fifo.popleft()
+            if not math.isnan(old):
+                self._stats.remove(old)
+
+    def quantile(self, q: float) -> float:
+        nobs = len(self._stats)
+        if nobs == 0 or nobs < self.min_periods:
+            return float("nan")
+        f = float(q) * (nobs - 1)
+        idx = int(f)
+        lo = self._stats.kth(idx)
+        if idx == f:
+            return lo
+        hi = self._stats.kth(idx + 1)
+        return lo + (hi - lo) * (f - idx)
+
+    def quantiles(self, qs: Quantiles) -> np.ndarray:
+        return np.array([self.quantile(q) for q in _as_quantiles(qs)])
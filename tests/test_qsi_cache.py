@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qsi import QSIEngine, QSIConfig, QSIFrame, EpistemicAnalytics, EpistemicConfig, generate_dummy
+from qsi import ResultCache, configure_result_cache, result_cache_info
+from qsi import register_custom_model, register_array_model
+
+
+@pytest.fixture
+def cache():
+    c = configure_result_cache()
+    yield c
+    configure_result_cache()
+
+
+def _cfg(**kw):
+    return QSIConfig(use_cognize=False, result_cache=True, **kw)
+
+
+def test_analyze_hits_on_same_data_and_config(cache):
+    df = generate_dummy(days=80, segments=["A", "B"])
+    out1, rep1 = QSIEngine(_cfg()).analyze(df, groupby="Segment")
+    out2, rep2 = QSIEngine(_cfg()).analyze(df.copy(), groupby="Segment")
+    assert rep1["cache"]["hit"] is False and rep2["cache"] == {**rep1["cache"], "hit": True, "tier": "memory"}
+    pd.testing.assert_frame_equal(out1, out2)
+    assert rep1["summary"] == rep2["summary"] and rep1["by_segment"] == rep2["by_segment"]
+
+    out2.loc[0, "E"] = -1.0                                    # callers own what they get back
+    out3, _ = QSIEngine(_cfg()).analyze(df, groupby="Segment")
+    assert out3.loc[0, "E"] == out1.loc[0, "E"]
+
+    assert QSIEngine(_cfg(a=0.5)).analyze(df, groupby="Segment")[1]["cache"]["hit"] is False
+    assert QSIEngine(_cfg()).analyze(df, groupby=None)[1]["cache"]["hit"] is False
+    df.loc[3, "Actual"] += 1
+    assert QSIEngine(_cfg()).analyze(df, groupby="Segment")[1]["cache"]["hit"] is False
+    assert result_cache_info()["hits"]["memory"] == 2
+
+
+def test_reregistered_model_with_new_constants_or_closure_misses(cache):
+    df = generate_dummy(days=40)
+    cfg = _cfg(custom_model="cache_m")
+    register_custom_model("cache_m", lambda d, p, df: d * 0 + 2.0)
+    assert QSIEngine(cfg).analyze(df)[1]["cache"]["hit"] is False
+    register_custom_model("cache_m", lambda d, p, df: d * 0 + 1e9)
+    out, rep = QSIEngine(cfg).analyze(df)
+    assert rep["cache"]["hit"] is False and (out["Theta"] == 1e9).all()
+
+    def level(v):
+        return lambda d, p, cols: np.full(len(d), v)
+    for v in (3.0, 4.0):
+        register_array_model("cache_m", level(v))
+        out, rep = QSIEngine(cfg).analyze(df)
+        assert rep["cache"]["hit"] is False and (out["Theta"] == v).all()
+
+
+def test_dataframes_are_deep_copied_without_copy_on_write(monkeypatch):
+    import qsi.qsi_cache as qc
+    df = pd.DataFrame({"x": np.arange(5.0)})
+    monkeypatch.setattr(qc, "_copy_on_write", lambda: False)
+    c = ResultCache()
+    c.put("k", (df, {}))
+    got, _ = c.get("k")
+    assert not np.shares_memory(got[0]["x"].to_numpy(), df["x"].to_numpy())
+    assert not np.shares_memory(got[0]["x"].to_numpy(), c.get("k")[0][0]["x"].to_numpy())
+
+
+def test_cache_is_opt_in(cache):
+    df = generate_dummy(days=30)
+    _, rep = QSIEngine(QSIConfig(use_cognize=False)).analyze(df)
+    assert "cache" not in rep and result_cache_info()["size"] == 0
+
+
+def test_frame_results_are_cached_read_only(cache):
+    fr = QSIFrame.from_pandas(generate_dummy(days=40))
+    QSIEngine(_cfg()).analyze(fr)
+    out, rep = QSIEngine(_cfg()).analyze(fr)
+    assert rep["cache"]["hit"] and isinstance(out, QSIFrame)
+    with pytest.raises(ValueError):
+        out["E"][0] = 1.0
+
+
+def test_disk_tier_survives_new_cache_and_evicts_by_size(tmp_path):
+    df = generate_dummy(days=60)
+    try:
+        configure_result_cache(maxsize=0, directory=str(tmp_path))
+        QSIEngine(_cfg()).analyze(df)
+        configure_result_cache(directory=str(tmp_path))
+        _, rep = QSIEngine(_cfg()).analyze(df)
+        assert rep["cache"]["tier"] == "disk"
+        assert QSIEngine(_cfg()).analyze(df)[1]["cache"]["tier"] == "memory"
+
+        one = os.path.getsize(next(tmp_path.glob("*.pkl")))
+        configure_result_cache(directory=str(tmp_path), max_disk_bytes=int(2.5 * one))
+        for base in (100.0, 110.0, 130.0):
+            QSIEngine(_cfg(base_threshold=base)).analyze(df)
+        assert len(list(tmp_path.glob("*.pkl"))) == 2
+    finally:
+        configure_result_cache()
+
+
+def test_memory_tier_evicts_lru_by_count():
+    c = ResultCache(maxsize=2)
+    for k in "abc":
+        c.put(k, {"x": np.arange(3)})
+    assert c.get("a") == (None, None) and c.get("c")[1] == "memory"
+
+
+def test_enrich_reports_cache_hits(cache):
+    out, _ = QSIEngine(QSIConfig(use_cognize=False)).analyze(generate_dummy(days=90))
+    cfg = EpistemicConfig(result_cache=True)
+    a = EpistemicAnalytics.enrich(out, cfg)
+    b = EpistemicAnalytics.enrich(out, cfg)
+    assert (a.pop("cache")["hit"], b.pop("cache")["hit"]) == (False, True)
+    assert a == b
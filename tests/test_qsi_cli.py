@@ -0,0 +1,64 @@
+import json
+
+import pandas as pd
+import pytest
+
+from qsi import QSIEngine, QSIConfig, generate_dummy
+from qsi.qsi_cli import main, EXIT_OK, EXIT_FAILED, EXIT_USAGE
+
+
+def _inputs(tmp_path, n=3):
+    for i in range(n):
+        generate_dummy(days=40, segments=["A", "B"]).to_csv(tmp_path / f"in{i}.csv", index=False)
+    cfg = {"engine": {"use_cognize": False, "kernel": "numpy"}, "groupby": "Segment"}
+    (tmp_path / "cfg.json").write_text(json.dumps(cfg))
+    return str(tmp_path / "cfg.json")
+
+
+def _records(path):
+    return [json.loads(line) for line in open(path, encoding="utf-8")]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cli_runs_files_and_streams_report(tmp_path, capsys, workers):
+    cfg = _inputs(tmp_path)
+    rc = main([str(tmp_path / "in*.csv"), "-c", cfg, "-o", str(tmp_path / "out"), "-w", str(workers),
+               "-r", str(tmp_path / "rep.jsonl")])
+    assert rc == EXIT_OK
+    recs = _records(tmp_path / "rep.jsonl")
+    files, run = recs[:-1], recs[-1]
+    assert run["type"] == "run" and run["ok"] == 3 and run["failed"] == []
+    _, rep = QSIEngine(QSIConfig(use_cognize=False)).analyze(pd.read_csv(tmp_path / "in0.csv"), groupby="Segment")
+    first = next(r for r in files if r["file"].endswith("in0.csv"))
+    assert first["by_segment"] == rep["by_segment"] and "economics" in first["diagnostics"]
+    assert set(first["timings"]) == {"read", "analyze", "enrich", "write", "total"}
+    assert len(pd.read_csv(first["output"])) == 80
+    assert "3/3 files ok" in capsys.readouterr().err
+
+
+def test_cli_exit_codes(tmp_path):
+    cfg = _inputs(tmp_path, n=1)
+    (tmp_path / "bad.csv").write_text("x,y\n1,2\n")
+    rep = str(tmp_path / "rep.jsonl")
+    assert main([str(tmp_path / "*.csv"), "-c", cfg, "-f", "none", "-r", rep, "-q"]) == EXIT_FAILED
+    bad = next(r for r in _records(rep) if r.get("file", "").endswith("bad.csv"))
+    assert bad["status"] == "error" and "Missing columns" in bad["error"]
+
+    assert main([str(tmp_path / "nothing*.csv"), "-q"]) == EXIT_USAGE
+    (tmp_path / "typo.json").write_text(json.dumps({"engine": {"sigmaa": 1.0}}))
+    assert main([str(tmp_path / "in0.csv"), "-c", str(tmp_path / "typo.json")]) == EXIT_USAGE
+
+
+def test_cli_skips_previous_results_and_rejects_output_clashes(tmp_path):
+    cfg = _inputs(tmp_path, n=1)
+    rep = str(tmp_path / "rep.jsonl")
+    assert main([str(tmp_path / "*.csv"), "-c", cfg, "-r", rep, "-q"]) == EXIT_OK
+    assert main([str(tmp_path / "*.csv"), "-c", cfg, "-r", rep, "-q"]) == EXIT_OK   # rerun over the same glob
+    assert [r["file"] for r in _records(rep)[:-1]] == [str(tmp_path / "in0.csv")]
+    assert sorted(p.name for p in tmp_path.glob("*.csv")) == ["in0.csv", "in0.qsi.csv"]
+
+    (tmp_path / "sub").mkdir()
+    generate_dummy(days=10).to_csv(tmp_path / "sub" / "in0.csv", index=False)
+    out = tmp_path / "out"
+    assert main([str(tmp_path / "**" / "in0.csv"), "-c", cfg, "-o", str(out), "-r", rep, "-q"]) == EXIT_USAGE
+    assert not out.exists()
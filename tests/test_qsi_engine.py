@@ -0,0 +1,386 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qsi import QSIEngine, QSIConfig, generate_dummy
+from qsi import register_array_model, register_custom_model, theta_cache_info, clear_theta_cache
+
+
+def _native_cfg(**kw):
+    return QSIConfig(use_cognize=False, **kw)
+
+
+def _reference_native(drift, cost, cfg):
+    """Per-step reference of the native recurrence (one rng.normal call per step)."""
+    rng = np.random.default_rng(cfg.seed)
+    E, Theta = np.zeros_like(drift), np.zeros_like(drift)
+    rupture, loss = np.zeros(len(drift), dtype=bool), np.zeros_like(drift)
+    mem = 0.0
+    for i, d in enumerate(drift):
+        eps = float(rng.normal(0.0, cfg.sigma)) if cfg.sigma > 0 else 0.0
+        th = max(0.0, cfg.base_threshold + cfg.a * mem + eps)
+        Theta[i] = th
+        if d > th:
+            rupture[i] = True; loss[i] = d * cost[i]; mem = 0.0
+        else:
+            mem = mem + cfg.c * d
+        E[i] = mem
+    return E, Theta, rupture, loss
+
+
+#  Single stream
+def test_native_matches_reference_loop():
+    df = generate_dummy(days=120)
+    cfg = _native_cfg()
+    out, rep = QSIEngine(cfg).analyze(df)
+    drift = np.abs(df["Forecast"].to_numpy(float) - df["Actual"].to_numpy(float))
+    E, Theta, rupture, loss = _reference_native(drift, df["Unit_Cost"].to_numpy(float), QSIEngine(cfg).cfg)
+    np.testing.assert_array_equal(out["E"], E)
+    np.testing.assert_array_equal(out["Theta"], Theta)
+    np.testing.assert_array_equal(out["rupture"], rupture)
+    np.testing.assert_array_equal(out["loss"], loss)
+    assert rep["summary"]["engine"] == "native"
+
+
+def test_ewma_theta_matches_pandas():
+    df = generate_dummy(days=90)
+    out, rep = QSIEngine(_native_cfg(use_ewma=True, ewma_alpha=0.3, ewma_k=2.0)).analyze(df)
+    s = out["drift"]
+    expected = s.ewm(alpha=0.3).mean() + 2.0 * np.sqrt(s.ewm(alpha=0.3).var().fillna(0.0))
+    np.testing.assert_array_equal(out["Theta"].to_numpy(), expected.to_numpy())
+    assert rep["summary"]["engine"] == "ewma"
+
+
+def test_cognize_single_stream_output_schema():
+    pytest.importorskip("cognize")
+    df = generate_dummy(days=60)
+    out, rep = QSIEngine(QSIConfig(custom_model="rolling_quantile")).analyze(df)
+    assert list(out.columns) == ["Date", "Forecast", "Actual", "Unit_Cost", "drift", "E", "Theta",
+                                 "rupture", "rupture_prob", "loss"]
+    assert out["rupture"].dtype == bool and pd.api.types.is_datetime64_any_dtype(out["Date"])
+    np.testing.assert_array_equal(out["drift"], (df["Forecast"] - df["Actual"]).abs().to_numpy())
+    np.testing.assert_array_equal(out["loss"], np.where(out["rupture"], out["drift"] * out["Unit_Cost"], 0.0))
+    assert rep["summary"]["engine"] == "cognize+customθ"
+
+
+#  Segmented (grouped) native / EWMA / custom
+@pytest.mark.parametrize("kw", [{}, {"use_ewma": True}, {"custom_model": "rolling_quantile"}, {"sigma": 0.0}])
+def test_segmented_matches_per_segment_runs(kw):
+    df = generate_dummy(days=40, segments=["B", "A", "C"]).sample(frac=1.0, random_state=0)
+    df["Unit_Cost"] = np.random.default_rng(0).uniform(10.0, 50.0, len(df))   # inexact loss sums
+    engine = QSIEngine(_native_cfg(**kw))
+    out, rep = engine.analyze(df, groupby="Segment")
+
+    assert list(rep["by_segment"].keys()) == ["A", "B", "C"]
+    assert out["Segment"].tolist() == ["A"] * 40 + ["B"] * 40 + ["C"] * 40
+    for seg, sub in df.groupby("Segment"):
+        o, _ = QSIEngine(_native_cfg(**kw)).analyze(sub)
+        got = out[out["Segment"] == seg].reset_index(drop=True)
+        for col in ("drift", "E", "Theta", "rupture", "rupture_prob", "loss"):
+            np.testing.assert_array_equal(got[col].to_numpy(), o[col].to_numpy())
+        assert rep["by_segment"][seg] == {
+            "n": 40, "ruptures": int(o["rupture"].sum()), "loss": float(o["loss"].sum()),
+        }
+
+
+def test_segmented_drops_missing_keys():
+    df = generate_dummy(days=10, segments=["A", "B"])
+    df.loc[0, "Segment"] = None
+    out, rep = QSIEngine(_native_cfg()).analyze(df, groupby="Segment")
+    assert len(out) == 19
+    assert rep["by_segment"]["A"]["n"] == 9
+
+
+#  Array entrypoint
+@pytest.mark.parametrize("kw", [{}, {"use_ewma": True}, {"custom_model": "window_std_k"}])
+def test_analyze_arrays_matches_dataframe_path(kw):
+    df = generate_dummy(days=50, segments=["B", "A", "C"]).sample(frac=1.0, random_state=1)
+    df = df.sort_values("Date", kind="stable")
+    cfg = _native_cfg(col_segment="Segment", **kw)
+    a, ra = QSIEngine(cfg).analyze(df, groupby="Segment")
+    b, rb = QSIEngine(cfg).analyze_arrays(df["Date"].to_numpy(), df["Forecast"].to_numpy(), df["Actual"].to_numpy(),
+                                          df["Unit_Cost"].to_numpy(), segments=df["Segment"].to_numpy())
+    for col in ("drift", "E", "Theta", "rupture", "rupture_prob", "loss"):
+        np.testing.assert_array_equal(b[col], a[col].to_numpy())
+    np.testing.assert_array_equal(b["Segment"], a["Segment"].to_numpy())
+    assert ra["summary"] == rb["summary"] and ra["by_segment"] == rb["by_segment"]
+    pd.testing.assert_frame_equal(rb["events"], ra["events"], check_dtype=False)
+
+
+def test_analyze_arrays_assume_sorted_asserts_order():
+    df = generate_dummy(days=30)
+    args = [df[c].to_numpy()[::-1] for c in ("Date", "Forecast", "Actual", "Unit_Cost")]
+    with pytest.raises(ValueError, match="assume_sorted"):
+        QSIEngine(_native_cfg()).analyze_arrays(*args, assume_sorted=True)
+    out, rep = QSIEngine(_native_cfg()).analyze_arrays(*args)
+    np.testing.assert_array_equal(out["E"], QSIEngine(_native_cfg()).analyze(df)[0]["E"].to_numpy())
+    assert rep["flags"]["kernel"] in ("numpy", "numba")
+
+
+#  Cognize graph panel
+def test_graph_mode_handles_ragged_panel():
+    pytest.importorskip("cognize")
+    df = generate_dummy(days=12, segments=["A", "B", "C"])
+    df = df.drop(index=df.index[(df["Segment"] == "B") & (df["Date"] > df["Date"].min())][:5])
+    out, rep = QSIEngine(QSIConfig(use_graph=True)).analyze(df, groupby="Segment")
+    assert len(out) == len(df) == 31
+    assert out["Date"].is_monotonic_increasing
+    assert out.groupby("Date")["Segment"].apply(lambda s: s.is_monotonic_increasing).all()
+    merged = out.merge(df, on=["Date", "Segment"], suffixes=("", "_in"))
+    np.testing.assert_array_equal(merged["Forecast"], merged["Forecast_in"])
+    assert rep["summary"]["engine"] == "cognize-graph"
+    assert set(rep["by_segment"]) == {"A", "B", "C"}
+
+
+#  Custom θ registry
+def test_array_model_gets_contiguous_columns_and_is_cached():
+    calls = []
+
+    def cost_band(drift, params, cols):
+        assert drift.dtype == np.float64 and drift.flags.c_contiguous
+        assert cols["Unit_Cost"].dtype == np.float64 and cols["Unit_Cost"].flags.c_contiguous
+        calls.append(len(drift))
+        return np.full_like(drift, params["base"]) + cols["Unit_Cost"]
+
+    register_array_model("cost_band", cost_band, columns=["Unit_Cost"])
+    clear_theta_cache()
+    df = generate_dummy(days=30, segments=["A", "B"])
+    cfg = _native_cfg(custom_model="cost_band", custom_params={"base": 20.0})
+    out1, _ = QSIEngine(cfg).analyze(df, groupby="Segment")
+    out2, _ = QSIEngine(cfg).analyze(df, groupby="Segment")
+    assert calls == [30, 30]                              # second run served from the cache
+    assert theta_cache_info()["hits"] == 1
+    pd.testing.assert_frame_equal(out1, out2, check_exact=True)
+    np.testing.assert_array_equal(out1["Theta"], 20.0 + out1["Unit_Cost"])
+
+    QSIEngine(_native_cfg(custom_model="cost_band", custom_params={"base": 30.0})).analyze(df, groupby="Segment")
+    assert calls == [30, 30, 30, 30]                      # params are part of the key
+
+
+def test_theta_cache_is_bounded_by_bytes():
+    register_array_model("flat_band", lambda d, p, c: np.full_like(d, 50.0))
+    df = generate_dummy(days=100)
+    try:
+        clear_theta_cache(max_bytes=1000)                 # 100 rows = 800 bytes: one entry fits
+        QSIEngine(_native_cfg(custom_model="flat_band", custom_params={"v": 1})).analyze(df)
+        QSIEngine(_native_cfg(custom_model="flat_band", custom_params={"v": 2})).analyze(df)
+        info = theta_cache_info()
+        assert (info["size"], info["nbytes"]) == (1, 800)
+        clear_theta_cache(max_bytes=500)                  # larger than the budget: never kept
+        QSIEngine(_native_cfg(custom_model="flat_band")).analyze(df)
+        assert theta_cache_info()["size"] == 0
+    finally:
+        clear_theta_cache(max_bytes=64 * 2**20)
+
+
+def test_series_model_still_supported():
+    register_custom_model("half_forecast", lambda drift, params, df: df["Forecast"] * 0.5)
+    df = generate_dummy(days=20)
+    out, rep = QSIEngine(_native_cfg(custom_model="half_forecast")).analyze(df)
+    np.testing.assert_array_equal(out["Theta"], out["Forecast"] * 0.5)
+    assert rep["summary"]["engine"] == "custom"
+
+
+#  Recurrence kernels
+@pytest.mark.parametrize("kw", [{}, {"use_ewma": True}, {"custom_model": "window_std_k"}])
+def test_numba_kernel_bit_identical_to_numpy(kw):
+    pytest.importorskip("numba")
+    df = generate_dummy(days=50, segments=["A", "B"])
+    o_np, r_np = QSIEngine(_native_cfg(kernel="numpy", **kw)).analyze(df, groupby="Segment")
+    o_nb, r_nb = QSIEngine(_native_cfg(kernel="numba", **kw)).analyze(df, groupby="Segment")
+    pd.testing.assert_frame_equal(o_np, o_nb, check_exact=True)
+    assert r_np["flags"]["kernel"] == "numpy"
+    assert r_nb["flags"]["kernel"] == "numba"
+
+
+@pytest.mark.parametrize("kernel", ["numpy", "numba"])
+def test_batch_ewma_matches_stateful_recurrence(kernel):
+    if kernel == "numba":
+        pytest.importorskip("numba")
+    from qsi.qsi_kernels import get_kernels, EWMA_STATE_WIDTH
+    drift = np.abs(np.random.default_rng(5).normal(size=300) * 50).round()
+    for off in (np.array([0, 300]), np.array([0, 120, 120, 300])):
+        kern = get_kernels(kernel)
+        ref = get_kernels("numpy").ewma_theta(drift, off, 0.3, 2.0, np.zeros((len(off) - 1, EWMA_STATE_WIDTH)))
+        np.testing.assert_array_equal(kern.ewma_theta_batch(drift, off, 0.3, 2.0), ref)
+
+
+def test_unknown_kernel_falls_back_to_auto():
+    assert QSIConfig(kernel="fortran").validate().kernel == "auto"
+
+
+#  Process-pool sharding
+@pytest.mark.parametrize("kw", [{"use_cognize": False}, {"use_cognize": False, "use_ewma": True}, {}])
+def test_parallel_matches_serial_for_any_worker_count(kw):
+    if kw.get("use_cognize", True):
+        pytest.importorskip("cognize")
+    df = generate_dummy(days=30, segments=["D", "A", "C", "B", "E"])
+    df = df.iloc[:-20]                                   # uneven segment sizes
+    serial, rep1 = QSIEngine(QSIConfig(seed_by_segment=True, **kw)).analyze(df, groupby="Segment")
+    for n in (2, 3):
+        par, rep = QSIEngine(QSIConfig(seed_by_segment=True, n_workers=n, **kw)).analyze(df, groupby="Segment")
+        pd.testing.assert_frame_equal(serial, par, check_exact=True)
+        assert list(rep["by_segment"].items()) == list(rep1["by_segment"].items())
+        assert rep["flags"]["n_workers"] == n
+
+
+def test_seed_by_segment_gives_distinct_noise_per_segment():
+    df = generate_dummy(days=20, segments=["A", "B"])
+    df["Forecast"] = df["Actual"]                        # identical zero drift in both segments
+    shared, _ = QSIEngine(_native_cfg()).analyze(df, groupby="Segment")
+    keyed, _ = QSIEngine(_native_cfg(seed_by_segment=True)).analyze(df, groupby="Segment")
+    th = lambda o, s: o.loc[o["Segment"] == s, "Theta"].to_numpy()
+    np.testing.assert_array_equal(th(shared, "A"), th(shared, "B"))
+    assert not np.array_equal(th(keyed, "A"), th(keyed, "B"))
+
+
+#  Parameter sweep
+def test_sweep_matches_individual_analyze_runs():
+    df = generate_dummy(days=80, segments=["A", "B"])
+    engine = QSIEngine(_native_cfg())
+    grid = {"base_threshold": [60.0, 120.0], "a": [0.0, 0.05], "sigma": [0.0, 5.0], "use_ewma": [False, True]}
+    table = engine.sweep(df, grid, groupby="Segment")
+    assert len(table) == 16
+    assert list(table.columns[:4]) == ["base_threshold", "a", "sigma", "use_ewma"]
+    for _, row in table.iterrows():
+        ov = {k: row[k] for k in grid}
+        out, rep = QSIEngine(_native_cfg()).analyze(df, groupby="Segment", overrides=ov)
+        assert row["ruptures"] == rep["summary"]["ruptures"]
+        assert row["total_loss"] == pytest.approx(rep["summary"]["total_loss"])
+        assert row["mean_margin"] == pytest.approx((out["drift"] - out["Theta"]).mean())
+
+
+def test_sweep_rejects_unknown_params():
+    with pytest.raises(ValueError):
+        QSIEngine(_native_cfg()).sweep(generate_dummy(days=10), {"epsilon": [0.1]})
+
+
+#  Monte Carlo ensemble
+@pytest.mark.parametrize("kw", [{}, {"seed_by_segment": True}])
+def test_ensemble_paths_replay_analyze_with_their_seed(kw):
+    df = generate_dummy(days=120, segments=["A", "B"])
+    out, rep = QSIEngine(_native_cfg(**kw)).ensemble(df, n_paths=6, groupby="Segment")
+    assert rep["paths"]["seed"][0] == QSIConfig().seed and rep["summary"]["n_paths"] == 6
+    for k in (0, 4):
+        _, r = QSIEngine(_native_cfg(seed=int(rep["paths"]["seed"][k]), **kw)).analyze(df, groupby="Segment")
+        assert rep["paths"]["ruptures"][k] == r["summary"]["ruptures"]
+        assert rep["paths"]["total_loss"][k] == pytest.approx(r["summary"]["total_loss"])
+    assert out["rupture_freq"].between(0.0, 1.0).all()
+    assert (out["Theta_q05"] <= out["Theta_q50"]).all() and (out["E_q50"] <= out["E_q95"]).all()
+    assert set(rep["by_segment"]) == {"A", "B"}
+
+
+def test_single_path_ensemble_equals_analyze():
+    df = generate_dummy(days=90)
+    out, _ = QSIEngine(_native_cfg()).ensemble(df, n_paths=1, quantiles=(0.5,))
+    ref, _ = QSIEngine(_native_cfg()).analyze(df)
+    np.testing.assert_array_equal(out["Theta_q50"], ref["Theta"])
+    np.testing.assert_array_equal(out["E_q50"], ref["E"])
+    np.testing.assert_array_equal(out["rupture_freq"], ref["rupture"].astype(float))
+
+
+def test_ensemble_numba_bit_identical_to_numpy():
+    pytest.importorskip("numba")
+    df = generate_dummy(days=60, segments=["A", "B"])
+    o_np, r_np = QSIEngine(_native_cfg(kernel="numpy")).ensemble(df, n_paths=16, groupby="Segment")
+    o_nb, r_nb = QSIEngine(_native_cfg(kernel="numba")).ensemble(df, n_paths=16, groupby="Segment")
+    pd.testing.assert_frame_equal(o_np, o_nb, check_exact=True)
+    np.testing.assert_array_equal(r_np["paths"]["total_loss"], r_nb["paths"]["total_loss"])
+
+
+def test_ensemble_rejects_deterministic_theta():
+    with pytest.raises(ValueError):
+        QSIEngine(_native_cfg(use_ewma=True)).ensemble(generate_dummy(days=10))
+
+
+#  Output profiles
+def _without_profile(rep):
+    return {**rep["summary"], "config": {**rep["summary"]["config"], "output": None}}
+
+
+@pytest.mark.parametrize("kw", [{}, {"use_ewma": True}, {"col_segment": "Segment"}])
+@pytest.mark.parametrize("groupby", [None, "Segment"])
+def test_summary_only_matches_full_report(kw, groupby):
+    df = generate_dummy(days=60, segments=["A", "B", "C"]).sample(frac=1.0, random_state=0)
+    _, full = QSIEngine(_native_cfg(**kw)).analyze(df, groupby=groupby)
+    out, rep = QSIEngine(_native_cfg(output="summary_only", **kw)).analyze(df, groupby=groupby)
+    assert out is None
+    assert _without_profile(rep) == _without_profile(full) and rep.get("by_segment") == full.get("by_segment")
+    assert list(rep["events"].columns) == list(full["events"].columns)
+    np.testing.assert_array_equal(rep["events"]["loss"], full["events"]["loss"])
+
+
+def test_summary_only_stays_on_arrays_when_cognize_is_missing(monkeypatch):
+    import qsi.qsi_engine as qe
+    monkeypatch.setattr(qe, "_USE_COGNIZE", False)
+    calls = []
+    orig = QSIEngine._analyze_summary
+    monkeypatch.setattr(QSIEngine, "_analyze_summary", lambda self, *a: calls.append(1) or orig(self, *a))
+    df = generate_dummy(days=60, segments=["A", "B"])
+    _, rep = QSIEngine(QSIConfig(use_cognize=True, output="summary_only")).analyze(df, groupby="Segment")
+    _, ref = QSIEngine(_native_cfg()).analyze(df, groupby="Segment")
+    assert calls and rep["by_segment"] == ref["by_segment"]
+    assert rep["flags"]["cognize_unavailable_fallback"] and rep["flags"]["cognize_requested"]
+
+
+def test_compact_profile_downcasts_results_only():
+    df = generate_dummy(days=60, segments=["A", "B"])
+    full, rf = QSIEngine(_native_cfg()).analyze(df, groupby="Segment")
+    out, rc = QSIEngine(_native_cfg(output="compact")).analyze(df, groupby="Segment")
+    assert _without_profile(rc) == _without_profile(rf)
+    assert {out[k].dtype for k in ("drift", "E", "Theta", "rupture_prob", "loss")} == {np.dtype(np.float32)}
+    assert out["rupture"].dtype == bool and isinstance(out["Segment"].dtype, pd.CategoricalDtype)
+    np.testing.assert_allclose(out["Theta"], full["Theta"], rtol=1e-6)
+
+    fo, _ = QSIEngine(_native_cfg(output="compact")).analyze_arrays(
+        df["Date"], df["Forecast"], df["Actual"], df["Unit_Cost"], segments=df["Segment"])
+    assert fo["E"].dtype == np.float32 and fo.codes is not None
+    assert QSIConfig(output="tiny").validate().output == "full"
+
+
+def test_overrides_leave_engine_untouched():
+    df = generate_dummy(days=60, segments=["A", "B"])
+    engine = QSIEngine(_native_cfg())
+    before = engine.cfg
+    o1, _ = engine.analyze(df, groupby="Segment", overrides={"a": 0.5, "sigma": 0.0, "not_a_field": 1})
+    assert engine.cfg is before
+    ref, _ = QSIEngine(_native_cfg(a=0.5, sigma=0.0)).analyze(df, groupby="Segment")
+    pd.testing.assert_frame_equal(o1, ref)
+    o2, _ = engine.analyze(df, groupby="Segment")
+    pd.testing.assert_frame_equal(o2, QSIEngine(_native_cfg()).analyze(df, groupby="Segment")[0])
+    assert engine._for_call({"a": before.a}) is engine
+
+
+def test_override_configs_follow_base_and_feature_stores_are_keyed():
+    engine = QSIEngine(_native_cfg())
+    assert engine._for_call({"a": 0.5}).cfg.a == 0.5
+    engine.cfg = _native_cfg(c=0.7)
+    call = engine._for_call({"a": 0.5})
+    assert (call.cfg.a, call.cfg.c) == (0.5, 0.7) and call._configs is not engine._configs
+
+    x, y, off = np.arange(10.0), np.ones(10), np.array([0, 10])
+    fx = engine._feature_store("x", x, off)
+    assert engine._feature_store("y", y, off) is not fx and call._feature_store("x", x, off) is fx
+    other = engine._for_call({"kernel": "numpy" if engine.cfg.kernel != "numpy" else "auto"})
+    assert other._features is engine._features and other._feature_store("x", x, off) is not fx
+
+
+def test_one_engine_serves_concurrent_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    df = generate_dummy(days=80, segments=["A", "B", "C"])
+    engine = QSIEngine(_native_cfg(kernel="numpy"))
+    jobs = [{"a": a, "use_ewma": ewma} for a in (0.1, 0.3, 0.6) for ewma in (False, True)] * 3
+    serial = [QSIEngine(_native_cfg(kernel="numpy", **ov)).analyze(df, groupby="Segment")[0] for ov in jobs]
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        got = list(pool.map(lambda ov: engine.analyze(df, groupby="Segment", overrides=ov)[0], jobs))
+    for a, b in zip(got, serial):
+        pd.testing.assert_frame_equal(a, b)
+
+
+def test_custom_model_lookup_follows_reregistration():
+    df = generate_dummy(days=40)
+    register_array_model("swap_me", lambda d, p, cols: np.full(len(d), 10.0))
+    engine = QSIEngine(_native_cfg(custom_model="swap_me"))
+    assert (engine.analyze(df)[0]["Theta"] == 10.0).all()
+    register_array_model("swap_me", lambda d, p, cols: np.full(len(d), 20.0))
+    assert (engine.analyze(df)[0]["Theta"] == 20.0).all()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qsi import QSIEngine, QSIConfig, QSIFrame, EpistemicAnalytics, EpistemicConfig, generate_dummy
+
+
+def _shuffled_segments(days=80):
+    df = generate_dummy(days=days, segments=["A", "B", "C"]).sample(frac=1.0, random_state=0)
+    df["policy"] = np.arange(len(df)) % 4 == 0
+    return df.reset_index(drop=True)
+
+
+def _without_dates(d):
+    return {k: _without_dates(v) for k, v in d.items() if k != "expiry_estimate_date"} if isinstance(d, dict) else d
+
+
+def test_from_pandas_validates_once_and_sorts_stably():
+    df = _shuffled_segments()
+    fr = QSIFrame.from_pandas(df, segment="Segment")
+    order = np.argsort(df["Date"].to_numpy(), kind="stable")
+    np.testing.assert_array_equal(fr.forecast, df["Forecast"].to_numpy(float)[order])
+    assert fr.date.dtype == np.int64 and fr.codes.dtype == np.int32 and fr.date_sorted
+    assert list(fr.categories) == ["A", "B", "C"]
+    np.testing.assert_array_equal(fr["Segment"], df["Segment"].to_numpy()[order])
+    np.testing.assert_array_equal(fr.weekday(), df["Date"].dt.weekday.to_numpy()[order])
+
+    with pytest.raises(ValueError, match="Missing columns"):
+        QSIFrame.from_pandas(df.drop(columns="Actual"))
+    with pytest.raises(ValueError, match="NaNs"):
+        QSIFrame.from_pandas(df.assign(Forecast=np.nan))
+    with pytest.raises(ValueError, match="Unit_Cost"):
+        QSIFrame.from_pandas(df.assign(Unit_Cost=-1.0))
+
+
+def test_sorted_float_input_is_not_copied():
+    df = generate_dummy(days=50).astype({"Forecast": float, "Actual": float})
+    fr = QSIFrame.from_pandas(df)
+    assert np.shares_memory(fr.forecast, df["Forecast"].to_numpy())
+    view = fr.to_pandas()
+    assert np.shares_memory(view["Actual"].to_numpy(), fr.actual)
+
+
+@pytest.mark.parametrize("kw", [{}, {"use_ewma": True}, {"custom_model": "rolling_quantile"}])
+def test_analyze_frame_matches_dataframe(kw):
+    df = _shuffled_segments()
+    cfg = QSIConfig(use_cognize=False, col_segment="Segment", **kw)
+    a, ra = QSIEngine(cfg).analyze(df.sort_values("Date", kind="stable"), groupby="Segment")
+    b, rb = QSIEngine(cfg).analyze(QSIFrame.from_pandas(df, segment="Segment"), groupby="Segment")
+    assert isinstance(b, QSIFrame) and b.segment == "Segment"
+    for col in ("drift", "E", "Theta", "rupture", "loss"):
+        np.testing.assert_array_equal(b[col], a[col].to_numpy())
+    assert ra["summary"] == rb["summary"] and ra["by_segment"] == rb["by_segment"]
+
+
+def test_enrich_frame_matches_dataframe():
+    df = _shuffled_segments()
+    eng = QSIEngine(QSIConfig(use_cognize=False))
+    out, _ = eng.analyze(df.sort_values("Date", kind="stable"), groupby="Segment")
+    fo, _ = eng.analyze(QSIFrame.from_pandas(df, segment="Segment"), groupby="Segment")
+    cfg = EpistemicConfig(groupby="Segment", policy_col="policy", recent_window=40)
+    got = EpistemicAnalytics.enrich(fo, cfg)
+    assert _without_dates(got) == _without_dates(EpistemicAnalytics.enrich(out, cfg))
+    assert set(got["by_group"]) == {"A", "B", "C"} and "policy_breakdown" in got
+
+
+def test_enrich_frame_needs_analyzed_columns():
+    with pytest.raises(ValueError, match="missing required columns"):
+        EpistemicAnalytics.enrich(QSIFrame.from_pandas(generate_dummy(days=20)), EpistemicConfig())
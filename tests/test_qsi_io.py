@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from qsi import QSIEngine, QSIConfig, QSIFrame, generate_dummy
+from qsi import read_table, read_frame, write_dataset, to_arrow
+from qsi.qsi_io import FrameWriter, iter_frames
+
+
+def _sorted_float_dummy(days=90):
+    df = generate_dummy(days=days, segments=["A", "B", "C/x"]).sort_values("Date", kind="stable")
+    df = df.astype({"Forecast": float, "Actual": float, "Date": "datetime64[ns]"})
+    return df.reset_index(drop=True)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_partitioned_write_prunes_on_read(tmp_path, fmt):
+    df = _sorted_float_dummy()
+    files = write_dataset(df, str(tmp_path), segment="Segment", format=fmt)
+    assert any("Segment=C%2Fx" in f and "Date_month=" in f for f in files)
+
+    lo, hi = df["Date"].iloc[0] + pd.Timedelta(days=20), df["Date"].iloc[0] + pd.Timedelta(days=50)
+    t = read_table(str(tmp_path), segments=["C/x"], start=lo, end=hi)
+    want = df[(df["Segment"] == "C/x") & df["Date"].between(lo, hi)]
+    assert t.num_rows == len(want) and "Date_month" not in t.column_names
+    np.testing.assert_array_equal(np.sort(t["Actual"].to_numpy()), np.sort(want["Actual"].to_numpy()))
+
+
+def test_read_frame_feeds_engine_like_dataframe(tmp_path):
+    df = _sorted_float_dummy()
+    write_dataset(df, str(tmp_path), segment="Segment", date_partition="day")
+    cfg = QSIConfig(use_cognize=False)
+    _, ra = QSIEngine(cfg).analyze(df, groupby="Segment")
+    _, rb = QSIEngine(cfg).analyze(read_frame(str(tmp_path), segment="Segment"), groupby="Segment")
+    assert ra["by_segment"] == rb["by_segment"] and ra["summary"]["ruptures"] == rb["summary"]["ruptures"]
+
+
+def test_arrow_ipc_file_is_memory_mapped_zero_copy(tmp_path):
+    df = _sorted_float_dummy()
+    path = str(tmp_path / "in.arrow")
+    with FrameWriter(path) as w:
+        w.write(df)
+    before = pa.total_allocated_bytes()
+    fr = read_frame(path, segment="Segment")
+    assert pa.total_allocated_bytes() - before < fr.forecast.nbytes     # only segment codes allocated
+    np.testing.assert_array_equal(fr.actual, df["Actual"].to_numpy())
+
+    with FrameWriter(path) as w:
+        w.write(df.iloc[:100])
+        w.write(QSIFrame.from_pandas(df.iloc[100:], segment="Segment"))
+    assert sum(len(c) for c in iter_frames(path, chunksize=64)) == len(df)
+    cut = df["Date"].iloc[len(df) // 2]
+    assert len(read_frame(path, segment="Segment", segments=["A"], end=cut)) == \
+        int(((df["Segment"] == "A") & (df["Date"] <= cut)).sum())
+
+
+def test_to_arrow_keeps_segment_as_dictionary():
+    fr = QSIFrame.from_pandas(_sorted_float_dummy(days=20), segment="Segment")
+    t = to_arrow(fr)
+    assert str(t["Segment"].type).startswith("dictionary")
+    assert t["Segment"].to_pylist() == list(fr["Segment"])
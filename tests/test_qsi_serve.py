@@ -0,0 +1,121 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from qsi import QSIEngine, QSIConfig, SynthConfig, generate_synthetic
+from qsi.qsi_serve import ScoringService, ServiceConfig, LocalClient, ServiceClient
+
+
+def _requests(n=12, days=40):
+    df = generate_synthetic(SynthConfig(n_segments=n, days=days, level_shift_rate=0.5, end="2024-03-01"))
+    return [{"key": str(s), "dates": g["Date"].astype(str).tolist(), "forecast": g["Forecast"].tolist(),
+             "actual": g["Actual"].tolist(), "cost": g["Unit_Cost"].tolist()}
+            for s, g in df.groupby("Segment", observed=True)]
+
+
+def _alone(cfg, req):
+    out, _ = QSIEngine(cfg).analyze_arrays(req["dates"], req["forecast"], req["actual"], req["cost"])
+    return np.asarray(out["Theta"]), np.asarray(out["loss"])
+
+
+@pytest.mark.parametrize("seed_by_segment", [False, True])
+def test_concurrent_requests_are_batched_and_match_single_runs(seed_by_segment):
+    cfg = QSIConfig(use_cognize=False, kernel="numpy", seed_by_segment=seed_by_segment)
+    reqs = _requests()
+    reqs[3] = {**reqs[3], "overrides": {"a": 0.5}}
+    reqs[5] = {**reqs[5], "key": reqs[4]["key"]}                   # same key twice: separate engine calls
+
+    async def run():
+        async with ScoringService(cfg, ServiceConfig(max_batch=5, max_wait_ms=50)) as svc:
+            res = await asyncio.gather(*(LocalClient(svc).score(r) for r in reqs))
+            return res, dict(svc.stats)
+
+    res, stats = asyncio.run(run())
+    assert stats["requests"] == 12 and stats["batches"] == 3 and stats["max_batch_seen"] == 5
+    for req, r in zip(reqs, res):
+        rcfg = QSIConfig(**{**cfg.__dict__, **req.get("overrides", {})})
+        if seed_by_segment:
+            out, _ = QSIEngine(rcfg).analyze_arrays(req["dates"], req["forecast"], req["actual"], req["cost"],
+                                                    segments=np.repeat(req["key"], len(req["dates"])))
+            theta, loss = np.asarray(out["Theta"]), np.asarray(out["loss"])
+        else:
+            theta, loss = _alone(rcfg, req)
+        np.testing.assert_array_equal(np.array(r["results"]["Theta"]), theta)
+        assert r["key"] == req["key"] and r["total_loss"] == pytest.approx(loss.sum())
+
+
+def test_http_and_unix_socket_round_trip(tmp_path):
+    cfg = QSIConfig(use_cognize=False, kernel="numpy")
+    reqs = _requests(n=4)
+
+    async def run(svc_cfg):
+        async with ScoringService(cfg, svc_cfg) as svc:
+            client = (ServiceClient(unix_path=svc.address) if svc_cfg.unix_path else ServiceClient(*svc.address))
+            single = await client.score(reqs[0])
+            many = await client.score_many(reqs[1:] + [{"dates": [1]}])
+            with pytest.raises(ValueError, match="Missing fields"):
+                await client.score({"dates": []})
+            return single, many, (await client.health())["stats"]
+
+    for svc_cfg in (ServiceConfig(port=0), ServiceConfig(unix_path=str(tmp_path / "qsi.sock"))):
+        single, many, stats = asyncio.run(run(svc_cfg))
+        np.testing.assert_array_equal(np.array(single["results"]["Theta"]), _alone(cfg, reqs[0])[0])
+        assert [m.get("n") for m in many[:3]] == [40, 40, 40] and "Missing fields" in many[3]["error"]
+        assert stats["requests"] == 4 and stats["errors"] == 1
+
+
+@pytest.mark.parametrize("bad", [{"actual": [float("nan")]}, {"dates": ["not a date"]}, {"cost": -1.0},
+                                 {"forecast": [float("inf")]}])
+def test_bad_request_fails_alone(bad):
+    cfg = QSIConfig(use_cognize=False, kernel="numpy")
+    good = _requests(n=2, days=5)
+    broken = dict(good[1])
+    for k, v in bad.items():
+        broken[k] = v + broken[k][1:] if isinstance(v, list) else v
+
+    async def run():
+        async with ScoringService(cfg, ServiceConfig(max_batch=8, max_wait_ms=50)) as svc:
+            return await asyncio.gather(*(svc.score(r) for r in (good[0], broken)), return_exceptions=True)
+
+    ok, err = asyncio.run(run())
+    assert isinstance(err, ValueError)
+    np.testing.assert_array_equal(np.array(ok["results"]["Theta"]), _alone(cfg, good[0])[0])
+
+
+def test_failing_wave_is_rescored_per_request(monkeypatch):
+    cfg = QSIConfig(use_cognize=False, kernel="numpy")
+    reqs = _requests(n=3, days=5)
+    svc = ScoringService(cfg)
+    real = svc._score_wave
+
+    def flaky(items, overrides):
+        if any(b.key == reqs[1]["key"] for b in items):
+            raise RuntimeError("boom")
+        return real(items, overrides)
+    monkeypatch.setattr(svc, "_score_wave", flaky)
+
+    async def run():
+        await svc.start(serve=False)
+        try:
+            return await asyncio.gather(*(svc.score(r) for r in reqs), return_exceptions=True)
+        finally:
+            await svc.stop()
+
+    res = asyncio.run(run())
+    assert isinstance(res[1], RuntimeError) and res[0]["n"] == res[2]["n"] == 5
+
+
+def test_score_after_stop_raises_instead_of_hanging():
+    svc = ScoringService(QSIConfig(use_cognize=False, kernel="numpy"))
+    req = _requests(n=1, days=5)[0]
+
+    async def run():
+        await svc.start(serve=False)
+        await svc.score(req)
+        await svc.stop()
+        with pytest.raises(RuntimeError, match="not running"):
+            await asyncio.wait_for(svc.score(req), 3)
+
+    asyncio.run(run())
+    assert svc.stats["engine_calls"] == svc.stats["batches"] == 1
@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qsi import QSIEngine, QSIConfig, QSIStream, generate_dummy
+from qsi import register_array_model, register_custom_model
+
+RES = ["drift", "E", "Theta", "rupture", "rupture_prob", "loss"]
+
+
+def _feed(stream, df, sizes=(1, 3, 2, 5)):
+    df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+    parts, i, j = [], 0, 0
+    while i < len(df):
+        k = sizes[j % len(sizes)]
+        chunk = df.iloc[i:i + k]
+        parts.append(stream.update(chunk.iloc[0].to_dict() if k == 1 else chunk))
+        i, j = i + k, j + 1
+    parts.append(stream.flush())
+    return pd.concat([p for p in parts if len(p)], ignore_index=True)
+
+
+def _assert_same(batch, streamed, key):
+    a = batch.sort_values(key).reset_index(drop=True)[key + RES]
+    b = streamed.sort_values(key).reset_index(drop=True)[key + RES]
+    pd.testing.assert_frame_equal(a, b, check_exact=True, check_dtype=False)
+
+
+@pytest.mark.parametrize("kw", [
+    {"use_cognize": False},
+    {"use_cognize": False, "use_ewma": True},
+    {"use_cognize": False, "custom_model": "rolling_quantile"},
+    {"use_cognize": False, "custom_model": "window_std_k", "custom_params": {"window": 10, "k": 2.0}},
+])
+def test_stream_matches_batch_grouped(kw):
+    df = generate_dummy(days=45, segments=["B", "A", "C"])
+    batch, _ = QSIEngine(QSIConfig(**kw)).analyze(df, groupby="Segment")
+    streamed = _feed(QSIStream(QSIConfig(**kw), groupby="Segment"), df)
+    _assert_same(batch, streamed, ["Segment", "Date"])
+
+
+def test_stream_matches_batch_cognize():
+    pytest.importorskip("cognize")
+    df = generate_dummy(days=60)
+    batch, _ = QSIEngine(QSIConfig()).analyze(df)
+    _assert_same(batch, _feed(QSIStream(QSIConfig()), df), ["Date"])
+
+
+def test_custom_warmup_rows_are_held_until_theta_defined():
+    cfg = QSIConfig(use_cognize=False, custom_model="rolling_quantile", custom_params={"window": 10})
+    stream = QSIStream(cfg)
+    df = generate_dummy(days=6)
+    held = [stream.update(r) for r in df.to_dict("records")[:4]]
+    assert all(len(h) == 0 for h in held)              # min_periods = 5
+    released = stream.update(df.iloc[4].to_dict())
+    assert len(released) == 5
+    assert released["Theta"].nunique() == 1
+
+
+def test_warmup_rows_without_backfill_score_like_batch():
+    register_custom_model("late_mean", lambda d, p, df: d.rolling(5, min_periods=5).mean() * 0.01)
+    cfg = QSIConfig(use_cognize=False, custom_model="late_mean")
+    df = generate_dummy(days=30)
+    batch, _ = QSIEngine(cfg).analyze(df)
+    assert batch["Theta"].iloc[:4].isna().all()
+    _assert_same(batch, _feed(QSIStream(cfg), df, sizes=(1,)), ["Date"])
+
+
+def test_stream_rejects_out_of_order_rows():
+    stream = QSIStream(QSIConfig(use_cognize=False))
+    df = generate_dummy(days=5)
+    stream.update(df.iloc[3:])
+    with pytest.raises(ValueError):
+        stream.update(df.iloc[0].to_dict())
+
+
+@pytest.mark.parametrize("kw", [
+    {"use_cognize": False},
+    {"use_cognize": False, "use_ewma": True},
+    {"use_cognize": False, "custom_model": "rolling_quantile", "custom_params": {"window": 60}},
+    {"use_cognize": False, "custom_model": "window_std_k", "custom_params": {"window": 7}},
+    {},
+])
+def test_checkpoint_resume_matches_full_run(tmp_path, kw):
+    if kw.get("use_cognize", True):
+        pytest.importorskip("cognize")
+    df = generate_dummy(days=40, segments=["A", "B"]).sort_values("Date", kind="stable")
+    full, _ = QSIEngine(QSIConfig(**kw)).analyze(df, groupby="Segment")
+
+    first = QSIStream(QSIConfig(**kw), groupby="Segment")
+    head = first.update(df.iloc[:50])
+    first.save(str(tmp_path / "state.qsi"))
+
+    resumed = QSIStream.load(str(tmp_path / "state.qsi"))
+    tail = pd.concat([resumed.update(df.iloc[50:]), resumed.flush()], ignore_index=True)
+    _assert_same(full, pd.concat([head, tail], ignore_index=True), ["Segment", "Date"])
+    assert resumed.cfg == first.cfg
+
+
+def _trailing_max(drift, params, cols):
+    w = int(params["window"])
+    peak = pd.Series(drift).rolling(w, min_periods=1).max().to_numpy()
+    return 0.9 * peak + 0.01 * pd.Series(cols["Unit_Cost"]).rolling(w, min_periods=1).max().to_numpy()
+
+
+def test_streaming_array_model_with_columns_resumes_from_checkpoint(tmp_path):
+    register_array_model("trailing_max", _trailing_max, columns=("Unit_Cost",), streaming=True)
+    cfg = QSIConfig(use_cognize=False, custom_model="trailing_max", custom_params={"window": 7})
+    df = generate_dummy(days=30, segments=["A", "B"]).sort_values("Date", kind="stable")
+    full, _ = QSIEngine(cfg).analyze(df, groupby="Segment")
+
+    first = QSIStream(cfg, groupby="Segment")
+    head = first.update(df.iloc[:25])
+    first.save(str(tmp_path / "state.qsi"))
+    tail = QSIStream.load(str(tmp_path / "state.qsi")).update(df.iloc[25:])
+    _assert_same(full, pd.concat([head, tail], ignore_index=True), ["Segment", "Date"])
+
+
+def test_series_model_reads_trailing_rows_and_resumes_from_checkpoint(tmp_path):
+    register_custom_model("fc_share", lambda d, p, df: 0.1 * df["Forecast"].rolling(int(p["window"]), min_periods=1).mean())
+    cfg = QSIConfig(use_cognize=False, custom_model="fc_share", custom_params={"window": 5})
+    df = generate_dummy(days=30, segments=["A", "B"]).sort_values("Date", kind="stable")
+    full, _ = QSIEngine(cfg).analyze(df, groupby="Segment")
+
+    first = QSIStream(cfg, groupby="Segment")
+    head = _feed(first, df.iloc[:24])
+    first.save(str(tmp_path / "state.qsi"))
+    tail = QSIStream.load(str(tmp_path / "state.qsi")).update(df.iloc[24:])
+    _assert_same(full, pd.concat([head, tail], ignore_index=True), ["Segment", "Date"])
+
+
+def test_stream_rejects_array_model_without_streaming_support():
+    register_array_model("whole_series", lambda d, p, c: np.full_like(d, d.mean()))
+    with pytest.raises(ValueError, match="streaming"):
+        QSIStream(QSIConfig(use_cognize=False, custom_model="whole_series"))
+
+
+@pytest.mark.parametrize("ext", [".csv", ".parquet"])
+def test_analyze_path_matches_in_memory(tmp_path, ext):
+    if ext == ".parquet":
+        pytest.importorskip("pyarrow")
+    df = generate_dummy(days=50, segments=["A", "B", "C"]).sort_values("Date", kind="stable")
+    src = tmp_path / f"in{ext}"
+    df.to_csv(src, index=False) if ext == ".csv" else df.to_parquet(src, index=False)
+    cfg = QSIConfig(use_cognize=False, use_ewma=True)
+
+    full, full_rep = QSIEngine(cfg).analyze(df, groupby="Segment")
+    rep = QSIEngine(cfg).analyze_path(str(src), str(tmp_path / f"out{ext}"), groupby="Segment", chunksize=17)
+    written = pd.read_csv(tmp_path / "out.csv", parse_dates=["Date"], float_precision="round_trip") if ext == ".csv" \
+        else pd.read_parquet(tmp_path / "out.parquet")
+
+    _assert_same(full, written, ["Segment", "Date"])
+    assert rep["io"]["chunks"] == 9 and rep["io"]["rows_written"] == 150
+    assert rep["summary"]["ruptures"] == full_rep["summary"]["ruptures"]
+    assert rep["summary"]["total_loss"] == pytest.approx(full_rep["summary"]["total_loss"])
+    for seg, v in full_rep["by_segment"].items():
+        assert rep["by_segment"][seg] == pytest.approx(v)
+
+
+def test_analyze_path_orders_segments_like_batch(tmp_path):
+    df = generate_dummy(days=20, segments=["x", "y", "z"]).sort_values("Date", kind="stable")
+    df["SKU"] = df["Segment"].map({"x": 2, "y": 10, "z": 1})
+    df.to_csv(tmp_path / "in.csv", index=False)
+    cfg = QSIConfig(use_cognize=False, output="summary_only")
+    _, full_rep = QSIEngine(cfg).analyze(df, groupby="SKU")
+    rep = QSIEngine(cfg).analyze_path(str(tmp_path / "in.csv"), None, groupby="SKU", chunksize=7)
+    assert list(rep["by_segment"]) == list(full_rep["by_segment"]) == ["1", "2", "10"]
+
+
+def test_analyze_path_summary_only_writes_nothing(tmp_path):
+    df = generate_dummy(days=40, segments=["A", "B"]).sort_values("Date", kind="stable")
+    df.to_csv(tmp_path / "in.csv", index=False)
+    cfg = QSIConfig(use_cognize=False, output="summary_only")
+    rep = QSIEngine(cfg).analyze_path(str(tmp_path / "in.csv"), None, groupby="Segment", chunksize=13)
+    _, full_rep = QSIEngine(QSIConfig(use_cognize=False)).analyze(df, groupby="Segment")
+    assert rep["io"]["output"] is None and rep["io"]["rows_written"] == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.csv"]
+    assert rep["summary"]["ruptures"] == full_rep["summary"]["ruptures"] == len(rep["events"])
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qsi import QSIEngine, QSIConfig, SynthConfig, generate_synthetic, iter_synthetic
+from qsi.qsi_synth import SCENARIO_LEVEL_SHIFT, SCENARIO_VOLATILITY, SCENARIO_COST_SPIKE, SCENARIO_WEEKEND
+
+
+def _cfg(**kw):
+    base = dict(n_segments=300, days=120, level_shift_rate=0.6, burst_rate=0.6, cost_spike_rate=0.6,
+                weekend_effect=0.2, level_sd=0.3, cost_sd=0.2, end="2024-06-30")
+    return SynthConfig(**{**base, **kw})
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 5_000, 10**9])
+def test_chunks_concatenate_to_the_whole_panel(chunk_rows):
+    whole = generate_synthetic(_cfg())
+    parts = list(iter_synthetic(_cfg(), chunk_rows=chunk_rows))
+    assert all(p["Segment"].nunique() * 120 == len(p) for p in parts)     # segments never split
+    got = pd.concat(parts, ignore_index=True)
+    pd.testing.assert_frame_equal(got.astype({"Segment": object}), whole.astype({"Segment": object}))
+
+
+def test_scenarios_are_labelled_and_respect_warmup():
+    df = generate_synthetic(_cfg(warmup=40))
+    flags = df["Scenario"].to_numpy()
+    day = (df["Date"] - df["Date"].min()).dt.days.to_numpy()
+    injected = flags & (SCENARIO_LEVEL_SHIFT | SCENARIO_VOLATILITY | SCENARIO_COST_SPIKE)
+    assert injected.any() and not injected[day < 40].any()
+    assert np.array_equal(df["Truth_Rupture"], (flags & (SCENARIO_LEVEL_SHIFT | SCENARIO_VOLATILITY)) != 0)
+    assert np.array_equal((flags & SCENARIO_WEEKEND) != 0, df["Date"].dt.weekday.isin([5, 6]))
+    spike = (flags & SCENARIO_COST_SPIKE) != 0
+    base = df.groupby("Segment", observed=True)["Unit_Cost"].transform("min")
+    np.testing.assert_allclose(df["Unit_Cost"][spike], base[spike] * 3.0)
+
+    plain = generate_synthetic(SynthConfig(n_segments=3, days=50))
+    assert not plain["Truth_Rupture"].any() and (plain["Scenario"] == 0).all()
+
+
+def test_frame_output_matches_dataframe_and_labels_track_ruptures():
+    cfg = QSIConfig(use_cognize=False, base_threshold=300.0)
+    df = generate_synthetic(_cfg(burst_scale=6.0))
+    fr = generate_synthetic(_cfg(burst_scale=6.0), as_frame=True, order="date")
+    assert fr.date_sorted and len(fr) == len(df)
+    _, ra = QSIEngine(cfg).analyze(df, groupby="Segment")
+    out, rb = QSIEngine(cfg).analyze(fr, groupby="Segment")
+    assert ra["by_segment"] == rb["by_segment"]
+    truth, rupt = out["Truth_Rupture"], out["rupture"].astype(bool)
+    assert rupt[truth].mean() > 2 * rupt[~truth].mean()
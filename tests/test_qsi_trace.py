@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from qsi import QSIEngine, QSIConfig, EpistemicAnalytics, EpistemicConfig, generate_dummy
+from qsi import register_custom_model, clear_theta_cache
+from qsi.qsi_epistemic import register_custom_diag, _CUSTOM_DIAG
+from qsi.qsi_engine import _CUSTOM_MODELS
+
+
+def test_timings_off_by_default_and_results_unchanged():
+    df = generate_dummy(days=60, segments=["A", "B"])
+    out, rep = QSIEngine(QSIConfig(use_cognize=False)).analyze(df, groupby="Segment")
+    assert "timings" not in rep
+    out_t, rep_t = QSIEngine(QSIConfig(use_cognize=False, timings=True)).analyze(df, groupby="Segment")
+    np.testing.assert_array_equal(out["Theta"].to_numpy(), out_t["Theta"].to_numpy())
+    t = rep_t["timings"]
+    assert {"prep", "layout", "noise", "recurrence", "sigmoid", "report"} <= set(t["stages"])
+    assert t["stages"]["recurrence"]["rows"] == 120 and t["total"] >= t["stages"]["recurrence"]["seconds"]
+
+
+def test_tracer_sees_segment_and_plugin_timings_of_custom_model():
+    clear_theta_cache()
+    register_custom_model("trace_mean", lambda d, p, df: np.full(len(d), float(np.mean(d))))
+    try:
+        events = []
+        cfg = QSIConfig(use_cognize=False, custom_model="trace_mean")
+        _, rep = QSIEngine(cfg, tracer=events.append).analyze(generate_dummy(days=30, segments=["A", "B", "C"]),
+                                                             groupby="Segment")
+    finally:
+        _CUSTOM_MODELS.pop("trace_mean", None)
+        clear_theta_cache()
+    t = rep["timings"]
+    assert set(t["segments"]) == {"A", "B", "C"} and all(s["rows"] == 30 for s in t["segments"].values())
+    assert t["plugins"]["custom_model:trace_mean"]["calls"] == 3
+    assert {(e["kind"], e["name"]) for e in events} >= {("segment", "B"), ("stage", "theta")}
+
+
+def test_enrich_timings_cover_stages_and_custom_diagnostics():
+    out, _ = QSIEngine(QSIConfig(use_cognize=False)).analyze(generate_dummy(days=60, segments=["A", "B"]),
+                                                            groupby="Segment")
+    register_custom_diag("trace_n", lambda d, c: {"n": len(d)})
+    try:
+        res = EpistemicAnalytics.enrich(out, EpistemicConfig(groupby="Segment", timings=True))
+    finally:
+        _CUSTOM_DIAG.pop("trace_n", None)
+    t = res["timings"]
+    assert {"columns", "economics", "epistemic", "diagnostics", "alignment", "by_group"} <= set(t["stages"])
+    assert t["plugins"]["custom_diag:trace_n"]["rows"] == 120
+    assert "timings" not in EpistemicAnalytics.enrich(out, EpistemicConfig(groupby="Segment"))
@@ -0,0 +1,32 @@
+import pytest
+
+from qsi import QSIEngine, QSIConfig, QSITuner, TunerConfig, generate_dummy
+
+
+def test_tuner_returns_feasible_overrides_no_worse_than_baseline():
+    df = generate_dummy(days=200, segments=["A", "B"])
+    qcfg = QSIConfig(use_cognize=False)
+    tcfg = TunerConfig(n_candidates=27, max_rupture_rate=0.5)
+    best = QSITuner(qcfg, tcfg).tune(df, groupby="Segment")
+
+    assert list(best) == ["A", "B"]
+    for seg, res in best.items():
+        sub = df[df["Segment"] == seg]
+        _, base = QSIEngine(qcfg).analyze(sub)
+        _, tuned = QSIEngine(qcfg).analyze(sub, overrides=res["overrides"])
+        assert set(res["overrides"]) == {"base_threshold", "a", "c", "sigma"}
+        assert tuned["summary"]["ruptures"] / len(sub) <= 0.5
+        if base["summary"]["ruptures"] / len(sub) <= 0.5:
+            assert tuned["summary"]["total_loss"] <= base["summary"]["total_loss"] + 1e-6
+        assert res["total_loss"] == pytest.approx(tuned["summary"]["total_loss"])
+
+
+def test_tuner_respects_budget_and_is_worker_independent():
+    df = generate_dummy(days=120, segments=["A", "B", "C"])
+    qcfg = QSIConfig(use_cognize=False, use_ewma=True)
+    serial = QSITuner(qcfg, TunerConfig(n_candidates=9, budget_rows=400)).tune(df, groupby="Segment")
+    parallel = QSITuner(qcfg, TunerConfig(n_candidates=9, budget_rows=400, n_workers=2)).tune(df, groupby="Segment")
+    assert serial == parallel
+    for res in serial.values():
+        assert res["evaluations"] <= 400
+        assert set(res["overrides"]) == {"ewma_alpha", "ewma_k"}
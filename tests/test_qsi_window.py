@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qsi.qsi_kernels import get_kernels, QUANTILE_BLOCK
+from qsi.qsi_window import rolling_quantiles, rolling_moments, RollingFeatures, RollingMoments, SortedWindow
+
+QS = [0.0, 0.1, 0.5, 0.8, 1.0]
+
+
+def _series(n, seed=0):
+    x = np.round(np.random.default_rng(seed).normal(size=n) * 3, 1)   # plenty of ties
+    x[[3, n // 2]] = np.nan
+    return x
+
+
+def _pandas(x, window, mp, q):
+    return pd.Series(x).rolling(window, min_periods=mp).quantile(q).to_numpy()
+
+
+@pytest.mark.parametrize("kernel", ["auto", "numpy"])
+@pytest.mark.parametrize("n,window,mp", [(40, 7, 3), (300, 1, 1), (200, 500, 2), (3 * QUANTILE_BLOCK, 50, 25)])
+def test_rolling_quantiles_match_pandas(n, window, mp, kernel):
+    x = _series(n)
+    out = rolling_quantiles(x, window, QS, min_periods=mp, kernel=kernel)
+    assert out.shape == (n, len(QS))
+    for j, q in enumerate(QS):
+        np.testing.assert_array_equal(out[:, j], _pandas(x, window, mp, q))
+    np.testing.assert_array_equal(rolling_quantiles(x, window, 0.8, min_periods=mp, kernel=kernel), out[:, 3])
+
+
+@pytest.mark.parametrize("window", [5, QUANTILE_BLOCK + 3])
+def test_interpreted_kernel_matches_numba(window):
+    pytest.importorskip("numba")
+    x = _series(2 * QUANTILE_BLOCK + 17, seed=1)
+    qs = np.array(QS)
+    off = np.array([0, 40, 41, len(x)])
+    a, b = np.empty((len(x), len(qs))), np.empty((len(x), len(qs)))
+    get_kernels("numpy").rolling_quantiles(x, off, window, 2, qs, a)
+    get_kernels("numba").rolling_quantiles(x, off, window, 2, qs, b)
+    np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize("n,window", [(120, 9), (900, 400)])     # 400: buckets split and empty
+def test_sorted_window_matches_batch_point_by_point(n, window):
+    x = _series(n, seed=2)
+    batch = rolling_quantiles(x, window, QS, min_periods=4)
+    w = SortedWindow(window, min_periods=4)
+    for i, v in enumerate(x):
+        w.push(v)
+        np.testing.assert_array_equal(w.quantiles(QS), batch[i])
+    assert len(w) == window
+
+
+@pytest.mark.parametrize("kernel", ["auto", "numpy"])
+def test_min_periods_above_window_gives_nan(kernel):
+    assert np.isnan(rolling_quantiles(_series(20), 3, QS, min_periods=5, kernel=kernel)).all()
+
+
+def test_quantiles_are_validated():
+    with pytest.raises(ValueError):
+        rolling_quantiles(np.arange(5.0), 3, 1.5)
+
+
+@pytest.mark.parametrize("kernel", ["auto", "numpy"])
+def test_rolling_moments_match_pandas_and_reset_per_segment(kernel):
+    x = _series(400, seed=3)
+    off = np.array([0, 150, 150, 400])
+    mean, var = rolling_moments(x, 12, 5, ddof=0, offsets=off, kernel=kernel)
+    for s, e in zip(off[:-1], off[1:]):
+        r = pd.Series(x[s:e]).rolling(12, min_periods=5)
+        np.testing.assert_allclose(mean[s:e], r.mean().to_numpy(), rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(var[s:e], r.var(ddof=0).to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+def test_rolling_moments_stepper_is_bit_identical_to_batch():
+    pytest.importorskip("numba")
+    x = _series(200, seed=4)
+    mean, var = rolling_moments(x, 9, 3, ddof=1, kernel="numba")
+    m = RollingMoments(9, min_periods=3, ddof=1)
+    got = np.array([m.push(v) for v in x])
+    np.testing.assert_array_equal(got[:, 0], mean)
+    np.testing.assert_array_equal(got[:, 1], var)
+
+
+def test_feature_store_computes_once_and_slices_segments():
+    x = _series(300, seed=5)
+    off = np.array([0, 100, 300])
+    feats = RollingFeatures(x, off)
+    seg = feats.segment(1)
+    mu, var = seg.moments(10, 5)
+    assert len(seg) == 200 and len(feats._moments) == 1
+    feats.moments(10, 5)
+    assert len(feats._moments) == 1                      # shared, not recomputed
+    alone = RollingFeatures(x[100:])
+    np.testing.assert_array_equal(mu, alone.mean(10, 5))
+    np.testing.assert_array_equal(seg.quantiles(10, [0.2, 0.8], 5), alone.quantiles(10, [0.2, 0.8], 5))
+    assert set(feats._quantiles[(10, 5)]) == {0.2, 0.8}
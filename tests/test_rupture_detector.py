@@ -1,7 +1,12 @@
 import pandas as pd
 import numpy as np
 import pytest
-from rupture import generate_dummy, compute_drift_thresholds, compute_ewma_threshold
+
+# Legacy standalone detector module; not part of the qsi package, so skip when it is absent.
+rupture = pytest.importorskip("rupture")
+generate_dummy = rupture.generate_dummy
+compute_drift_thresholds = rupture.compute_drift_thresholds
+compute_ewma_threshold = rupture.compute_ewma_threshold
 
 #  Dummy Data Tests
 def test_generate_dummy_valid_schema():